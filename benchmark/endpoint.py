@@ -0,0 +1,186 @@
+#! /usr/bin/python3
+
+import argparse
+import gzip
+import json
+import logging
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import rdflib
+
+
+class EndpointHandler(BaseHTTPRequestHandler):
+    """SPARQL protocol handler: GET and POST queries, JSON results
+
+    The /stats path returns the number of queries and connections, as JSON.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        """Count connections"""
+        self.server.count("connections")
+        super().setup()
+
+    def log_message(self, message_format, *args):
+        """Log requests with the logging module"""
+        logging.debug(message_format % args)
+
+    def send_body(self, status, body, content_type):
+        """Send a response
+
+        Parameters
+        ----------
+        status : int
+            HTTP status
+        body : bytes
+            Response body
+        content_type : str
+            Content type of the body
+        """
+        self.send_response(status)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_results(self, query):
+        """Execute a query and send its results
+
+        Parameters
+        ----------
+        query : str
+            SPARQL query
+        """
+        self.server.count("queries")
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        try:
+            body = self.server.query(query)
+        except Exception as e:
+            self.send_body(400, str(e).encode("utf-8"), "text/plain")
+            return
+        self.send_body(200, body, "application/sparql-results+json")
+
+    def do_GET(self):
+        """GET request"""
+        url = urllib.parse.urlparse(self.path)
+        if url.path == "/stats":
+            self.send_body(200, json.dumps(self.server.stats).encode("utf-8"), "application/json")
+            return
+        parameters = urllib.parse.parse_qs(url.query)
+        if "query" not in parameters:
+            self.send_body(400, b"Missing query", "text/plain")
+            return
+        self.send_results(parameters["query"][0])
+
+    def do_POST(self):
+        """POST request (form encoded or application/sparql-query)"""
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+        if self.headers.get("Content-Type", "").startswith("application/x-www-form-urlencoded"):
+            parameters = urllib.parse.parse_qs(data)
+            if "query" not in parameters:
+                self.send_body(400, b"Missing query", "text/plain")
+                return
+            data = parameters["query"][0]
+        self.send_results(data)
+
+
+class Endpoint(ThreadingHTTPServer):
+    """Local SPARQL endpoint stand-in, backed by a rdflib Graph
+
+    Attributes
+    ----------
+    graph : rdflib.Graph
+        Data of the endpoint
+    latency : float
+        Delay added to each query, in seconds
+    stats : dict
+        Number of queries and connections
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, graph, latency=0):
+        """Init
+
+        Parameters
+        ----------
+        address : tuple
+            Host and port
+        graph : rdflib.Graph
+            Data of the endpoint
+        latency : float, optional
+            Delay added to each query, in seconds
+        """
+        super().__init__(address, EndpointHandler)
+        self.graph = graph
+        self.latency = latency
+        self.stats = {"queries": 0, "connections": 0}
+        # rdflib queries are not thread safe
+        self.lock = threading.Lock()
+
+    def count(self, name):
+        """Increment a counter of stats"""
+        with self.lock:
+            self.stats[name] += 1
+
+    def query(self, query):
+        """Execute a query
+
+        Parameters
+        ----------
+        query : str
+            SPARQL query
+
+        Returns
+        -------
+        bytes
+            JSON results
+        """
+        with self.lock:
+            return self.graph.query(query).serialize(format="json")
+
+
+class EndpointCli(object):
+    """Command line of the endpoint"""
+
+    def __init__(self):
+        """Init
+
+        Parse args
+        """
+        parser = argparse.ArgumentParser(description="Local SPARQL endpoint serving a RDF file, to benchmark the abstractor")
+
+        parser.add_argument("-s", "--source", type=str, help="RDF file", required=True)
+        parser.add_argument("-t", "--source-type", choices=['xml', 'turtle', 'nt'], help="Source format", default="nt")
+        parser.add_argument("--host", type=str, help="Listening host", default="127.0.0.1")
+        parser.add_argument("-p", "--port", type=int, help="Listening port", default=8890)
+        parser.add_argument("--latency", type=float, help="Delay added to each query, in seconds", default=0)
+        parser.add_argument("-v", "--verbose", action="store_true", help="Log requests")
+
+        self.args = parser.parse_args()
+        logging.basicConfig(level=logging.DEBUG if self.args.verbose else logging.INFO)
+
+    def main(self):
+        """main"""
+        graph = rdflib.Graph()
+        graph.parse(self.args.source, format=self.args.source_type)
+        server = Endpoint((self.args.host, self.args.port), graph, self.args.latency)
+        logging.info("Serving {} triples on http://{}:{}/sparql".format(len(graph), self.args.host, server.server_address[1]))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        server.server_close()
+
+
+if __name__ == '__main__':
+    """main"""
+    EndpointCli().main()
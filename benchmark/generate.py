@@ -0,0 +1,229 @@
+#! /usr/bin/python3
+
+import argparse
+import logging
+import os
+import random
+import sys
+
+import rdflib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libabstractor.TripleWriter import TripleWriter  # noqa: E402, I100
+
+
+class Generator(object):
+    """Synthetic RDF data generator
+
+    Data contains classes (with rdfs:subClassOf chains), instances, relations
+    between instances and numeric or text attributes. The schema is also
+    described with an OWL ontology and with the AskOmics ontology, so every
+    abstractor mode has something to scan.
+
+    Attributes
+    ----------
+    namespace : rdflib.namespace.Namespace
+        Namespace of generated URIs
+    classes : int
+        Number of classes
+    instances : int
+        Number of instances per class
+    predicates : int
+        Number of predicates
+    literal_ratio : float
+        Ratio of predicates with literal values (attributes)
+    subclass_depth : int
+        Length of rdfs:subClassOf chains
+    """
+
+    askomics_ns = rdflib.namespace.Namespace("http://askomics.org/internal/")
+
+    def __init__(self, classes=10, instances=100, predicates=20, literal_ratio=0.5, subclass_depth=2, seed=0, namespace="http://example.org/benchmark/"):
+        """Init
+
+        Parameters
+        ----------
+        classes : int, optional
+            Number of classes
+        instances : int, optional
+            Number of instances per class
+        predicates : int, optional
+            Number of predicates
+        literal_ratio : float, optional
+            Ratio of predicates with literal values (attributes)
+        subclass_depth : int, optional
+            Length of rdfs:subClassOf chains
+        seed : int, optional
+            Random seed
+        namespace : str, optional
+            Namespace of generated URIs
+        """
+        self.namespace = rdflib.namespace.Namespace(namespace)
+        self.classes = classes
+        self.instances = instances
+        self.predicates = predicates
+        self.literal_ratio = literal_ratio
+        self.subclass_depth = subclass_depth
+
+        # predicate -> (domain class, kind, range class), kind is relation, numeric or text
+        random_generator = random.Random(seed)
+        self.schema = []
+        for predicate in range(predicates):
+            domain = predicate % classes
+            if random_generator.random() < literal_ratio:
+                self.schema.append((domain, random_generator.choice(("numeric", "text")), None))
+            else:
+                self.schema.append((domain, "relation", random_generator.randrange(classes)))
+        self.random = random_generator
+
+    def class_uri(self, index):
+        """URI of a class"""
+        return self.namespace["Class{}".format(index)]
+
+    def predicate_uri(self, index):
+        """URI of a predicate"""
+        return self.namespace["predicate{}".format(index)]
+
+    def instance_uri(self, class_index, index):
+        """URI of an instance"""
+        return self.namespace["Class{}_{}".format(class_index, index)]
+
+    def parent(self, index):
+        """Index of the parent of a class, None if the class has no parent"""
+        if self.subclass_depth and index % (self.subclass_depth + 1):
+            return index - 1
+        return None
+
+    def schema_triples(self):
+        """Triples of the OWL and AskOmics ontologies
+
+        Yields
+        ------
+        tuple
+            subject, predicate, object
+        """
+        ontology = self.namespace["ontology"]
+        yield (ontology, rdflib.RDF.type, rdflib.OWL.Ontology)
+
+        for index in range(self.classes):
+            uri = self.class_uri(index)
+            yield (uri, rdflib.RDF.type, rdflib.OWL.Class)
+            yield (uri, rdflib.RDF.type, self.askomics_ns["entity"])
+            yield (uri, rdflib.RDFS.isDefinedBy, ontology)
+            yield (uri, rdflib.RDFS.label, rdflib.Literal("Class{}".format(index)))
+            if self.parent(index) is not None:
+                yield (uri, rdflib.RDFS.subClassOf, self.class_uri(self.parent(index)))
+
+        for index, (domain, kind, range_index) in enumerate(self.schema):
+            uri = self.predicate_uri(index)
+            yield (uri, rdflib.RDFS.isDefinedBy, ontology)
+            yield (uri, rdflib.RDFS.label, rdflib.Literal("predicate{}".format(index)))
+            yield (uri, rdflib.RDFS.domain, self.class_uri(domain))
+            if kind == "relation":
+                yield (uri, rdflib.RDF.type, rdflib.OWL.ObjectProperty)
+                yield (uri, rdflib.RDFS.range, self.class_uri(range_index))
+            else:
+                yield (uri, rdflib.RDF.type, rdflib.OWL.DatatypeProperty)
+                yield (uri, rdflib.RDFS.range, rdflib.XSD.int if kind == "numeric" else rdflib.XSD.string)
+
+    def data_triples(self):
+        """Triples of the instances
+
+        Yields
+        ------
+        tuple
+            subject, predicate, object
+        """
+        predicates_of_class = {}
+        for index, (domain, kind, range_index) in enumerate(self.schema):
+            predicates_of_class.setdefault(domain, []).append((self.predicate_uri(index), kind, range_index))
+
+        for class_index in range(self.classes):
+            class_uri = self.class_uri(class_index)
+            predicates = predicates_of_class.get(class_index, [])
+            for index in range(self.instances):
+                uri = self.instance_uri(class_index, index)
+                yield (uri, rdflib.RDF.type, class_uri)
+                yield (uri, rdflib.RDFS.label, rdflib.Literal("Class{} {}".format(class_index, index)))
+                for predicate, kind, range_index in predicates:
+                    if kind == "relation":
+                        yield (uri, predicate, self.instance_uri(range_index, self.random.randrange(self.instances)))
+                    elif kind == "numeric":
+                        yield (uri, predicate, rdflib.Literal(self.random.randrange(1000000)))
+                    else:
+                        yield (uri, predicate, rdflib.Literal("value {}".format(self.random.randrange(1000000))))
+
+    def triples(self):
+        """All generated triples
+
+        Yields
+        ------
+        tuple
+            subject, predicate, object
+        """
+        yield from self.schema_triples()
+        yield from self.data_triples()
+
+    def write(self, path, output_format):
+        """Write generated data into a file
+
+        nt and turtle are streamed, xml is built into a rdflib Graph.
+
+        Parameters
+        ----------
+        path : str
+            Output file
+        output_format : str
+            nt, turtle or xml
+
+        Returns
+        -------
+        int
+            Number of triples
+        """
+        if output_format in TripleWriter.formats:
+            with open(path, "w", encoding="utf-8") as output:
+                writer = TripleWriter.create(output_format, output, {"ex": str(self.namespace), "rdf": str(rdflib.RDF), "rdfs": str(rdflib.RDFS)}, unique=True)
+                writer.write_all(self.triples())
+            return writer.count
+
+        graph = rdflib.Graph()
+        for triple in self.triples():
+            graph.add(triple)
+        graph.serialize(destination=path, format=output_format)
+        return len(graph)
+
+
+class GeneratorCli(object):
+    """Command line of the generator"""
+
+    def __init__(self):
+        """Init
+
+        Parse args
+        """
+        parser = argparse.ArgumentParser(description="Generate synthetic RDF data to benchmark the abstractor")
+
+        parser.add_argument("-o", "--output", type=str, help="Output file", required=True)
+        parser.add_argument("-f", "--output-format", choices=['xml', 'turtle', 'nt'], help="RDF format", default="nt")
+        parser.add_argument("--classes", type=int, help="Number of classes", default=10)
+        parser.add_argument("--instances", type=int, help="Number of instances per class", default=100)
+        parser.add_argument("--predicates", type=int, help="Number of predicates", default=20)
+        parser.add_argument("--literal-ratio", type=float, help="Ratio of predicates with literal values", default=0.5)
+        parser.add_argument("--subclass-depth", type=int, help="Length of rdfs:subClassOf chains", default=2)
+        parser.add_argument("--seed", type=int, help="Random seed", default=0)
+
+        self.args = parser.parse_args()
+        logging.basicConfig(level=logging.INFO)
+
+    def main(self):
+        """main"""
+        generator = Generator(self.args.classes, self.args.instances, self.args.predicates, self.args.literal_ratio, self.args.subclass_depth, self.args.seed)
+        count = generator.write(self.args.output, self.args.output_format)
+        logging.info("{} triples written into {}".format(count, self.args.output))
+
+
+if __name__ == '__main__':
+    """main"""
+    GeneratorCli().main()
@@ -0,0 +1,276 @@
+#! /usr/bin/python3
+
+import argparse
+import json
+import logging
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from generate import Generator
+
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ABSTRACTOR = os.path.join(os.path.dirname(BENCHMARK_DIR), "abstractor")
+
+
+class Benchmark(object):
+    """Run every abstractor mode against file and endpoint sources
+
+    Each run is a subprocess, measured with its wall time, its peak RSS, and
+    the number of queries received by the endpoint.
+
+    Attributes
+    ----------
+    directory : str
+        Working directory (data and abstractions)
+    modes : list
+        Abstractor modes to run
+    sources : list
+        Sources to run (file, endpoint)
+    source_type : str
+        Format of generated files
+    latency : float
+        Latency of the endpoint, in seconds
+    abstractor_args : list
+        Extra arguments of the abstractor
+    """
+
+    def __init__(self, directory, modes, sources, source_type="nt", latency=0, abstractor_args=None):
+        """Init
+
+        Parameters
+        ----------
+        directory : str
+            Working directory (data and abstractions)
+        modes : list
+            Abstractor modes to run
+        sources : list
+            Sources to run (file, endpoint)
+        source_type : str, optional
+            Format of generated files
+        latency : float, optional
+            Latency of the endpoint, in seconds
+        abstractor_args : list, optional
+            Extra arguments of the abstractor
+        """
+        self.directory = directory
+        self.modes = modes
+        self.sources = sources
+        self.source_type = source_type
+        self.latency = latency
+        self.abstractor_args = abstractor_args or []
+
+    @staticmethod
+    def measure(command):
+        """Run a command, get its wall time and peak RSS
+
+        Parameters
+        ----------
+        command : list
+            The command
+
+        Returns
+        -------
+        tuple
+            Return code, wall time (seconds), peak RSS (bytes)
+        """
+        start = time.perf_counter()
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        _, status, rusage = os.wait4(process.pid, 0)
+        wall_time = time.perf_counter() - start
+        process.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+        # ru_maxrss is in kilobytes on Linux, in bytes on macOS
+        peak_rss = rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+        return process.returncode, wall_time, peak_rss
+
+    @staticmethod
+    def free_port():
+        """Get a free TCP port"""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+    @staticmethod
+    def endpoint_queries(url):
+        """Get the number of queries received by the endpoint"""
+        with urllib.request.urlopen("{}/stats".format(url)) as response:
+            return json.loads(response.read().decode("utf-8"))["queries"]
+
+    def start_endpoint(self, path):
+        """Start the endpoint stand-in on a data file
+
+        Parameters
+        ----------
+        path : str
+            Data file
+
+        Returns
+        -------
+        tuple
+            The endpoint process, and its url
+        """
+        port = self.free_port()
+        url = "http://127.0.0.1:{}".format(port)
+        process = subprocess.Popen([
+            sys.executable, os.path.join(BENCHMARK_DIR, "endpoint.py"),
+            "-s", path, "-t", self.source_type, "-p", str(port), "--latency", str(self.latency)
+        ])
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError("Endpoint failed to start")
+            try:
+                self.endpoint_queries(url)
+                return process, url
+            except OSError:
+                time.sleep(0.1)
+
+    def run_abstractor(self, source, source_type, mode, output):
+        """Run the abstractor
+
+        Parameters
+        ----------
+        source : str
+            Source (file or endpoint url)
+        source_type : str
+            Type of source
+        mode : str
+            Abstractor mode
+        output : str
+            Abstraction file
+
+        Returns
+        -------
+        tuple
+            Return code, wall time (seconds), peak RSS (bytes)
+        """
+        command = [sys.executable, ABSTRACTOR, "-s", source, "-t", source_type, "-m", mode, "-f", "nt", "-o", output, "--no-cache"] + self.abstractor_args
+        return self.measure(command)
+
+    def run(self, generator, name):
+        """Run all modes and sources on generated data
+
+        Parameters
+        ----------
+        generator : Generator
+            Data generator
+        name : str
+            Name of the dataset
+
+        Returns
+        -------
+        list
+            Results (dicts)
+        """
+        path = os.path.join(self.directory, "{}.{}".format(name, self.source_type))
+        triples = generator.write(path, self.source_type)
+        logging.info("{}: {} triples".format(name, triples))
+
+        results = []
+        endpoint = None
+        try:
+            for source in self.sources:
+                if source == "endpoint":
+                    endpoint, url = self.start_endpoint(path)
+                for mode in self.modes:
+                    output = os.path.join(self.directory, "{}_{}_{}.nt".format(name, source, mode))
+                    if source == "endpoint":
+                        queries = self.endpoint_queries(url)
+                        returncode, wall_time, peak_rss = self.run_abstractor("{}/sparql".format(url), "sparql", mode, output)
+                        queries = self.endpoint_queries(url) - queries
+                    else:
+                        queries = None
+                        returncode, wall_time, peak_rss = self.run_abstractor(path, self.source_type, mode, output)
+                    result = {
+                        "dataset": name,
+                        "triples": triples,
+                        "source": source,
+                        "mode": mode,
+                        "success": returncode == 0,
+                        "wall_time": wall_time,
+                        "queries": queries,
+                        "peak_rss": peak_rss
+                    }
+                    logging.info(self.format_result(result))
+                    results.append(result)
+        finally:
+            if endpoint is not None:
+                endpoint.terminate()
+                endpoint.wait()
+        return results
+
+    @staticmethod
+    def format_result(result):
+        """Format a result as a table line"""
+        return "{dataset:>12} {triples:>10} {source:>9} {mode:>9} {status:>7} {wall_time:>9.2f} {queries:>8} {peak_rss:>10.1f}".format(
+            status="ok" if result["success"] else "FAILED",
+            queries="-" if result["queries"] is None else result["queries"],
+            peak_rss=result["peak_rss"] / 1024 / 1024,
+            **{key: value for key, value in result.items() if key not in ("queries", "peak_rss")}
+        )
+
+    @staticmethod
+    def header():
+        """Header of the results table"""
+        return "{:>12} {:>10} {:>9} {:>9} {:>7} {:>9} {:>8} {:>10}".format("dataset", "triples", "source", "mode", "status", "wall (s)", "queries", "RSS (MB)")
+
+
+class BenchmarkCli(object):
+    """Command line of the benchmark"""
+
+    def __init__(self):
+        """Init
+
+        Parse args
+        """
+        parser = argparse.ArgumentParser(description="Benchmark abstractor modes on synthetic data, with files and a local SPARQL endpoint")
+
+        parser.add_argument("--instances", type=int, nargs="+", help="Numbers of instances per class (one dataset each)", default=[10, 100])
+        parser.add_argument("--classes", type=int, help="Number of classes", default=10)
+        parser.add_argument("--predicates", type=int, help="Number of predicates", default=20)
+        parser.add_argument("--literal-ratio", type=float, help="Ratio of predicates with literal values", default=0.5)
+        parser.add_argument("--subclass-depth", type=int, help="Length of rdfs:subClassOf chains", default=2)
+        parser.add_argument("--seed", type=int, help="Random seed", default=0)
+        parser.add_argument("-t", "--source-type", choices=['xml', 'turtle', 'nt'], help="Format of generated files", default="nt")
+
+        parser.add_argument("-m", "--modes", nargs="+", choices=["all", "batch", "owl", "askomics", "sample", "predicate"], help="Abstractor modes",
+                            default=["all", "batch", "owl", "askomics", "sample", "predicate"])
+        parser.add_argument("--sources", nargs="+", choices=["file", "endpoint"], help="Sources", default=["file", "endpoint"])
+        parser.add_argument("--latency", type=float, help="Latency of the endpoint, in seconds", default=0)
+        parser.add_argument("--abstractor-args", type=str, help="Extra arguments of the abstractor, given with = (ex: --abstractor-args='-j 4')", default="")
+
+        parser.add_argument("-d", "--directory", type=str, help="Working directory (default: temporary directory)")
+        parser.add_argument("-o", "--output", type=str, help="Write results into a JSON file")
+
+        self.args = parser.parse_args()
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    def main(self):
+        """main"""
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            benchmark = Benchmark(self.args.directory or temporary_directory, self.args.modes, self.args.sources, self.args.source_type,
+                                  self.args.latency, shlex.split(self.args.abstractor_args))
+            os.makedirs(benchmark.directory, exist_ok=True)
+
+            logging.info(benchmark.header())
+            results = []
+            for instances in self.args.instances:
+                generator = Generator(self.args.classes, instances, self.args.predicates, self.args.literal_ratio, self.args.subclass_depth, self.args.seed)
+                results += benchmark.run(generator, "i{}".format(instances))
+
+        if self.args.output:
+            with open(self.args.output, "w") as output:
+                json.dump(results, output, indent=2)
+
+        if not all(result["success"] for result in results):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    """main"""
+    BenchmarkCli().main()
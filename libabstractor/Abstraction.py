@@ -0,0 +1,474 @@
+import concurrent.futures
+import logging
+
+from libabstractor.AbstractionState import AbstractionState
+from libabstractor.BatchScanner import BatchScanner
+from libabstractor.FileChunker import FileChunker
+from libabstractor.IncrementalScanner import IncrementalScanner
+from libabstractor.InstanceSampler import InstanceSampler
+from libabstractor.LabelEngine import LabelEngine
+from libabstractor.NativeEngine import NativeEngine
+from libabstractor.PredicateScanner import PredicateScanner
+from libabstractor.QueryCache import QueryCache
+from libabstractor.QueryFallback import QueryFallback
+from libabstractor.QueryJournal import QueryJournal
+from libabstractor.QueryLibrary import QueryLibrary
+from libabstractor.QueryScheduler import QueryScheduler
+from libabstractor.RdfGraph import RdfGraph
+from libabstractor.RunReport import RunReport
+from libabstractor.SparqlQuery import SparqlQuery
+from libabstractor.StreamEngine import StreamEngine
+
+
+class Abstraction(object):
+    """Abstraction of RDF sources (SPARQL endpoints or RDF files), without the command line
+
+    Options are the options of the abstractor command line. An Abstraction
+    can be used for several sources, and several runs.
+
+    Attributes
+    ----------
+    mode : str
+        Scan mode (see modes)
+    engine : str
+        Abstraction engine: sparql (SPARQL queries), stream (nt and turtle
+        files, all mode only) or native (triple pattern lookups on files,
+        all and owl modes only)
+    askomics_namespace : str
+        AskOmics internal namespace
+    label_strategy : str
+        Label generation (see LabelEngine.strategies)
+    label_namespaces : list
+        Namespaces removed from URIs by the prefix label strategy
+    excluded_namespaces : list
+        Namespaces of entities left out of the abstraction, in addition to the
+        default ones (see RdfGraph.check_entity). Queries filter them out
+    page_size : int
+        Number of results asked to the endpoint per query (0: no pagination)
+    cache_dir : str
+        Directory of the results cache (None: no cache)
+    cache_ttl : int
+        Lifetime of cached results, in seconds
+    cache_size : int
+        Maximum size of the cache, in bytes
+    refresh : bool
+        Ignore cached results, and refresh them
+    http_method : str
+        HTTP method of the queries (GET or POST)
+    gzip : bool
+        Ask the endpoint for gzip compressed responses
+    jobs : int
+        Number of queries sent concurrently, or of processes parsing files
+        (stream engine)
+    timeout : float
+        Maximum duration of an endpoint query, until its response is fully
+        received, in seconds (None: no timeout)
+    retries : int
+        Number of retries of a query failing with a transient error
+    batch_size : int
+        Number of entities per query (batch mode)
+    sample_size : int
+        Maximum number of instances scanned per entity (sample mode)
+    sample_method : str
+        Sampling of instances (see InstanceSampler.methods)
+    checkpoint : str
+        Path of the checkpoint journal (None: no journal)
+    profile : bool
+        Profile the runs (see RunReport)
+    previous : str
+        Path of the previous abstraction: in all mode, only entities changed
+        since it are queried (see IncrementalScanner), and cached results are
+        refreshed. None for a full scan
+    """
+
+    modes = ("all", "batch", "owl", "askomics", "sample", "predicate")
+    engines = ("sparql", "stream", "native")
+
+    def __init__(self, mode="all", engine="sparql", askomics_namespace="http://askomics.org/internal/", label_strategy="uncamel", label_namespaces=None, excluded_namespaces=None,
+                 page_size=10000, cache_dir=None, cache_ttl=86400, cache_size=512 * 1024 * 1024, refresh=False, http_method="GET", gzip=True, jobs=1,
+                 timeout=300, retries=2, batch_size=10, sample_size=100, sample_method="first", checkpoint=None, profile=False, previous=None):
+        """Init
+
+        Parameters
+        ----------
+        mode : str, optional
+            Scan mode (see modes)
+        engine : str, optional
+            Abstraction engine (sparql, stream or native)
+        askomics_namespace : str, optional
+            AskOmics internal namespace
+        label_strategy : str, optional
+            Label generation (see LabelEngine.strategies)
+        label_namespaces : list, optional
+            Namespaces removed from URIs by the prefix label strategy
+        excluded_namespaces : list, optional
+            Namespaces of entities left out of the abstraction
+        page_size : int, optional
+            Number of results asked to the endpoint per query (0: no pagination)
+        cache_dir : str, optional
+            Directory of the results cache (None: no cache)
+        cache_ttl : int, optional
+            Lifetime of cached results, in seconds
+        cache_size : int, optional
+            Maximum size of the cache, in bytes
+        refresh : bool, optional
+            Ignore cached results, and refresh them
+        http_method : str, optional
+            HTTP method of the queries (GET or POST)
+        gzip : bool, optional
+            Ask the endpoint for gzip compressed responses
+        jobs : int, optional
+            Number of queries sent concurrently, or of processes parsing files
+        timeout : float, optional
+            Maximum duration of an endpoint query, until its response is fully
+            received, in seconds (None: no timeout)
+        retries : int, optional
+            Number of retries of a query failing with a transient error
+        batch_size : int, optional
+            Number of entities per query (batch mode)
+        sample_size : int, optional
+            Maximum number of instances scanned per entity (sample mode)
+        sample_method : str, optional
+            Sampling of instances (see InstanceSampler.methods)
+        checkpoint : str, optional
+            Path of the checkpoint journal
+        profile : bool, optional
+            Profile the runs (see RunReport)
+        previous : str, optional
+            Path of the previous abstraction (incremental all mode)
+
+        Raises
+        ------
+        ValueError
+            Invalid options
+        """
+        if mode not in self.modes:
+            raise ValueError("unknown mode {}".format(mode))
+        if engine not in self.engines:
+            raise ValueError("unknown engine {}".format(engine))
+        if engine == "stream" and mode != "all":
+            raise ValueError("stream engine is only available in all mode")
+        if engine == "native" and mode not in ("all", "owl"):
+            raise ValueError("native engine is only available in all and owl modes")
+        if label_strategy not in LabelEngine.strategies:
+            raise ValueError("unknown label strategy {}".format(label_strategy))
+        if sample_method not in InstanceSampler.methods:
+            raise ValueError("unknown sample method {}".format(sample_method))
+        if sample_size < 1:
+            raise ValueError("sample size must be positive")
+        if batch_size < 1:
+            raise ValueError("batch size must be positive")
+
+        self.mode = mode
+        self.engine = engine
+        self.askomics_namespace = askomics_namespace
+        self.label_strategy = label_strategy
+        self.label_namespaces = label_namespaces or []
+        self.excluded_namespaces = excluded_namespaces or []
+        self.page_size = page_size
+        self.cache_dir = cache_dir
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.refresh = refresh
+        self.http_method = http_method
+        self.gzip = gzip
+        self.jobs = jobs
+        self.timeout = timeout
+        self.retries = retries
+        self.batch_size = batch_size
+        self.sample_size = sample_size
+        self.sample_method = sample_method
+        self.checkpoint = checkpoint
+        self.profile = profile
+        self.previous = previous
+
+    def rdf_graph(self):
+        """Get an empty abstraction
+
+        Returns
+        -------
+        RdfGraph
+            The abstraction
+        """
+        return RdfGraph(self.askomics_namespace, LabelEngine(self.label_strategy, self.label_namespaces), self.excluded_namespaces)
+
+    def abstract_sources(self, sources, report=None, jobs=None, logging_level=None):
+        """Abstract several sources concurrently, and merge their abstractions
+
+        A single source is abstracted in the current process. Several sources
+        are abstracted in a pool of processes.
+
+        Parameters
+        ----------
+        sources : list
+            Sources (tuples: SPARQL endpoint url or path of RDF files, source type)
+        report : RunReport, optional
+            Report of the run
+        jobs : int, optional
+            Number of sources abstracted concurrently (default: all sources)
+        logging_level : int, optional
+            Logging level of the worker processes
+
+        Returns
+        -------
+        RdfGraph
+            The merged abstraction
+        """
+        report = report or RunReport(profile=self.profile)
+        if len(sources) == 1:
+            return self.abstract(*sources[0], report=report)
+
+        rdf = self.rdf_graph()
+        with report.phase("sources"):
+            # One process per source: rdflib parsing and result processing are CPU bound
+            with concurrent.futures.ProcessPoolExecutor(max_workers=min(jobs or len(sources), len(sources)),
+                                                        initializer=self.init_process, initargs=(logging_level, )) as executor:
+                for (source, source_type), (model, source_report) in zip(sources, executor.map(self.abstract_in_process, sources)):
+                    logging.debug("Merge abstraction of {}".format(source))
+                    rdf.update(model)
+                    report.add_source(source, source_type, source_report)
+        return rdf
+
+    @staticmethod
+    def init_process(logging_level):
+        """Configure logging of a worker process
+
+        Parameters
+        ----------
+        logging_level : int
+            Logging level (None to keep the default configuration)
+        """
+        if logging_level is not None:
+            logging.basicConfig(level=logging_level)
+
+    def abstract_in_process(self, source):
+        """Abstract a source, in a worker process
+
+        Parameters
+        ----------
+        source : tuple
+            Source, and its type
+
+        Returns
+        -------
+        tuple
+            The abstraction (SchemaModel), and the report of the source (dict)
+        """
+        report = RunReport(profile=self.profile)
+        rdf = self.abstract(*source, report=report)
+        return rdf.model, report.to_dict()
+
+    def connect(self, source, source_type="sparql", cache=None, report=None, journal=None):
+        """Get a SparqlQuery on a source (files are parsed into a rdflib graph)
+
+        Parameters
+        ----------
+        source : str
+            SPARQL endpoint url, or path of a RDF file, a directory or a glob
+            pattern of RDF files
+        source_type : str, optional
+            Source format (sparql, xml, turtle or nt)
+        cache : QueryCache, optional
+            Cache of endpoint results
+        report : RunReport, optional
+            Report recording each query
+        journal : QueryJournal, optional
+            Checkpoint journal of completed queries
+
+        Returns
+        -------
+        SparqlQuery
+            The source
+        """
+        return SparqlQuery(source, source_type, page_size=self.page_size, cache=cache,
+                           http_method=self.http_method, gzip=self.gzip, pool_size=self.jobs, report=report,
+                           timeout=self.timeout, retries=self.retries, journal=journal)
+
+    def abstract(self, source, source_type="sparql", report=None, sparql=None):
+        """Abstract a source
+
+        Parameters
+        ----------
+        source : str
+            SPARQL endpoint url, or path of a RDF file, a directory or a glob
+            pattern of RDF files
+        source_type : str, optional
+            Source format (sparql, xml, turtle or nt)
+        report : RunReport, optional
+            Report of the run
+        sparql : SparqlQuery, optional
+            Source already connected (parsed files, open connections), kept by
+            the caller across runs. The cache and the checkpoint options are
+            ignored, those of sparql are used
+
+        Returns
+        -------
+        RdfGraph
+            The abstraction
+
+        Raises
+        ------
+        ValueError
+            The stream engine is used on a source that is not a nt or turtle
+            file, or the native engine on a SPARQL endpoint
+        """
+        if self.engine == "stream" and source_type not in FileChunker.source_types:
+            raise ValueError("stream engine is only available for nt and turtle files")
+        if self.engine == "native" and source_type == "sparql":
+            raise ValueError("native engine is only available for files")
+        report = report or RunReport(profile=self.profile)
+
+        journal = None
+        if self.engine != "stream" and sparql is None:
+            cache = None
+            if source_type == "sparql" and self.cache_dir:
+                # Changes since the previous abstraction are found with fresh results
+                refresh = self.refresh or (self.mode == "all" and self.previous is not None)
+                cache = QueryCache(self.cache_dir, ttl=self.cache_ttl, max_size=self.cache_size, refresh=refresh)
+            if source_type == "sparql" and self.checkpoint:
+                journal = QueryJournal(self.checkpoint)
+            with report.phase("load"):
+                sparql = self.connect(source, source_type, cache, report, journal)
+        rdf = self.rdf_graph()
+        # Rows of excluded entities are filtered out by the source
+        library = QueryLibrary(rdf.excluded_namespaces)
+        # Split all mode queries that keep failing
+        fallback = QueryFallback(sparql, library, report)
+        # rdflib queries are CPU bound, only parallelize network queries
+        scheduler = QueryScheduler(self.jobs if source_type == "sparql" else 1)
+
+        askomics_ns = self.askomics_namespace
+
+        if source_type == "sparql":
+            rdf.add_location(source)
+
+        if self.mode == "all" and self.engine == "stream":
+            logging.debug("Stream {}".format(source))
+            with report.phase("scan"):
+                statistics = StreamEngine(source, source_type, jobs=self.jobs).scan()
+            with report.phase("entities and relations"):
+                rdf.add_entities_and_relations(statistics.entities_and_relations())
+            with report.phase("attributes"):
+                rdf.add_attributes(statistics.entities_and_attributes())
+
+        elif self.mode == "all" and self.engine == "native":
+            logging.debug("Scan the triples of {}".format(source))
+            with report.phase("scan"):
+                statistics = NativeEngine(sparql.rdf_source).scan()
+            with report.phase("entities and relations"):
+                rdf.add_entities_and_relations(statistics.entities_and_relations())
+            with report.phase("attributes"):
+                rdf.add_attributes(statistics.entities_and_attributes())
+
+        elif self.mode == "all" and self.previous is not None:
+            logging.debug("Get entities changed since {}".format(self.previous))
+            scanner = IncrementalScanner(sparql, library, fallback, scheduler)
+            with report.phase("changed entities"):
+                rdf.state = scanner.scan(AbstractionState.load(self.previous))
+            with report.phase("entities and relations"):
+                rdf.add_entities_and_relations(rdf.state.relation_rows())
+            with report.phase("attributes"):
+                rdf.add_attributes(rdf.state.attribute_rows())
+
+        elif self.mode == "all":
+            logging.debug("Get entities and relation")
+            with report.phase("entities and relations"):
+                rdf.add_entities_and_relations(fallback.rows("relations"))
+            logging.debug("Get decimal and text attributes")
+            with report.phase("attributes"):
+                rdf.add_attributes(fallback.rows("attributes"))
+
+        elif self.mode == "batch":
+            logging.debug("Get all entities, then, get relations and attributes for each entity")
+            with report.phase("entities"):
+                entities = sparql.process_query(library.get_entities)
+                rdf.add_entities(entities)
+                checked_entities = [entity_row.entity for entity_row in entities if rdf.check_entity(entity_row.entity)]
+
+            # Relations and attributes of batch_size entities per query
+            scanner = BatchScanner(sparql, library, self.batch_size)
+            with report.phase("relations and attributes of entities"):
+                for relations, attributes in scheduler.map(scanner.scan_batch, scanner.batches(checked_entities)):
+                    # relation
+                    for relation_row in relations:
+                        rdf.add_relation(relation_row.entity, relation_row.relation, relation_row.target_entity)
+                    # numeric and text attributes
+                    for attribute_row in attributes:
+                        rdf.add_attribute(attribute_row.entity, attribute_row.attribute, decimal=rdf.is_decimal(attribute_row.datatype))
+
+        elif self.mode == "owl" and self.engine == "native":
+            logging.debug("Use OWL ontology, with triple pattern lookups")
+            native = NativeEngine(sparql.rdf_source)
+            with report.phase("ontologies"):
+                ontologies = native.ontologies()
+            with report.phase("relations and attributes of ontologies"):
+                for ontology in ontologies:
+                    logging.debug(ontology)
+                    rdf.add_entities_and_relations(native.entities_and_relations_with_ontology(ontology))
+                    rdf.add_attributes(native.entities_and_attributes_with_ontology(ontology))
+
+        elif self.mode == "owl":
+            logging.debug("Use OWL ontology")
+            with report.phase("ontologies"):
+                ontologies = [row.ontology for row in sparql.process_query(library.ontologies)]
+
+            def ontology_queries(ontology):
+                return (
+                    sparql.process_query(library.entities_and_relations_with_ontology(ontology)),
+                    sparql.process_query(library.entities_and_attributes_with_ontology(ontology))
+                )
+
+            with report.phase("relations and attributes of ontologies"):
+                for ontology, (relations, attributes) in zip(ontologies, scheduler.map(ontology_queries, ontologies)):
+                    logging.debug(ontology)
+                    logging.debug("Get entities and relation")
+                    rdf.add_entities_and_relations(relations)
+                    logging.debug("Get decimal and text attributes")
+                    rdf.add_attributes(attributes)
+
+        elif self.mode == "sample":
+            logging.debug("Get all entities, then, sample instances of each entity")
+            rdf.set_sample(self.sample_size, self.sample_method)
+            with report.phase("entities"):
+                entities = [row.entity for row in sparql.process_query(library.get_entities) if rdf.check_entity(row.entity)]
+
+            sampler = InstanceSampler(sparql, library, self.sample_size, self.sample_method)
+            with report.phase("relations and attributes of samples"):
+                for relations, attributes in scheduler.map(sampler.abstract_entity, entities):
+                    rdf.add_entities_and_relations(relations)
+                    rdf.add_attributes(attributes)
+
+        elif self.mode == "predicate":
+            logging.debug("Get all predicates, then, get relations and attributes for each predicate")
+            scanner = PredicateScanner(sparql, library, fallback)
+            with report.phase("predicates"):
+                predicates = scanner.predicates()
+
+            with report.phase("relations and attributes of predicates"):
+                for relations, attributes in scheduler.map(scanner.scan_predicate, predicates):
+                    rdf.add_entities_and_relations(relations)
+                    rdf.add_attributes(attributes)
+
+        elif self.mode == "askomics":
+            logging.debug("Use AskOmics ontology")
+            library.askomics_ns = askomics_ns
+            logging.debug("Get Askomics entities")
+            with report.phase("askomics entities"):
+                rdf.add_entities_askomics(sparql.iter_query(library.entities_askomics))
+            logging.debug("Get Askomics relations")
+            with report.phase("askomics relations"):
+                rdf.add_relations_askomics(sparql.iter_query(library.relations_askomics))
+            logging.debug("Get Askomics attributes")
+            with report.phase("askomics attributes"):
+                rdf.add_attributes_askomics(sparql.iter_query(library.attributes_askomics))
+            logging.debug("Get Askomics categories")
+            with report.phase("askomics categories"):
+                rdf.add_categories_askomics(sparql.iter_query(library.categories_askomics))
+
+        for gap in fallback.gaps:
+            rdf.add_gap(gap)
+
+        if journal is not None:
+            journal.close()
+
+        return rdf
@@ -0,0 +1,555 @@
+import collections
+import contextlib
+import fnmatch
+import io
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from libabstractor.Abstraction import Abstraction
+from libabstractor.FileChunker import FileChunker
+from libabstractor.RunReport import RunReport
+from libabstractor.TripleWriter import TripleWriter
+
+
+class ChunkedStream(io.RawIOBase):
+    """Binary stream writing HTTP chunks (chunked transfer encoding)
+
+    Closing the stream writes the last chunk, the underlying stream is kept
+    open.
+
+    Attributes
+    ----------
+    stream : file-like
+        Binary stream of the HTTP response
+    """
+
+    def __init__(self, stream):
+        """Init
+
+        Parameters
+        ----------
+        stream : file-like
+            Binary stream of the HTTP response
+        """
+        super().__init__()
+        self.stream = stream
+
+    def writable(self):
+        """The stream is writable"""
+        return True
+
+    def write(self, data):
+        """Write a chunk
+
+        Parameters
+        ----------
+        data : bytes
+            Content of the chunk
+
+        Returns
+        -------
+        int
+            Number of bytes written
+        """
+        size = len(data)
+        if size:
+            self.stream.write("{:x}\r\n".format(size).encode("ascii") + bytes(data) + b"\r\n")
+        return size
+
+    def close(self):
+        """Write the last chunk"""
+        if not self.closed:
+            self.stream.write(b"0\r\n\r\n")
+        super().close()
+
+
+class WarmSource(object):
+    """Source kept loaded across the jobs of the service
+
+    Attributes
+    ----------
+    source : str
+        SPARQL endpoint url, or path of RDF files
+    source_type : str
+        Source format
+    sparql : SparqlQuery
+        The source, connected (None until the first job)
+    version : tuple
+        Paths and modification times of the files, when they were parsed
+    lock : threading.Lock
+        Held while the source is loaded, and during the jobs on files
+        (rdflib queries are not thread safe)
+    """
+
+    def __init__(self, source, source_type):
+        """Init
+
+        Parameters
+        ----------
+        source : str
+            SPARQL endpoint url, or path of RDF files
+        source_type : str
+            Source format
+        """
+        self.source = source
+        self.source_type = source_type
+        self.sparql = None
+        self.version = None
+        self.lock = threading.Lock()
+
+    def get_version(self):
+        """Get the version of the files of the source
+
+        Returns
+        -------
+        tuple
+            Paths and modification times of the files (None for an endpoint)
+        """
+        if self.source_type == "sparql":
+            return None
+        return tuple((path, os.path.getmtime(path)) for path in FileChunker.files(self.source))
+
+    def close(self):
+        """Close the idle connections to the endpoint"""
+        if self.sparql is not None and self.sparql.transport is not None:
+            self.sparql.transport.close()
+
+
+class AbstractionService(object):
+    """Abstraction jobs sharing warm sources and a results cache
+
+    Files parsed into rdflib graphs and connections to endpoints are kept
+    (up to max_sources, least recently used first evicted), so the next job
+    on the same source skips the load. Files modified since they were parsed
+    are parsed again. At most max_jobs jobs run at once, the others wait.
+
+    A job is a dict: source (str, or list of sources), source_type (str, or
+    list: one per source), output_format (nt, turtle or xml), and options of
+    Abstraction (see job_options).
+
+    Jobs can read any file of source_root, and query any endpoint. With
+    allowed_sources, sources must also match one of its prefixes or glob
+    patterns. The service has no authentication: clients are trusted.
+
+    Attributes
+    ----------
+    cache : QueryCache
+        Cache of endpoint results shared by jobs (None to disable)
+    max_jobs : int
+        Number of jobs running at once
+    max_sources : int
+        Number of sources kept loaded
+    sources : OrderedDict
+        Source key -> WarmSource, least recently used first
+    stats : dict
+        Number of running, waiting, done and failed jobs
+    source_root : str
+        Directory of the files jobs can read (real path)
+    allowed_sources : list
+        Prefixes or glob patterns of allowed sources, endpoint urls or
+        absolute paths (None to allow all endpoints and files of source_root)
+    """
+
+    # Option -> JSON type ("list" is a list of strings, "number?" may be null)
+    job_options = {
+        "mode": "string",
+        "engine": "string",
+        "askomics_namespace": "string",
+        "label_strategy": "string",
+        "label_namespaces": "list",
+        "excluded_namespaces": "list",
+        "page_size": "integer",
+        "http_method": "string",
+        "gzip": "boolean",
+        "jobs": "integer",
+        "timeout": "number?",
+        "retries": "integer",
+        "batch_size": "integer",
+        "sample_size": "integer",
+        "sample_method": "string"
+    }
+    output_formats = ("nt", "turtle", "xml")
+
+    def __init__(self, cache=None, max_jobs=2, max_sources=16, source_root=None, allowed_sources=None):
+        """Init
+
+        Parameters
+        ----------
+        cache : QueryCache, optional
+            Cache of endpoint results shared by jobs
+        max_jobs : int, optional
+            Number of jobs running at once
+        max_sources : int, optional
+            Number of sources kept loaded
+        source_root : str, optional
+            Directory of the files jobs can read (default: current directory)
+        allowed_sources : list, optional
+            Prefixes or glob patterns of allowed sources
+        """
+        self.cache = cache
+        self.source_root = os.path.realpath(source_root or os.getcwd())
+        self.allowed_sources = allowed_sources or None
+        self.max_jobs = max(1, max_jobs)
+        self.max_sources = max(1, max_sources)
+        self.sources = collections.OrderedDict()
+        self.slots = threading.Semaphore(self.max_jobs)
+        self.lock = threading.Lock()
+        self.stats = {"running": 0, "waiting": 0, "done": 0, "failed": 0}
+
+    def count(self, name, increment=1):
+        """Update a counter of stats"""
+        with self.lock:
+            self.stats[name] += increment
+
+    def status(self):
+        """Get the status of the service
+
+        Returns
+        -------
+        dict
+            Stats of jobs, and sources kept loaded
+        """
+        with self.lock:
+            status = dict(self.stats, max_jobs=self.max_jobs)
+            status["sources"] = [{"source": warm.source, "type": warm.source_type, "loaded": warm.sparql is not None} for warm in self.sources.values()]
+        return status
+
+    @staticmethod
+    def check_option(name, value, option_type):
+        """Check the JSON type of an option of a job
+
+        Parameters
+        ----------
+        name : str
+            Option
+        value : object
+            Value of the option
+        option_type : str
+            Expected type (see job_options)
+
+        Raises
+        ------
+        ValueError
+            Value of another type
+        """
+        if option_type.endswith("?"):
+            if value is None:
+                return
+            option_type = option_type[:-1]
+        # bool is an int in Python, not in JSON
+        valid = {
+            "string": isinstance(value, str),
+            "boolean": isinstance(value, bool),
+            "integer": isinstance(value, int) and not isinstance(value, bool),
+            "number": isinstance(value, (int, float)) and not isinstance(value, bool),
+            "list": isinstance(value, list) and all(isinstance(item, str) for item in value)
+        }[option_type]
+        if not valid:
+            raise ValueError("option {} must be {}".format(name, {"integer": "an integer", "list": "a list of strings"}.get(option_type, "a " + option_type)))
+
+    def check_source(self, source, source_type):
+        """Check that a job can read a source
+
+        Parameters
+        ----------
+        source : str
+            SPARQL endpoint url, or path of RDF files
+        source_type : str
+            Source format
+
+        Raises
+        ------
+        PermissionError
+            Source not allowed: endpoint url not matching allowed_sources, or
+            file outside of source_root
+        """
+        if source_type == "sparql":
+            if not source.lower().startswith(("http://", "https://")):
+                raise PermissionError("endpoint {} is not an http or https url".format(source))
+        else:
+            source = os.path.abspath(source)
+            # symbolic links are followed, a file of the glob pattern or directory can be elsewhere
+            for path in [source] + [os.path.realpath(path) for path in FileChunker.files(source)]:
+                if os.path.commonpath([self.source_root, path]) != self.source_root:
+                    raise PermissionError("source {} is outside of {}".format(source, self.source_root))
+
+        if self.allowed_sources is not None and not any(
+                source.startswith(pattern) or fnmatch.fnmatchcase(source, pattern) for pattern in self.allowed_sources):
+            raise PermissionError("source {} is not allowed".format(source))
+
+    def parse_job(self, job):
+        """Check a job
+
+        Parameters
+        ----------
+        job : dict
+            The job
+
+        Returns
+        -------
+        tuple
+            Sources (list of tuples: source, source type), output format, and
+            Abstraction
+
+        Raises
+        ------
+        ValueError
+            Invalid job
+        PermissionError
+            Source not allowed (see check_source)
+        """
+        if not isinstance(job, dict) or not job.get("source"):
+            raise ValueError("a job is a JSON object with a source")
+        sources = job["source"] if isinstance(job["source"], list) else [job["source"]]
+        if not all(isinstance(source, str) for source in sources):
+            raise ValueError("source must be a string or a list of strings")
+        source_types = job.get("source_type", "sparql")
+        source_types = source_types if isinstance(source_types, list) else [source_types] * len(sources)
+        if len(source_types) != len(sources):
+            raise ValueError("give one source_type for all sources, or one per source")
+        for source_type in source_types:
+            if source_type not in ("sparql", "xml", "turtle", "nt"):
+                raise ValueError("unknown source type {}".format(source_type))
+
+        output_format = job.get("output_format", "turtle")
+        if output_format not in self.output_formats:
+            raise ValueError("unknown output format {}".format(output_format))
+
+        options = {name: value for name, value in job.items() if name not in ("source", "source_type", "output_format")}
+        for name, value in options.items():
+            if name not in self.job_options:
+                raise ValueError("unknown option {}".format(name))
+            self.check_option(name, value, self.job_options[name])
+        abstraction = Abstraction(**options)
+        if abstraction.engine == "stream" and any(source_type not in FileChunker.source_types for source_type in source_types):
+            raise ValueError("stream engine is only available for nt and turtle files")
+        if abstraction.engine == "native" and "sparql" in source_types:
+            raise ValueError("native engine is only available for files")
+        for source, source_type in zip(sources, source_types):
+            self.check_source(source, source_type)
+        return list(zip(sources, source_types)), output_format, abstraction
+
+    def get_source(self, abstraction, source, source_type):
+        """Get a warm source, and mark it as most recently used
+
+        Parameters
+        ----------
+        abstraction : Abstraction
+            Abstraction of the job (options of the connection)
+        source : str
+            SPARQL endpoint url, or path of RDF files
+        source_type : str
+            Source format
+
+        Returns
+        -------
+        WarmSource
+            The source (maybe not loaded yet)
+        """
+        key = (source, source_type, abstraction.page_size, abstraction.http_method, abstraction.gzip, abstraction.timeout, abstraction.retries)
+        with self.lock:
+            warm = self.sources.pop(key, None) or WarmSource(source, source_type)
+            self.sources[key] = warm
+            while len(self.sources) > self.max_sources:
+                _, evicted = self.sources.popitem(last=False)
+                logging.info("Unload {}".format(evicted.source))
+                evicted.close()
+        return warm
+
+    def abstract_source(self, abstraction, source, source_type, report):
+        """Abstract a source, with a warm SparqlQuery
+
+        Parameters
+        ----------
+        abstraction : Abstraction
+            Abstraction of the job
+        source : str
+            SPARQL endpoint url, or path of RDF files
+        source_type : str
+            Source format
+        report : RunReport
+            Report of the job
+
+        Returns
+        -------
+        RdfGraph
+            The abstraction
+        """
+        if abstraction.engine == "stream":
+            return abstraction.abstract(source, source_type, report)
+
+        warm = self.get_source(abstraction, source, source_type)
+        with warm.lock:
+            version = warm.get_version()
+            if warm.sparql is None or warm.version != version:
+                logging.info("Load {}".format(source))
+                with report.phase("load"):
+                    # Shared by jobs: queries are not recorded in their reports
+                    warm.sparql = abstraction.connect(source, source_type, self.cache)
+                warm.version = version
+            sparql = warm.sparql
+
+        with warm.lock if source_type != "sparql" else contextlib.nullcontext():
+            return abstraction.abstract(source, source_type, report, sparql=sparql)
+
+    def abstract(self, sources, abstraction):
+        """Run a job, when a slot is free
+
+        Parameters
+        ----------
+        sources : list
+            Sources (tuples: source, source type)
+        abstraction : Abstraction
+            Abstraction of the job
+
+        Returns
+        -------
+        RdfGraph
+            The abstraction (merged abstraction of all sources)
+        """
+        self.count("waiting")
+        with self.slots:
+            self.count("waiting", -1)
+            self.count("running")
+            start = time.perf_counter()
+            try:
+                report = RunReport()
+                rdf = self.abstract_source(abstraction, *sources[0], report)
+                for source, source_type in sources[1:]:
+                    rdf.update(self.abstract_source(abstraction, source, source_type, report).model)
+            except Exception:
+                self.count("failed")
+                raise
+            finally:
+                self.count("running", -1)
+            self.count("done")
+        logging.info("Abstraction of {} ({} mode) in {:.2f}s".format(", ".join(source for source, _ in sources), abstraction.mode, time.perf_counter() - start))
+        return rdf
+
+
+class AbstractionHandler(BaseHTTPRequestHandler):
+    """HTTP API of the service
+
+    POST /abstract with a JSON job (see AbstractionService) returns the
+    abstraction, streamed with chunked transfer encoding. GET /status returns
+    the status of the service, as JSON. Errors are JSON objects with an error
+    message.
+    """
+
+    protocol_version = "HTTP/1.1"
+    content_types = {"nt": "application/n-triples", "turtle": "text/turtle", "xml": "application/rdf+xml"}
+
+    def log_message(self, message_format, *args):
+        """Log requests with the logging module"""
+        logging.debug(message_format % args)
+
+    def send_json(self, status, data):
+        """Send a JSON response
+
+        Parameters
+        ----------
+        status : int
+            HTTP status
+        data : dict
+            Response body
+        """
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_abstraction(self, rdf, output_format):
+        """Stream an abstraction
+
+        Parameters
+        ----------
+        rdf : RdfGraph
+            The abstraction
+        output_format : str
+            nt, turtle or xml
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", self.content_types[output_format])
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        with io.BufferedWriter(ChunkedStream(self.wfile), buffer_size=65536) as stream:
+            if output_format in TripleWriter.formats:
+                with io.TextIOWrapper(stream, encoding="utf-8") as text_stream:
+                    TripleWriter.create(output_format, text_stream, rdf.prefixes, unique=True).write_all(rdf.triples())
+            else:
+                stream.write(rdf.graph.serialize(format=output_format, encoding="utf-8"))
+
+    def do_GET(self):
+        """GET request"""
+        if self.path != "/status":
+            self.send_json(404, {"error": "unknown path {}".format(self.path)})
+            return
+        self.send_json(200, self.server.service.status())
+
+    def do_POST(self):
+        """POST request: an abstraction job"""
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path != "/abstract":
+            self.send_json(404, {"error": "unknown path {}".format(self.path)})
+            return
+        try:
+            sources, output_format, abstraction = self.server.service.parse_job(json.loads(data.decode("utf-8")))
+        except PermissionError as e:
+            self.send_json(403, {"error": str(e)})
+            return
+        except (ValueError, TypeError) as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        try:
+            rdf = self.server.service.abstract(sources, abstraction)
+        except Exception as e:
+            logging.exception("Abstraction failed")
+            self.send_json(500, {"error": str(e) or type(e).__name__})
+            return
+        self.send_abstraction(rdf, output_format)
+
+
+class AbstractionServer(ThreadingHTTPServer):
+    """HTTP server of an AbstractionService, on a TCP port or a Unix socket
+
+    Attributes
+    ----------
+    service : AbstractionService
+        The service
+    """
+
+    def __init__(self, address, service):
+        """Init
+
+        Parameters
+        ----------
+        address : tuple or str
+            Host and port, or path of a Unix socket
+        service : AbstractionService
+            The service
+        """
+        if isinstance(address, str):
+            self.address_family = socket.AF_UNIX
+            # Remove the socket of a previous server
+            if os.path.exists(address) and stat.S_ISSOCK(os.stat(address).st_mode):
+                os.remove(address)
+        self.service = service
+        super().__init__(address, AbstractionHandler)
+
+    def server_bind(self):
+        """Bind the socket"""
+        if not isinstance(self.server_address, str):
+            super().server_bind()
+            return
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import logging
+import os
+
+from libabstractor.ResultRow import ResultRow
+
+import rdflib
+
+
+RELATION_VARIABLES = ("source_entity", "relation", "target_entity", "mother_source", "mother_target")
+ATTRIBUTE_VARIABLES = ("entity", "attribute", "datatype")
+GENERATED_AT_TIME = rdflib.URIRef("http://www.w3.org/ns/prov#generatedAtTime")
+
+
+class AbstractionState(object):
+    """State of an abstraction, saved next to it for incremental runs
+
+    The state is written into <abstraction>.state.json. It holds a fingerprint
+    of each entity of the source (number of instances, of triples and of
+    predicates of its instances, and its parents), the rows of the all mode
+    queries of each entity, and a digest of the abstraction. An incremental
+    run queries relations and attributes of the entities whose fingerprint
+    changed, and of the entities with relations to them, and takes the rows
+    of the other entities from the state (see IncrementalScanner). Changes
+    keeping the counts of an entity equal are not detected: remove the state
+    to run a full scan.
+
+    Attributes
+    ----------
+    fingerprints : dict
+        Entity URI -> fingerprint (list of counts, then parents)
+    relations : dict
+        Entity URI -> rows of entities_and_relations (lists)
+    attributes : dict
+        Entity URI -> rows of entities_and_attributes (lists)
+    digest : str
+        SHA-256 of the canonical abstraction, without its generation date
+    """
+
+    version = 2
+
+    def __init__(self, fingerprints=None, relations=None, attributes=None, digest=None):
+        """Init
+
+        Parameters
+        ----------
+        fingerprints : dict, optional
+            Entity URI -> fingerprint
+        relations : dict, optional
+            Entity URI -> rows of entities_and_relations
+        attributes : dict, optional
+            Entity URI -> rows of entities_and_attributes
+        digest : str, optional
+            SHA-256 of the canonical abstraction
+        """
+        self.fingerprints = fingerprints or {}
+        self.relations = relations or {}
+        self.attributes = attributes or {}
+        self.digest = digest
+
+    @staticmethod
+    def get_path(abstraction_path):
+        """Get the path of the state of an abstraction
+
+        Parameters
+        ----------
+        abstraction_path : str
+            Path of the abstraction
+
+        Returns
+        -------
+        str
+            Path of the state
+        """
+        return abstraction_path + ".state.json"
+
+    @classmethod
+    def load(cls, abstraction_path):
+        """Load the state of an abstraction
+
+        Parameters
+        ----------
+        abstraction_path : str
+            Path of the abstraction
+
+        Returns
+        -------
+        AbstractionState
+            The state, or None if the abstraction has no readable state
+        """
+        path = cls.get_path(abstraction_path)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as state_file:
+                data = json.load(state_file)
+        except ValueError as e:
+            logging.warning("Ignore unreadable state {}: {}".format(path, e))
+            return None
+        if data.get("version") != cls.version:
+            logging.warning("Ignore state {} of another version".format(path))
+            return None
+        return cls(data["fingerprints"], data["relations"], data["attributes"], data["digest"])
+
+    def write(self, abstraction_path):
+        """Write the state of an abstraction
+
+        Parameters
+        ----------
+        abstraction_path : str
+            Path of the abstraction
+        """
+        data = {
+            "version": self.version,
+            "digest": self.digest,
+            "fingerprints": self.fingerprints,
+            "relations": self.relations,
+            "attributes": self.attributes
+        }
+        path = self.get_path(abstraction_path)
+        # Replace the state atomically, it may be the state of the previous abstraction
+        with open(path + ".tmp", "w", encoding="utf-8") as state_file:
+            json.dump(data, state_file, separators=(",", ":"), sort_keys=True)
+        os.replace(path + ".tmp", path)
+
+    def changed_entities(self, fingerprints):
+        """Get the entities whose fingerprint changed
+
+        Parameters
+        ----------
+        fingerprints : dict
+            Entity URI -> current fingerprint
+
+        Returns
+        -------
+        list
+            URIs of new and changed entities, sorted
+        """
+        return sorted(entity for entity, fingerprint in fingerprints.items() if self.fingerprints.get(entity) != fingerprint)
+
+    def relation_sources(self, entities):
+        """Get the entities with relations to some entities
+
+        Parameters
+        ----------
+        entities : set
+            Target entities URIs
+
+        Returns
+        -------
+        set
+            URIs of the entities whose rows have one of the targets
+        """
+        target = RELATION_VARIABLES.index("target_entity")
+        return set(entity for entity, rows in self.relations.items() if any(row[target] in entities for row in rows))
+
+    def add_rows(self, entity, relations, attributes):
+        """Record the rows of an entity
+
+        Parameters
+        ----------
+        entity : str
+            Entity URI
+        relations : iterable
+            Rows of entities_and_relations
+        attributes : iterable
+            Rows of entities_and_attributes
+        """
+        self.relations[entity] = [list(row) for row in relations]
+        self.attributes[entity] = [list(row) for row in attributes]
+
+    def relation_rows(self):
+        """Get the rows of entities_and_relations of all entities
+
+        Yields
+        ------
+        tuple
+            Rows (see ResultRow)
+        """
+        for rows in self.relations.values():
+            for row in rows:
+                yield ResultRow.from_values(RELATION_VARIABLES, row)
+
+    def attribute_rows(self):
+        """Get the rows of entities_and_attributes of all entities
+
+        Yields
+        ------
+        tuple
+            Rows (see ResultRow)
+        """
+        for rows in self.attributes.values():
+            for row in rows:
+                yield ResultRow.from_values(ATTRIBUTE_VARIABLES, row)
+
+    @staticmethod
+    def canonical(triples):
+        """Sort triples in a canonical order
+
+        Parameters
+        ----------
+        triples : iterable
+            Triples (rdflib terms)
+
+        Returns
+        -------
+        list
+            Sorted tuples: N-Triples line, triple
+        """
+        return sorted(set((" ".join(term.n3() for term in triple) + " .", triple) for triple in triples), key=lambda item: item[0])
+
+    @staticmethod
+    def get_digest(canonical):
+        """Get the digest of an abstraction, without its generation date
+
+        Parameters
+        ----------
+        canonical : list
+            The abstraction (see canonical)
+
+        Returns
+        -------
+        str
+            SHA-256 of the N-Triples lines
+        """
+        digest = hashlib.sha256()
+        for line, triple in canonical:
+            if triple[1] != GENERATED_AT_TIME:
+                digest.update(line.encode("utf-8") + b"\n")
+        return digest.hexdigest()
+
+    @staticmethod
+    def diff(previous_path, previous_format, canonical):
+        """Compare an abstraction with the previous one
+
+        Triples with blank nodes (provenance of the abstraction) are not
+        compared.
+
+        Parameters
+        ----------
+        previous_path : str
+            Path of the previous abstraction
+        previous_format : str
+            Format of the previous abstraction (xml, turtle or nt)
+        canonical : list
+            The abstraction (see canonical)
+
+        Returns
+        -------
+        tuple
+            Added and removed N-Triples lines, sorted
+        """
+        previous = rdflib.Graph()
+        previous.parse(previous_path, format=previous_format)
+        previous_lines = set(" ".join(term.n3() for term in triple) + " ." for triple in previous if not any(isinstance(term, rdflib.BNode) for term in triple))
+        lines = set(line for line, triple in canonical if not any(isinstance(term, rdflib.BNode) for term in triple))
+        return sorted(lines - previous_lines), sorted(previous_lines - lines)
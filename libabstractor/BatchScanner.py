@@ -0,0 +1,114 @@
+import logging
+
+from libabstractor.HttpTransport import EndpointError
+
+
+class BatchScanner(object):
+    """Get relations and attributes of entities, by batches of entities
+
+    The queries of the batch mode are sent for `batch_size` entities at
+    once (VALUES clause), and rows have an entity column. If the endpoint
+    rejects a batch (query too large, timeout, server error), the batch is
+    split in two, and the batch size of the next batches is reduced.
+
+    Attributes
+    ----------
+    sparql : SparqlQuery
+        Source
+    library : QueryLibrary
+        Queries
+    batch_size : int
+        Number of entities per query
+    """
+
+    def __init__(self, sparql, library, batch_size=10):
+        """Init
+
+        Parameters
+        ----------
+        sparql : SparqlQuery
+            Source
+        library : QueryLibrary
+            Queries
+        batch_size : int, optional
+            Number of entities per query
+        """
+        self.sparql = sparql
+        self.library = library
+        self.batch_size = max(1, batch_size)
+
+    def batches(self, entities):
+        """Split entities into batches
+
+        Parameters
+        ----------
+        entities : list
+            Entities URIs
+
+        Returns
+        -------
+        list
+            Batches (lists of entities URIs)
+        """
+        return [entities[start:start + self.batch_size] for start in range(0, len(entities), self.batch_size)]
+
+    def is_rejected(self, error):
+        """Check if a batch may succeed if split
+
+        Parameters
+        ----------
+        error : Exception
+            Error of the batch
+
+        Returns
+        -------
+        bool
+            True if the error may come from the size of the batch
+        """
+        return (isinstance(error, EndpointError) and error.too_large) or self.sparql.is_transient(error)
+
+    def query(self, query_builder, entities):
+        """Get rows of a query on a batch of entities
+
+        Parameters
+        ----------
+        query_builder : callable
+            QueryLibrary method, called with a list of entities
+        entities : list
+            Entities URIs
+
+        Returns
+        -------
+        list
+            Rows
+        """
+        rows = []
+        for batch in self.batches(entities):
+            try:
+                rows += self.sparql.process_query(query_builder(batch))
+            except Exception as e:
+                if len(batch) == 1 or not self.is_rejected(e):
+                    raise
+                self.batch_size = max(1, min(self.batch_size, len(batch) // 2))
+                logging.warning("Query on {} entities failed, retry with batches of {} entities: {}".format(len(batch), self.batch_size, e))
+                rows += self.query(query_builder, batch)
+        return rows
+
+    def scan_batch(self, entities):
+        """Get relations and attributes of a batch of entities
+
+        Parameters
+        ----------
+        entities : list
+            Entities URIs
+
+        Returns
+        -------
+        tuple
+            Rows of relations (entity, relation, target_entity) and
+            attributes (entity, attribute, datatype)
+        """
+        return (
+            self.query(self.library.get_relation_for_entities, entities),
+            self.query(self.library.get_attribute_for_entities, entities)
+        )
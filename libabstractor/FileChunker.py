@@ -0,0 +1,191 @@
+import glob
+import os
+import re
+from collections import namedtuple
+
+
+Chunk = namedtuple("Chunk", ("path", "source_type", "start", "end", "header"))
+
+DIRECTIVE_PATTERN = re.compile(rb'^\s*(@prefix|@base|prefix|base)\b', re.IGNORECASE | re.MULTILINE)
+
+
+class FileChunker(object):
+    """Split RDF files into chunks that can be parsed independently
+
+    N-Triples files are split at line boundaries. Turtle files are split after
+    lines ending a statement (" ."), and the prefix and base directives at the
+    top of the file are given with each chunk (see Chunk.header). A turtle
+    file that does not fit this layout (directives after the first statement,
+    multi-line literals across a split) gives a chunk that fails to parse: the
+    caller has to fall back to a parsing of the whole file.
+
+    Attributes
+    ----------
+    source : str
+        A file, a directory, or a glob pattern of files
+    source_type : str
+        Format of the files (nt or turtle)
+    chunk_size : int
+        Approximate size of chunks, in bytes
+    """
+
+    source_types = ("nt", "turtle")
+
+    def __init__(self, source, source_type, chunk_size=64 * 1024 * 1024):
+        """Init
+
+        Parameters
+        ----------
+        source : str
+            A file, a directory, or a glob pattern of files
+        source_type : str
+            Format of the files (nt or turtle)
+        chunk_size : int, optional
+            Approximate size of chunks, in bytes
+        """
+        self.source = source
+        self.source_type = source_type
+        self.chunk_size = chunk_size
+
+    @staticmethod
+    def files(source):
+        """Get the files of a source
+
+        Parameters
+        ----------
+        source : str
+            A file, a directory (all its files, recursively), or a glob pattern
+
+        Returns
+        -------
+        list
+            Paths, sorted
+        """
+        if os.path.isdir(source):
+            return sorted(os.path.join(directory, name) for directory, _, names in os.walk(source) for name in names)
+        if glob.has_magic(source):
+            return sorted(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+        return [source]
+
+    @staticmethod
+    def is_end_of_statement(line):
+        """Check if a turtle line ends a statement
+
+        Parameters
+        ----------
+        line : bytes
+            The line
+
+        Returns
+        -------
+        bool
+            True if a chunk can start after this line
+        """
+        line = line.rstrip()
+        return line.endswith(b".") and not line.endswith((b'"""', b"'''")) and not line.lstrip().startswith(b"#")
+
+    def read_header(self, stream):
+        """Read the directives and comments at the top of a turtle file
+
+        Parameters
+        ----------
+        stream : file
+            The file, opened in binary mode, at its beginning
+
+        Returns
+        -------
+        bytes
+            The directives
+        """
+        header = []
+        while True:
+            position = stream.tell()
+            line = stream.readline()
+            stripped = line.strip()
+            if not line or (stripped and not stripped.startswith(b"#") and not DIRECTIVE_PATTERN.match(line)):
+                stream.seek(position)
+                return b"".join(header)
+            header.append(line)
+
+    def next_boundary(self, stream, offset, size):
+        """Get the start of the first chunk after an offset
+
+        Parameters
+        ----------
+        stream : file
+            The file, opened in binary mode
+        offset : int
+            Offset of the chunk split
+        size : int
+            Size of the file
+
+        Returns
+        -------
+        int
+            Offset of the next chunk (size if there is none)
+        """
+        if offset >= size:
+            return size
+        stream.seek(offset - 1)
+        # The previous character ends a line: the line starting at offset is complete
+        if stream.read(1) != b"\n":
+            stream.readline()
+        if self.source_type == "nt":
+            return stream.tell()
+        while True:
+            line = stream.readline()
+            if not line:
+                return size
+            if self.is_end_of_statement(line):
+                return stream.tell()
+
+    def file_chunks(self, path):
+        """Split a file into chunks
+
+        Parameters
+        ----------
+        path : str
+            The file
+
+        Yields
+        ------
+        Chunk
+            Chunks of the file
+        """
+        size = os.path.getsize(path)
+        with open(path, "rb") as stream:
+            header = self.read_header(stream) if self.source_type == "turtle" else b""
+            start = stream.tell()
+            while start < size:
+                end = self.next_boundary(stream, start + self.chunk_size, size)
+                yield Chunk(path, self.source_type, start, end, header)
+                start = end
+
+    def chunks(self):
+        """Split all files of the source into chunks
+
+        Yields
+        ------
+        Chunk
+            Chunks of the files
+        """
+        for path in self.files(self.source):
+            yield from self.file_chunks(path)
+
+    @staticmethod
+    def read(chunk):
+        """Read a chunk
+
+        Parameters
+        ----------
+        chunk : Chunk
+            The chunk
+
+        Returns
+        -------
+        bytes
+            Content of the chunk (without its header)
+        """
+        with open(chunk.path, "rb") as stream:
+            stream.seek(chunk.start)
+            return stream.read(chunk.end - chunk.start)
@@ -0,0 +1,456 @@
+import base64
+import contextlib
+import gzip
+import http.client
+import logging
+import queue
+import socket
+import time
+import urllib.parse
+import urllib.request
+
+
+class EndpointError(Exception):
+    """Error returned by a SPARQL endpoint
+
+    Attributes
+    ----------
+    status : int
+        HTTP status code (None if the endpoint did not answer)
+    """
+
+    def __init__(self, message, status=None):
+        """Init
+
+        Parameters
+        ----------
+        message : str
+            Error message
+        status : int, optional
+            HTTP status code
+        """
+        super().__init__(message)
+        self.status = status
+
+    @property
+    def transient(self):
+        """True if the query may succeed if sent again (network error, server error or timeout)
+
+        Returns
+        -------
+        bool
+            True if the error is transient
+        """
+        return self.status is None or self.status in (408, 429) or self.status >= 500
+
+    @property
+    def too_large(self):
+        """True if the endpoint may have rejected the query for its size (bad request, URI or payload too large)
+
+        Returns
+        -------
+        bool
+            True if a smaller query may succeed
+        """
+        return self.status in (400, 413, 414, 431)
+
+
+class DeadlineStream(object):
+    """Response body of a query, read before a deadline
+
+    Each read returns the data already received (read1), and waits at most
+    until the deadline, so an endpoint sending its response slowly can't
+    exceed it.
+
+    Attributes
+    ----------
+    response : http.client.HTTPResponse
+        The response
+    connection : http.client.HTTPConnection
+        Connection of the response
+    deadline : float
+        time.monotonic() deadline
+    message : str
+        Error message if the deadline is exceeded
+    """
+
+    def __init__(self, response, connection, deadline, message):
+        """Init
+
+        Parameters
+        ----------
+        response : http.client.HTTPResponse
+            The response
+        connection : http.client.HTTPConnection
+            Connection of the response
+        deadline : float
+            time.monotonic() deadline
+        message : str
+            Error message if the deadline is exceeded
+        """
+        self.response = response
+        self.connection = connection
+        self.deadline = deadline
+        self.message = message
+
+    def read(self, size=-1):
+        """Read data of the response
+
+        Parameters
+        ----------
+        size : int, optional
+            Maximum number of bytes (all the response if negative)
+
+        Returns
+        -------
+        bytes
+            Data (empty at the end of the response)
+
+        Raises
+        ------
+        EndpointError
+            If the deadline is exceeded (transient error)
+        """
+        if size is None or size < 0:
+            return b"".join(iter(lambda: self.read(HttpTransport.chunk_size), b""))
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise EndpointError(self.message)
+        if self.connection.sock is not None:
+            self.connection.sock.settimeout(remaining)
+        try:
+            return self.response.read1(size)
+        except socket.timeout:
+            raise EndpointError(self.message)
+
+
+class HttpTransport(object):
+    """Pool of keep-alive HTTP connections to a SPARQL endpoint
+
+    Connections are reused between queries, so only the first queries pay
+    for the TCP connection and the TLS handshake. The proxies of the
+    http_proxy, https_proxy and no_proxy environment variables are honored.
+
+    Attributes
+    ----------
+    url : str
+        Endpoint url
+    method : str
+        HTTP method used to send queries (GET or POST)
+    gzip : bool
+        Ask the endpoint for gzip compressed responses
+    timeout : float
+        Maximum duration of a query, until its response is fully read, in
+        seconds (None for no timeout)
+    pool_size : int
+        Maximum number of idle connections kept open
+    proxy : urllib.parse.SplitResult
+        Url of the proxy (None to connect directly)
+    proxy_headers : dict
+        Headers sent to the proxy (credentials)
+    redirects : dict
+        Transports to the targets of redirects, by url and method
+    moved : HttpTransport
+        Transport to the target of a permanent redirect, used for the next
+        queries (None if the endpoint has not moved)
+    """
+
+    accept = "application/sparql-results+json,application/json;q=0.9"
+    chunk_size = 65536
+    max_redirects = 5
+    redirect_statuses = (301, 302, 303, 307, 308)
+
+    def __init__(self, url, method="GET", gzip=True, timeout=None, pool_size=1):
+        """Init
+
+        Parameters
+        ----------
+        url : str
+            Endpoint url
+        method : str, optional
+            HTTP method used to send queries (GET or POST)
+        gzip : bool, optional
+            Ask the endpoint for gzip compressed responses
+        timeout : float, optional
+            Maximum duration of a query, in seconds
+        pool_size : int, optional
+            Maximum number of idle connections kept open
+        """
+        self.url = url
+        self.method = method.upper()
+        self.gzip = gzip
+        self.timeout = timeout
+        self.pool_size = max(1, pool_size)
+        self.pool = queue.LifoQueue()
+        self.redirects = {}
+        self.moved = None
+
+        parsed_url = urllib.parse.urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parsed_url.scheme == "https" else http.client.HTTPConnection
+        self.host = parsed_url.hostname
+        self.port = parsed_url.port
+        self.path = parsed_url.path or "/"
+        self.url_parameters = parsed_url.query
+
+        # Proxy of the http_proxy, https_proxy and no_proxy environment variables
+        self.proxy = self.get_proxy(parsed_url.scheme, self.host)
+        self.proxy_headers = {}
+        if self.proxy is not None:
+            logging.debug("Connect to {} through the proxy {}:{}".format(self.host, self.proxy.hostname, self.proxy.port))
+            if self.proxy.username:
+                credentials = "{}:{}".format(urllib.parse.unquote(self.proxy.username), urllib.parse.unquote(self.proxy.password or ""))
+                self.proxy_headers["Proxy-Authorization"] = "Basic " + base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+            if parsed_url.scheme != "https":
+                # Plain HTTP proxies take absolute urls
+                self.path = "{}://{}{}".format(parsed_url.scheme, parsed_url.netloc, self.path)
+
+    @staticmethod
+    def get_proxy(scheme, host):
+        """Get the proxy of an url, from the environment
+
+        Parameters
+        ----------
+        scheme : str
+            Scheme of the url (http or https)
+        host : str
+            Host of the url
+
+        Returns
+        -------
+        urllib.parse.SplitResult
+            Url of the proxy (None if the url is not proxied)
+        """
+        proxy = urllib.request.getproxies().get(scheme)
+        if not proxy or urllib.request.proxy_bypass(host):
+            return None
+        if "://" not in proxy:
+            proxy = "http://" + proxy
+        return urllib.parse.urlsplit(proxy)
+
+    def get_connection(self):
+        """Get an idle connection, or open a new one
+
+        Returns
+        -------
+        http.client.HTTPConnection
+            Connection to the endpoint
+        """
+        try:
+            return self.pool.get_nowait()
+        except queue.Empty:
+            pass
+        if self.proxy is None:
+            return self.connection_class(self.host, self.port, timeout=self.timeout)
+        connection = self.connection_class(self.proxy.hostname, self.proxy.port or 8080, timeout=self.timeout)
+        if self.connection_class is http.client.HTTPSConnection:
+            # HTTPS goes through a CONNECT tunnel
+            connection.set_tunnel(self.host, self.port, headers=self.proxy_headers)
+        return connection
+
+    def release_connection(self, connection):
+        """Put back a connection into the pool
+
+        Parameters
+        ----------
+        connection : http.client.HTTPConnection
+            Connection to the endpoint
+        """
+        if self.pool.qsize() < self.pool_size:
+            self.pool.put(connection)
+        else:
+            connection.close()
+
+    def close(self):
+        """Close all idle connections"""
+        while True:
+            try:
+                self.pool.get_nowait().close()
+            except queue.Empty:
+                break
+        for transport in list(self.redirects.values()):
+            transport.close()
+
+    def get_redirect(self, location, status):
+        """Get the transport to the target of a redirect
+
+        Each target has its own pool of connections. The parameters of the
+        query are removed from the target url, as they are sent again.
+
+        Parameters
+        ----------
+        location : str
+            Location header of the redirect (absolute or relative url)
+        status : int
+            HTTP status of the redirect
+
+        Returns
+        -------
+        HttpTransport
+            Transport to the target
+        """
+        parsed_url = urllib.parse.urlsplit(urllib.parse.urljoin(self.url, location))
+        if parsed_url.scheme not in ("http", "https"):
+            raise EndpointError("{}: redirect to an unsupported url {}".format(self.url, location), status)
+        if parsed_url.query:
+            parameters = urllib.parse.urlencode([
+                (name, value) for name, value in urllib.parse.parse_qsl(parsed_url.query, keep_blank_values=True)
+                if name not in ("query", "format", "output")
+            ])
+        else:
+            parameters = self.url_parameters
+        url = urllib.parse.urlunsplit((parsed_url.scheme, parsed_url.netloc, parsed_url.path, parameters, ""))
+        # a 303 redirect is followed with a GET request
+        method = "GET" if status == 303 else self.method
+
+        transport = self.redirects.get((url, method))
+        if transport is None:
+            transport = HttpTransport(url, method=method, gzip=self.gzip, timeout=self.timeout, pool_size=self.pool_size)
+            transport = self.redirects.setdefault((url, method), transport)
+        if status in (301, 308) and self.moved is None:
+            logging.info("The endpoint {} has moved to {}".format(self.url, url))
+            self.moved = transport
+        return transport
+
+    def get_request(self, query):
+        """Get url, body and headers of the HTTP request of a query
+
+        Parameters
+        ----------
+        query : str
+            The query
+
+        Returns
+        -------
+        tuple
+            url, body, headers
+        """
+        parameters = urllib.parse.urlencode({"query": query, "format": "json", "output": "json"})
+        headers = {
+            "Accept": self.accept,
+            "User-Agent": "abstractor (https://github.com/askomics/abstractor)"
+        }
+        if self.gzip:
+            headers["Accept-Encoding"] = "gzip"
+        if self.connection_class is http.client.HTTPConnection:
+            headers.update(self.proxy_headers)
+
+        if self.method == "POST":
+            url = "{}?{}".format(self.path, self.url_parameters) if self.url_parameters else self.path
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+            return url, parameters.encode("utf-8"), headers
+
+        url = "{}?{}".format(self.path, "&".join(p for p in (self.url_parameters, parameters) if p))
+        return url, None, headers
+
+    def send(self, query):
+        """Send a query to the endpoint and get the response
+
+        Parameters
+        ----------
+        query : str
+            The query
+
+        Returns
+        -------
+        tuple
+            connection, response
+        """
+        url, body, headers = self.get_request(query)
+
+        # An idle connection may have been closed by the server: retry once
+        # with a fresh connection
+        for attempt in range(2):
+            connection = self.get_connection()
+            try:
+                connection.request(self.method, url, body=body, headers=headers)
+                return connection, connection.getresponse()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError) as e:
+                connection.close()
+                if attempt:
+                    raise EndpointError("{}: {}".format(self.url, e))
+                logging.debug("Connection closed by the endpoint, reconnect")
+            except Exception:
+                connection.close()
+                raise
+
+    @contextlib.contextmanager
+    def open(self, query, redirects=None):
+        """Send a query to the endpoint, and stream the response body
+
+        The connection is put back into the pool once the response is fully
+        read, or closed if the caller stops before. Redirects are followed,
+        and the target of a permanent redirect is queried directly by the
+        next queries. The response must be fully read within timeout seconds.
+
+        Parameters
+        ----------
+        query : str
+            The query
+        redirects : int, optional
+            Maximum number of redirects followed (default: max_redirects)
+
+        Yields
+        ------
+        file-like
+            Response body (uncompressed)
+
+        Raises
+        ------
+        EndpointError
+            If the endpoint returns an HTTP error, or too many redirects, or
+            if the response is not read in time
+        """
+        redirects = self.max_redirects if redirects is None else redirects
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        if self.moved is not None:
+            if not redirects:
+                raise EndpointError("{}: too many redirects".format(self.url), 301)
+            with self.moved.open(query, redirects - 1) as stream:
+                yield stream
+            return
+
+        connection, response = self.send(query)
+        gzipped = response.getheader("Content-Encoding", "").lower() == "gzip"
+
+        if response.status in self.redirect_statuses and response.getheader("Location"):
+            response.read()
+            if response.will_close:
+                connection.close()
+            else:
+                self.release_connection(connection)
+            if not redirects:
+                raise EndpointError("{}: too many redirects".format(self.url), response.status)
+            logging.debug("{}: HTTP {} redirect to {}".format(self.url, response.status, response.getheader("Location")))
+            with self.get_redirect(response.getheader("Location"), response.status).open(query, redirects - 1) as stream:
+                yield stream
+            return
+
+        if response.status >= 300:
+            data = response.read()
+            connection.close()
+            if gzipped:
+                data = gzip.decompress(data)
+            raise EndpointError("{}: HTTP Error {} {}: {}".format(self.url, response.status, response.reason, data[:1000].decode("utf-8", "replace")), response.status)
+
+        stream = response
+        if deadline is not None:
+            message = "{}: no complete response after {} seconds".format(self.url, self.timeout)
+            stream = DeadlineStream(response, connection, deadline, message)
+        if gzipped:
+            stream = gzip.GzipFile(fileobj=stream)
+        try:
+            yield stream
+            # Consume trailing data, so the connection can be reused
+            while stream.read(self.chunk_size):
+                pass
+            response.read()
+        except BaseException:
+            connection.close()
+            raise
+
+        if response.will_close:
+            connection.close()
+        else:
+            if deadline is not None and connection.sock is not None:
+                connection.sock.settimeout(self.timeout)
+            self.release_connection(connection)
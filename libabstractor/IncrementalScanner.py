@@ -0,0 +1,152 @@
+import logging
+
+from libabstractor.AbstractionState import AbstractionState
+from libabstractor.QueryFallback import QueryFallback
+from libabstractor.QueryScheduler import QueryScheduler
+
+
+class IncrementalScanner(object):
+    """Get relations and attributes of the all mode, querying only entities changed since a previous run
+
+    Entities are compared with the fingerprints of the previous state (see
+    AbstractionState). Relations and attributes of new and changed entities
+    are queried entity by entity, as those of entities with relations to new,
+    changed or removed entities (their target may have changed), and those
+    of other entities are taken from the previous state. Without a previous
+    state, the all mode queries are sent, and their rows are recorded per
+    entity in the new state.
+
+    Attributes
+    ----------
+    sparql : SparqlQuery
+        Source
+    library : QueryLibrary
+        Queries
+    fallback : QueryFallback
+        Split of failing queries
+    scheduler : QueryScheduler
+        Concurrent queries of changed entities
+    batch_size : int
+        Number of target entities per query of relation sources
+    """
+
+    batch_size = 100
+
+    def __init__(self, sparql, library, fallback=None, scheduler=None):
+        """Init
+
+        Parameters
+        ----------
+        sparql : SparqlQuery
+            Source
+        library : QueryLibrary
+            Queries
+        fallback : QueryFallback, optional
+            Split of failing queries
+        scheduler : QueryScheduler, optional
+            Concurrent queries of changed entities
+        """
+        self.sparql = sparql
+        self.library = library
+        self.fallback = fallback or QueryFallback(sparql, library)
+        self.scheduler = scheduler or QueryScheduler()
+
+    def fingerprints(self):
+        """Get the fingerprint of each entity
+
+        Returns
+        -------
+        dict
+            Entity URI -> fingerprint (numbers of instances, triples and
+            predicates, then parents)
+        """
+        parents = {}
+        for row in self.sparql.process_query(self.library.entities_parents):
+            parents.setdefault(row.entity, []).append(row.mother_entity)
+        return {row.entity: [int(row.instances), int(row.triples), int(row.predicates)] + sorted(parents.get(row.entity, []))
+                for row in self.sparql.process_query(self.library.entities_fingerprints)}
+
+    def relation_sources(self, entities):
+        """Get the entities with relations to some entities
+
+        Parameters
+        ----------
+        entities : list
+            Target entities URIs
+
+        Returns
+        -------
+        set
+            Source entities URIs
+        """
+        sources = set()
+        for start in range(0, len(entities), self.batch_size):
+            query = self.library.get_relation_sources_for_entities(entities[start:start + self.batch_size])
+            sources.update(row.source_entity for row in self.sparql.process_query(query))
+        return sources
+
+    def scan_entity(self, entity):
+        """Get relations and attributes of an entity
+
+        Parameters
+        ----------
+        entity : str
+            Entity URI
+
+        Returns
+        -------
+        tuple
+            Rows of relations (as entities_and_relations) and attributes (as
+            entities_and_attributes)
+        """
+        return (
+            list(self.fallback.rows("relations", entity=entity)),
+            list(self.fallback.rows("attributes", entity=entity))
+        )
+
+    def scan(self, previous=None):
+        """Get relations and attributes of all entities
+
+        Parameters
+        ----------
+        previous : AbstractionState, optional
+            State of the previous run
+
+        Returns
+        -------
+        AbstractionState
+            The new state, with the rows of all entities (without digest)
+        """
+        state = AbstractionState(self.fingerprints())
+
+        if previous is None or not previous.fingerprints:
+            logging.debug("No previous fingerprints, scan all entities")
+            for row in self.fallback.rows("relations"):
+                state.relations.setdefault(row.source_entity, []).append(list(row))
+            for row in self.fallback.rows("attributes"):
+                state.attributes.setdefault(row.entity, []).append(list(row))
+        else:
+            changed = previous.changed_entities(state.fingerprints)
+            removed = set(previous.fingerprints) - set(state.fingerprints)
+            # Relations to changed entities: previous ones, and new ones
+            # (instances that were not typed, or of another entity)
+            linked = previous.relation_sources(set(changed) | removed)
+            if changed:
+                linked.update(self.relation_sources(changed))
+            changed_set = (set(changed) | linked) & set(state.fingerprints)
+            changed = sorted(changed_set)
+            logging.info("{} entities changed out of {}".format(len(changed), len(state.fingerprints)))
+            for entity in state.fingerprints:
+                if entity not in changed_set:
+                    state.relations[entity] = previous.relations.get(entity, [])
+                    state.attributes[entity] = previous.attributes.get(entity, [])
+            for entity, (relations, attributes) in zip(changed, self.scheduler.map(self.scan_entity, changed)):
+                state.add_rows(entity, relations, attributes)
+
+        # Entities with gaps are scanned again by the next run
+        for gap in self.fallback.gaps:
+            if gap["entity"] is None:
+                state.fingerprints = {}
+            else:
+                state.fingerprints.pop(gap["entity"], None)
+        return state
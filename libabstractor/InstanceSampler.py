@@ -0,0 +1,122 @@
+import math
+
+
+class InstanceSampler(object):
+    """Estimate relations and attributes of entities from a sample of their instances
+
+    Only `size` instances of each entity are scanned, so the cost of a run
+    depends on the number of entities, not on the size of the dataset.
+
+    Methods:
+
+    - first: first instances returned by the endpoint
+    - random: random instances (ORDER BY RAND())
+    - stratified: instances taken in equal parts from `strata` slices of the
+      instances, ordered by URI
+
+    Blank node instances are never sampled.
+
+    Attributes
+    ----------
+    sparql : SparqlQuery
+        Source
+    library : QueryLibrary
+        Queries
+    size : int
+        Maximum number of instances per entity
+    method : str
+        Sampling method
+    strata : int
+        Number of slices of the stratified method
+    """
+
+    methods = ("first", "random", "stratified")
+
+    def __init__(self, sparql, library, size=100, method="first", strata=10):
+        """Init
+
+        Parameters
+        ----------
+        sparql : SparqlQuery
+            Source
+        library : QueryLibrary
+            Queries
+        size : int, optional
+            Maximum number of instances per entity
+        method : str, optional
+            Sampling method (first, random or stratified)
+        strata : int, optional
+            Number of slices of the stratified method
+        """
+        self.sparql = sparql
+        self.library = library
+        self.size = size
+        self.method = method
+        self.strata = strata
+
+    def sample(self, entity):
+        """Get a sample of instances of an entity
+
+        Parameters
+        ----------
+        entity : str
+            Entity URI
+
+        Returns
+        -------
+        list
+            Instances URIs
+        """
+        if self.method == "random":
+            rows = self.sparql.process_query(self.library.random_instances_of_entity(entity, self.size))
+        elif self.method == "stratified":
+            rows = self.sample_stratified(entity)
+        else:
+            rows = self.sparql.process_query(self.library.first_instances_of_entity(entity, self.size))
+        return [row.instance for row in rows]
+
+    def sample_stratified(self, entity):
+        """Get a stratified sample of instances of an entity
+
+        Parameters
+        ----------
+        entity : str
+            Entity URI
+
+        Returns
+        -------
+        list
+            Rows (instance)
+        """
+        count = int(self.sparql.process_query(self.library.count_instances_of_entity(entity))[0].instances)
+        if count <= self.size:
+            return self.sparql.process_query(self.library.first_instances_of_entity(entity, self.size))
+
+        strata = min(self.strata, self.size)
+        limit = math.ceil(self.size / strata)
+        rows = []
+        for stratum in range(strata):
+            rows += self.sparql.process_query(self.library.ordered_instances_of_entity(entity, limit, stratum * count // strata))
+        return rows[:self.size]
+
+    def abstract_entity(self, entity):
+        """Get relations and attributes of a sample of instances of an entity
+
+        Parameters
+        ----------
+        entity : str
+            Entity URI
+
+        Returns
+        -------
+        tuple
+            Rows of relations (as entities_and_relations) and attributes (as
+            entities_and_attributes)
+        """
+        instances = self.sample(entity)
+        if not instances:
+            return [], []
+        return (
+            self.sparql.process_query(self.library.relations_of_instances(entity, instances)),
+            self.sparql.process_query(self.library.attributes_of_instances(entity, instances))
+        )
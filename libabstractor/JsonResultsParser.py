@@ -0,0 +1,199 @@
+import codecs
+import json
+
+
+class TruncatedResultsError(ValueError):
+    """The SPARQL JSON results stream ended before the end of the document"""
+
+    pass
+
+
+class JsonResultsParser(object):
+    """Incremental parser of SPARQL JSON results
+
+    Read a SPARQL results document from a binary stream, and yield bindings
+    of results.bindings one by one, as soon as they are received. Only the
+    binding being parsed is kept in memory.
+
+    Attributes
+    ----------
+    variables : list
+        Variables of head.vars (available once the head is parsed)
+    size : int
+        Number of bytes read from the stream
+    """
+
+    def __init__(self, stream, chunk_size=65536):
+        """Init
+
+        Parameters
+        ----------
+        stream : file-like
+            Binary stream of the JSON document
+        chunk_size : int, optional
+            Number of bytes read at once
+        """
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.json_decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+        self.size = 0
+        self.variables = []
+
+    def fill(self, size=None):
+        """Read next chunk of the stream into the buffer
+
+        Parameters
+        ----------
+        size : int, optional
+            Number of bytes to read (default: chunk_size)
+
+        Returns
+        -------
+        bool
+            False if the end of the stream is reached
+        """
+        if self.eof:
+            return False
+        chunk = self.stream.read(size or self.chunk_size)
+        self.size += len(chunk)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.position:] + self.decoder.decode(chunk, final=self.eof)
+        self.position = 0
+        return not self.eof
+
+    def peek(self):
+        """Skip whitespaces and get the next character, without consuming it
+
+        Returns
+        -------
+        str
+            Next character
+
+        Raises
+        ------
+        TruncatedResultsError
+            If the document is truncated
+        """
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in " \t\r\n":
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill():
+                raise TruncatedResultsError("Truncated SPARQL JSON results")
+
+    def expect(self, characters):
+        """Consume the next character, that should be one of characters
+
+        Parameters
+        ----------
+        characters : str
+            Allowed characters
+
+        Returns
+        -------
+        str
+            Consumed character
+
+        Raises
+        ------
+        ValueError
+            If the next character is not allowed
+        """
+        character = self.peek()
+        if character not in characters:
+            raise ValueError("Invalid SPARQL JSON results: expected {} at '{}'".format(" or ".join(characters), self.buffer[self.position:self.position + 20]))
+        self.position += 1
+        return character
+
+    def read_value(self):
+        """Consume and decode the next JSON value
+
+        Returns
+        -------
+        object
+            Decoded value
+
+        Raises
+        ------
+        ValueError
+            If the document is truncated or invalid
+        """
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buffer, self.position)
+                # A number at the end of the buffer may be incomplete
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow reads for big values, to avoid re-parsing them too many times
+            self.fill(size)
+            size *= 2
+
+    def iter_array(self):
+        """Consume a JSON array and yield its values
+
+        Yields
+        ------
+        object
+            Decoded value
+        """
+        self.expect("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield self.read_value()
+            if self.expect(",]") == "]":
+                return
+
+    def iter_object(self):
+        """Consume a JSON object and yield its keys
+
+        The value of each key has to be consumed by the caller.
+
+        Yields
+        ------
+        str
+            Key
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(":")
+            yield key
+            if self.expect(",}") == "}":
+                return
+
+    def __iter__(self):
+        """Parse the document
+
+        Yields
+        ------
+        dict
+            A binding of results.bindings
+        """
+        for key in self.iter_object():
+            if key == "results":
+                for results_key in self.iter_object():
+                    if results_key == "bindings":
+                        yield from self.iter_array()
+                    else:
+                        self.read_value()
+            elif key == "head":
+                self.variables = self.read_value().get("vars", [])
+            else:
+                self.read_value()
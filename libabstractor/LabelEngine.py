@@ -0,0 +1,145 @@
+import functools
+import re
+
+
+RE_OUTER = re.compile(r'([^A-Z ])([A-Z])')
+RE_INNER = re.compile(r'\b[A-Z]+(?=[A-Z][a-z])')
+
+
+class LabelEngine(object):
+    """Generate labels from URIs
+
+    Labels are memoized in a bounded LRU cache keyed on the URI.
+
+    Strategies:
+
+    - uncamel: local name, with spaces between camelcased words and instead
+      of underscores (geneName -> gene name)
+    - local: local name, as is (geneName)
+    - prefix: URI without its namespace, if it is one of namespaces, local
+      name otherwise
+
+    Attributes
+    ----------
+    strategy : str
+        Label strategy
+    namespaces : tuple
+        Namespaces stripped by the prefix strategy (longest first)
+    """
+
+    strategies = ("uncamel", "local", "prefix")
+
+    def __init__(self, strategy="uncamel", namespaces=None, cache_size=65536):
+        """Init
+
+        Parameters
+        ----------
+        strategy : str, optional
+            Label strategy (uncamel, local or prefix)
+        namespaces : list, optional
+            Namespaces stripped by the prefix strategy
+        cache_size : int, optional
+            Maximum number of memoized labels
+        """
+        self.strategy = strategy
+        self.namespaces = tuple(sorted(namespaces or (), key=len, reverse=True))
+        self.label = functools.lru_cache(maxsize=cache_size)(getattr(self, "label_{}".format(strategy)))
+
+    def labels(self, uris):
+        """Get labels of several URIs
+
+        Parameters
+        ----------
+        uris : iterable
+            URIs to get a label
+
+        Returns
+        -------
+        dict
+            URI -> label
+        """
+        label = self.label
+        return {uri: label(uri) for uri in uris}
+
+    @staticmethod
+    def local_name(uri):
+        """Get the local name of an URI
+
+        Parameters
+        ----------
+        uri : str
+            URI
+
+        Returns
+        -------
+        str
+            Part of the URI after the last / or #
+        """
+        return uri.split("/")[-1].split("#")[-1]
+
+    def label_uncamel(self, uri):
+        """Get an uncamel cased label from an URI
+
+        Parameters
+        ----------
+        uri : str
+            URI to get a label
+
+        Returns
+        -------
+        str
+            Label
+        """
+        return self.uncamel(self.local_name(uri).replace("_", " "))
+
+    def label_local(self, uri):
+        """Get the local name of an URI as label
+
+        Parameters
+        ----------
+        uri : str
+            URI to get a label
+
+        Returns
+        -------
+        str
+            Label
+        """
+        return self.local_name(uri)
+
+    def label_prefix(self, uri):
+        """Get the URI without its namespace as label
+
+        Parameters
+        ----------
+        uri : str
+            URI to get a label
+
+        Returns
+        -------
+        str
+            Label
+        """
+        for namespace in self.namespaces:
+            if uri.startswith(namespace) and len(uri) > len(namespace):
+                return uri[len(namespace):]
+        return self.local_name(uri)
+
+    @staticmethod
+    def uncamel(string):
+        """Insert space beween camelcased words
+
+        Parameters
+        ----------
+        string : str
+            CamelCased string
+
+        Returns
+        -------
+        str
+            Uncamel Cased string
+        """
+        uncameled = RE_INNER.sub(r'\g<0> ', RE_OUTER.sub(r'\1 \2', string))
+        if uncameled[:1].islower():
+            return uncameled.lower()
+        return uncameled
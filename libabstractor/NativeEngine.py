@@ -0,0 +1,182 @@
+import itertools
+import logging
+
+from libabstractor.ResultRow import ResultRow
+from libabstractor.SchemaStatistics import SchemaStatistics
+
+import rdflib
+
+
+class NativeEngine(object):
+    """Abstraction of a rdflib Graph with triple pattern lookups instead of SPARQL queries
+
+    The rows of the all and owl mode queries are computed with the indexes of
+    the store (Graph.triples) and hash joins in Python, instead of the SPARQL
+    engine of rdflib. Rows are the rows of the SPARQL queries, without the
+    filters of excluded namespaces (those rows are discarded on receive, see
+    RdfGraph.check_entity).
+
+    Attributes
+    ----------
+    graph : rdflib.Graph
+        The source, loaded
+    """
+
+    attribute_datatypes = {
+        rdflib.XSD.float: rdflib.XSD.decimal,
+        rdflib.XSD.int: rdflib.XSD.decimal,
+        rdflib.XSD.string: rdflib.XSD.string
+    }
+
+    def __init__(self, graph):
+        """Init
+
+        Parameters
+        ----------
+        graph : rdflib.Graph
+            The source, loaded
+        """
+        self.graph = graph
+
+    def scan(self):
+        """Get the statistics of the graph (all mode)
+
+        Only the triples of typed subjects are read.
+
+        Returns
+        -------
+        SchemaStatistics
+            Statistics of the graph
+        """
+        statistics = SchemaStatistics()
+        logging.debug("Collect classes")
+        for subject, _, entity in self.graph.triples((None, rdflib.RDF.type, None)):
+            statistics.add_class(subject, entity)
+        for entity, _, parent in self.graph.triples((None, rdflib.RDFS.subClassOf, None)):
+            statistics.parents.setdefault(entity, set()).add(parent)
+
+        logging.debug("Classify predicates of {} subjects".format(len(statistics.subject_classes)))
+        for subject in statistics.subject_classes:
+            for predicate, obj in self.graph.predicate_objects(subject):
+                statistics.classify(subject, predicate, obj)
+        return statistics
+
+    def ontologies(self):
+        """Get the ontologies defining classes, object properties and datatype properties
+
+        Returns
+        -------
+        list
+            Ontologies URIs (as QueryLibrary.ontologies)
+        """
+        ontologies = []
+        for ontology in self.graph.subjects(rdflib.RDF.type, rdflib.OWL.Ontology):
+            defined = set(self.graph.subjects(rdflib.RDFS.isDefinedBy, ontology))
+            if all(any((resource, rdflib.RDF.type, rdf_type) in self.graph for resource in defined)
+                   for rdf_type in (rdflib.OWL.Class, rdflib.OWL.ObjectProperty, rdflib.OWL.DatatypeProperty)):
+                ontologies.append(str(ontology))
+        return sorted(set(ontologies))
+
+    def classes_of(self, ontology):
+        """Get the classes defined by an ontology
+
+        Parameters
+        ----------
+        ontology : str
+            Ontology URI
+
+        Returns
+        -------
+        set
+            Classes (rdflib terms)
+        """
+        return set(entity for entity in self.graph.subjects(rdflib.RDFS.isDefinedBy, rdflib.URIRef(ontology))
+                   if (entity, rdflib.RDF.type, rdflib.OWL.Class) in self.graph)
+
+    def domains(self, resource):
+        """Get the domains of a property, and the members of its union domains
+
+        Parameters
+        ----------
+        resource : rdflib.term.Node
+            The property
+
+        Returns
+        -------
+        set
+            Domains (rdflib terms)
+        """
+        domains = set()
+        for domain in self.graph.objects(resource, rdflib.RDFS.domain):
+            domains.add(domain)
+            # rdfs:domain/(owl:unionOf/(rdf:rest*)/rdf:first)
+            for union in self.graph.objects(domain, rdflib.OWL.unionOf):
+                for node in self.graph.transitive_objects(union, rdflib.RDF.rest):
+                    domains.update(self.graph.objects(node, rdflib.RDF.first))
+        return domains
+
+    def parents(self, entity):
+        """Get the parents of a class
+
+        Parameters
+        ----------
+        entity : rdflib.term.Node
+            The class
+
+        Returns
+        -------
+        list
+            Parents (None if the class has no parent, as an OPTIONAL)
+        """
+        return list(self.graph.objects(entity, rdflib.RDFS.subClassOf)) or [None]
+
+    def entities_and_relations_with_ontology(self, ontology):
+        """Get relations of the classes of an ontology
+
+        Parameters
+        ----------
+        ontology : str
+            Ontology URI
+
+        Returns
+        -------
+        list
+            Rows of QueryLibrary.entities_and_relations_with_ontology
+        """
+        classes = self.classes_of(ontology)
+        rows = set()
+        for relation in self.graph.subjects(rdflib.RDF.type, rdflib.OWL.ObjectProperty):
+            targets = [target for target in self.graph.objects(relation, rdflib.RDFS.range) if target in classes]
+            if not targets:
+                continue
+            for source in self.domains(relation) & classes:
+                for target in targets:
+                    for mother_source, mother_target in itertools.product(self.parents(source), self.parents(target)):
+                        rows.add((source, relation, target, mother_source, mother_target))
+        variables = ("source_entity", "relation", "target_entity", "mother_source", "mother_target")
+        return [ResultRow.from_values(variables, (None if node is None else str(node) for node in row)) for row in rows]
+
+    def entities_and_attributes_with_ontology(self, ontology):
+        """Get attributes of the classes of an ontology
+
+        Parameters
+        ----------
+        ontology : str
+            Ontology URI
+
+        Returns
+        -------
+        list
+            Rows of QueryLibrary.entities_and_attributes_with_ontology
+        """
+        classes = self.classes_of(ontology)
+        rows = set()
+        for attribute in self.graph.subjects(rdflib.RDF.type, rdflib.OWL.DatatypeProperty):
+            datatypes = set(self.attribute_datatypes[attribute_range] for attribute_range in self.graph.objects(attribute, rdflib.RDFS.range)
+                            if attribute_range in self.attribute_datatypes)
+            if not datatypes:
+                continue
+            for entity in self.domains(attribute) & classes:
+                for datatype in datatypes:
+                    rows.add((entity, attribute, datatype))
+        return [ResultRow.from_values(("entity", "attribute", "datatype"), (str(node) for node in row)) for row in rows]
@@ -0,0 +1,65 @@
+from libabstractor.QueryFallback import QueryFallback
+
+
+class PredicateScanner(object):
+    """Get relations and attributes predicate by predicate
+
+    The queries of the all mode are split into one query per predicate, so
+    each query is a small join for the endpoint, and queries can run
+    concurrently. A failing predicate is retried alone, then split further
+    (see QueryFallback).
+
+    Attributes
+    ----------
+    sparql : SparqlQuery
+        Source
+    library : QueryLibrary
+        Queries
+    fallback : QueryFallback
+        Split of failing queries
+    """
+
+    def __init__(self, sparql, library, fallback=None):
+        """Init
+
+        Parameters
+        ----------
+        sparql : SparqlQuery
+            Source
+        library : QueryLibrary
+            Queries
+        fallback : QueryFallback, optional
+            Split of failing queries
+        """
+        self.sparql = sparql
+        self.library = library
+        self.fallback = fallback or QueryFallback(sparql, library)
+
+    def predicates(self):
+        """Get all predicates of the source
+
+        Returns
+        -------
+        list
+            Predicates URIs
+        """
+        return [row.predicate for row in self.sparql.process_query(self.library.get_predicates)]
+
+    def scan_predicate(self, predicate):
+        """Get relations and attributes of a predicate
+
+        Parameters
+        ----------
+        predicate : str
+            Predicate URI
+
+        Returns
+        -------
+        tuple
+            Rows of relations (as entities_and_relations) and attributes (as
+            entities_and_attributes)
+        """
+        return (
+            list(self.fallback.rows("relations", predicate=predicate)),
+            list(self.fallback.rows("attributes", predicate=predicate))
+        )
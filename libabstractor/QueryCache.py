@@ -0,0 +1,152 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+
+class QueryCache(object):
+    """Persistent cache of SPARQL query results, stored in a sqlite database
+
+    Results are keyed on the endpoint url and the normalized query text.
+
+    Attributes
+    ----------
+    path : str
+        Path of the sqlite database
+    ttl : int
+        Lifetime of a cached result, in seconds
+    max_size : int
+        Maximum size of the cached results, in bytes
+    refresh : bool
+        If True, never read cached results, only store new ones
+    """
+
+    def __init__(self, directory, ttl=86400, max_size=512 * 1024 * 1024, refresh=False):
+        """Init
+
+        Parameters
+        ----------
+        directory : str
+            Cache directory
+        ttl : int, optional
+            Lifetime of a cached result, in seconds
+        max_size : int, optional
+            Maximum size of the cached results, in bytes
+        refresh : bool, optional
+            If True, never read cached results, only store new ones
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "results.sqlite")
+        self.ttl = ttl
+        self.max_size = max_size
+        self.refresh = refresh
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    endpoint TEXT,
+                    created REAL,
+                    accessed REAL,
+                    size INTEGER,
+                    data BLOB
+                )
+            """)
+            self.connection.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+
+    @staticmethod
+    def get_key(endpoint, query):
+        """Get the cache key of a query
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint url
+        query : str
+            The query
+
+        Returns
+        -------
+        str
+            Cache key
+        """
+        normalized_query = " ".join(query.split())
+        return hashlib.sha256("{}\n{}".format(endpoint, normalized_query).encode("utf-8")).hexdigest()
+
+    def get(self, endpoint, query):
+        """Get cached results of a query
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint url
+        query : str
+            The query
+
+        Returns
+        -------
+        tuple
+            Variables and rows of the results, or None if query is not cached
+        """
+        if self.refresh:
+            return None
+
+        key = self.get_key(endpoint, query)
+        now = time.time()
+        with self.lock, self.connection:
+            row = self.connection.execute("SELECT data FROM results WHERE key = ? AND created >= ?", (key, now - self.ttl)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+
+        logging.debug("Cached results for query {}".format(key))
+        data = json.loads(zlib.decompress(row[0]).decode("utf-8"))
+        return data["variables"], data["rows"]
+
+    def put(self, endpoint, query, variables, rows):
+        """Store results of a query
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint url
+        query : str
+            The query
+        variables : tuple
+            Variables of the results
+        rows : list
+            Rows of the results (tuples of values)
+        """
+        data = zlib.compress(json.dumps({"variables": variables, "rows": rows}).encode("utf-8"))
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO results (key, endpoint, created, accessed, size, data) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.get_key(endpoint, query), endpoint, now, now, len(data), data)
+            )
+            self.evict(now)
+
+    def evict(self, now):
+        """Remove expired results, then least recently used ones until cache fits in max_size
+
+        Parameters
+        ----------
+        now : float
+            Current timestamp
+        """
+        self.connection.execute("DELETE FROM results WHERE created < ?", (now - self.ttl, ))
+        size = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if size <= self.max_size:
+            return
+
+        for key, result_size in self.connection.execute("SELECT key, size FROM results ORDER BY accessed").fetchall():
+            self.connection.execute("DELETE FROM results WHERE key = ?", (key, ))
+            size -= result_size
+            if size <= self.max_size:
+                break
@@ -0,0 +1,174 @@
+import logging
+
+
+class QueryFallback(object):
+    """Split queries of the all mode that keep failing into smaller ones
+
+    A query failing after its retries (see SparqlQuery.fetch_with_retries) is
+    split, in this order:
+
+    1. per source entity
+    2. per predicate of the entity
+    3. in smaller pages (page size divided by 2, down to min_page_size)
+
+    If the smallest query still fails, it is given up, and recorded as a gap
+    of the abstraction. Rows yielded before a failure may be yielded again by
+    smaller queries: the abstraction is made of sets, so they are harmless.
+
+    Attributes
+    ----------
+    sparql : SparqlQuery
+        Source
+    library : QueryLibrary
+        Queries
+    report : RunReport
+        Report of the run (None to disable)
+    min_page_size : int
+        Smallest page size tried before giving up a query
+    gaps : list
+        Queries given up (dicts: query, entity, predicate, error)
+    """
+
+    def __init__(self, sparql, library, report=None, min_page_size=100):
+        """Init
+
+        Parameters
+        ----------
+        sparql : SparqlQuery
+            Source
+        library : QueryLibrary
+            Queries
+        report : RunReport, optional
+            Report of the run
+        min_page_size : int, optional
+            Smallest page size tried before giving up a query
+        """
+        self.sparql = sparql
+        self.library = library
+        self.report = report
+        self.min_page_size = min_page_size
+        self.gaps = []
+        self.queries = {
+            "relations": library.entities_and_relations_of,
+            "attributes": library.entities_and_attributes_of
+        }
+        self.full_queries = {
+            "relations": library.entities_and_relations,
+            "attributes": library.entities_and_attributes
+        }
+        self.entities = None
+
+    def add_gap(self, kind, entity, predicate, error):
+        """Record a query given up
+
+        Parameters
+        ----------
+        kind : str
+            relations or attributes
+        entity : str
+            Source entity of the query (None for all entities)
+        predicate : str
+            Predicate of the query (None for all predicates)
+        error : Exception
+            Last error
+        """
+        logging.error("Give up {} query (entity: {}, predicate: {}): {}".format(kind, entity, predicate, error))
+        gap = {"query": kind, "entity": entity, "predicate": predicate, "error": str(error) or type(error).__name__}
+        self.gaps.append(gap)
+        if self.report is not None:
+            self.report.add_gap(gap)
+
+    def rows(self, kind, entity=None, predicate=None):
+        """Get rows of a query of the all mode, restricted to an entity and/or a predicate
+
+        Parameters
+        ----------
+        kind : str
+            relations or attributes
+        entity : str, optional
+            Source entity
+        predicate : str, optional
+            Predicate
+
+        Yields
+        ------
+        tuple
+            Rows of entities_and_relations or entities_and_attributes
+        """
+        if entity is None and predicate is None:
+            query = self.full_queries[kind]
+        else:
+            query = self.queries[kind](entity, predicate)
+        try:
+            yield from self.sparql.iter_query(query)
+            return
+        except Exception as e:
+            if not self.sparql.is_transient(e):
+                raise
+            logging.warning("{} query failed (entity: {}, predicate: {}), split it".format(kind, entity, predicate))
+            error = e
+
+        try:
+            if entity is None:
+                for entity in self.get_entities():
+                    yield from self.rows(kind, entity, predicate)
+                return
+
+            if predicate is None:
+                predicates = [row.predicate for row in self.sparql.iter_query(self.library.get_predicates_of_entity(entity))]
+                for predicate in predicates:
+                    yield from self.rows(kind, entity, predicate)
+                return
+        except Exception as e:
+            if not self.sparql.is_transient(e):
+                raise
+            self.add_gap(kind, entity, predicate, e)
+            return
+
+        yield from self.smaller_pages(query, kind, entity, predicate, error)
+
+    def smaller_pages(self, query, kind, entity, predicate, error):
+        """Get rows of a query with smaller and smaller pages
+
+        Parameters
+        ----------
+        query : str
+            The query
+        kind : str
+            relations or attributes
+        entity : str
+            Source entity of the query
+        predicate : str
+            Predicate of the query
+        error : Exception
+            Error of the query with the default page size
+
+        Yields
+        ------
+        tuple
+            Rows of the query
+        """
+        page_size = (self.sparql.page_size or 10000) // 2
+        while page_size >= self.min_page_size and self.sparql.paginate_query(query, page_size, 0) is not None:
+            try:
+                yield from self.sparql.iter_query(query, page_size)
+                return
+            except Exception as e:
+                if not self.sparql.is_transient(e):
+                    raise
+                logging.warning("{} query failed with pages of {} rows (entity: {}, predicate: {})".format(kind, page_size, entity, predicate))
+                error = e
+            page_size //= 2
+        self.add_gap(kind, entity, predicate, error)
+
+    def get_entities(self):
+        """Get all entities (source of the per entity split)
+
+        Returns
+        -------
+        list
+            Entities URIs
+        """
+        if self.entities is None:
+            self.entities = [row.entity for row in self.sparql.process_query(self.library.get_entities)]
+        return self.entities
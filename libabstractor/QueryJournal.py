@@ -0,0 +1,138 @@
+import json
+import logging
+import os
+import threading
+
+from libabstractor.QueryCache import QueryCache
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows
+    fcntl = None
+
+
+class QueryJournal(object):
+    """Append-only journal of completed SPARQL queries, to resume an interrupted run
+
+    Each line of the journal is a JSON object with the key of a query (see
+    QueryCache.get_key), its variables and its rows. Results of queries found
+    in the journal are replayed instead of being sent to the endpoint again.
+    Unlike the cache, results never expire: remove the journal to start a new
+    run from scratch.
+
+    Only the offset of each result is kept in memory. A last line truncated
+    by a crash (without its end of line) is removed, and other invalid lines
+    are ignored. The journal is locked while it is read or appended to, as
+    other processes may share it.
+
+    Attributes
+    ----------
+    path : str
+        Path of the journal
+    offsets : dict
+        Query key -> offset of its results in the journal
+    """
+
+    def __init__(self, path):
+        """Init
+
+        Parameters
+        ----------
+        path : str
+            Path of the journal (created if needed)
+        """
+        self.path = path
+        self.offsets = {}
+        self.lock = threading.Lock()
+        self.file = open(path, "a+b")
+        self.load()
+
+    def load(self):
+        """Index the results of the journal"""
+        with self.lock:
+            if fcntl is not None:
+                fcntl.flock(self.file, fcntl.LOCK_EX)
+            try:
+                self.file.seek(0)
+                while True:
+                    offset = self.file.tell()
+                    line = self.file.readline()
+                    if not line:
+                        break
+                    if not line.endswith(b"\n"):
+                        logging.warning("Remove truncated result at the end of checkpoint {}".format(self.path))
+                        self.file.truncate(offset)
+                        break
+                    try:
+                        self.offsets[json.loads(line.decode("utf-8"))["key"]] = offset
+                    except (ValueError, KeyError, TypeError):
+                        logging.warning("Ignore invalid result at byte {} of checkpoint {}".format(offset, self.path))
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self.file, fcntl.LOCK_UN)
+        logging.debug("{} query results in checkpoint {}".format(len(self.offsets), self.path))
+
+    def get(self, endpoint, query):
+        """Get journaled results of a query
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint url
+        query : str
+            The query
+
+        Returns
+        -------
+        tuple
+            Variables and rows of the results, or None if query is not in the journal
+        """
+        offset = self.offsets.get(QueryCache.get_key(endpoint, query))
+        if offset is None:
+            return None
+        with self.lock:
+            self.file.seek(offset)
+            line = self.file.readline()
+        data = json.loads(line.decode("utf-8"))
+        return data["variables"], data["rows"]
+
+    def put(self, endpoint, query, variables, rows):
+        """Append results of a query to the journal
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint url
+        query : str
+            The query
+        variables : tuple
+            Variables of the results
+        rows : list
+            Rows of the results (tuples of values)
+        """
+        key = QueryCache.get_key(endpoint, query)
+        line = (json.dumps({"key": key, "variables": variables, "rows": rows}, separators=(",", ":")) + "\n").encode("utf-8")
+        with self.lock:
+            # Other processes (one per source) may append to the same journal
+            if fcntl is not None:
+                fcntl.flock(self.file, fcntl.LOCK_EX)
+            try:
+                self.file.seek(0, os.SEEK_END)
+                offset = self.file.tell()
+                if offset:
+                    # A result truncated by a crash of another process is left on its own line
+                    self.file.seek(offset - 1)
+                    if self.file.read(1) != b"\n":
+                        self.file.write(b"\n")
+                        offset += 1
+                self.file.write(line)
+                self.file.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.offsets[key] = offset
+
+    def close(self):
+        """Close the journal"""
+        self.file.close()
@@ -1,15 +1,86 @@
+import functools
 import textwrap
 
 
+class NamedQuery(str):
+    """A SPARQL query, knowing the name of the QueryLibrary method that built it
+
+    Attributes
+    ----------
+    name : str
+        Name of the method
+    """
+
+    name = None
+
+
+def named_query(method):
+    """Decorator of QueryLibrary methods, naming the returned query
+
+    Parameters
+    ----------
+    method : callable
+        Method returning a query
+
+    Returns
+    -------
+    callable
+        Method returning a NamedQuery
+    """
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        query = NamedQuery(method(*args, **kwargs))
+        query.name = method.__name__
+        return query
+    return wrapper
+
+
 class QueryLibrary(object):
-    """SPARQL methods"""
+    """SPARQL methods
+
+    Attributes
+    ----------
+    excluded_namespaces : tuple
+        Namespaces (lower case) of URIs discarded by the abstraction (see
+        RdfGraph.check_entity). Queries of relations and attributes filter out
+        the rows that would be discarded, so the endpoint doesn't send them.
+        Askomics queries are not filtered
+    """
     askomics_ns = "http://askomics.org/internal/"
 
-    def __init__(self):
-        """init"""
-        pass
+    def __init__(self, excluded_namespaces=None):
+        """init
+
+        Parameters
+        ----------
+        excluded_namespaces : iterable, optional
+            Namespaces (lower case) of URIs discarded by the abstraction
+        """
+        self.excluded_namespaces = tuple(excluded_namespaces or ())
+
+    def exclusion_filter(self, *variables):
+        """Get a FILTER clause removing rows where all variables are in excluded namespaces
+
+        The comparison is case insensitive, as RdfGraph.check_entity.
+
+        Parameters
+        ----------
+        *variables
+            Names of the variables
+
+        Returns
+        -------
+        str
+            FILTER clause (empty if there is no excluded namespace)
+        """
+        if not self.excluded_namespaces:
+            return ""
+        namespaces = ['"{}"'.format(namespace.replace("\\", "\\\\").replace('"', '\\"')) for namespace in self.excluded_namespaces]
+        conditions = ("({})".format(" || ".join("STRSTARTS(LCASE(STR(?{})), {})".format(variable, namespace) for namespace in namespaces)) for variable in variables)
+        return "FILTER (!({}))".format(" && ".join(conditions))
 
     @property
+    @named_query
     def get_entities(self):
         """Sparql query to get all entities
 
@@ -25,6 +96,68 @@ class QueryLibrary(object):
         }
         ''')
 
+    @property
+    @named_query
+    def entities_fingerprints(self):
+        """Sparql query to get the number of instances, triples and predicates of each entity
+
+        Returns
+        -------
+        str
+            SPARQL query
+        """
+        return textwrap.dedent('''
+        SELECT ?entity (COUNT(DISTINCT ?instance) AS ?instances) (COUNT(?predicate) AS ?triples) (COUNT(DISTINCT ?predicate) AS ?predicates)
+        WHERE {
+            ?instance a ?entity .
+            ?instance ?predicate ?value .
+        }
+        GROUP BY ?entity
+        ''')
+
+    @property
+    @named_query
+    def entities_parents(self):
+        """Sparql query to get the parents of each entity
+
+        Returns
+        -------
+        str
+            SPARQL query
+        """
+        return textwrap.dedent('''
+        SELECT DISTINCT ?entity ?mother_entity
+        WHERE {
+            ?entity rdfs:subClassOf ?mother_entity .
+            FILTER EXISTS { ?instance a ?entity }
+        }
+        ''')
+
+    @named_query
+    def get_relation_sources_for_entities(self, entities):
+        """Sparql query to get the entities with relations to several entities
+
+        Parameters
+        ----------
+        entities : list
+            The target entities
+
+        Returns
+        -------
+        str
+            SPARQL query
+        """
+        return textwrap.dedent('''
+        SELECT DISTINCT ?source_entity
+        WHERE {{
+            VALUES ?target_entity {{ {} }}
+            ?instance_of_target a ?target_entity .
+            ?instance_of_source ?relation ?instance_of_target .
+            ?instance_of_source a ?source_entity .
+        }}
+        '''.format(self.values(entities)))
+
+    @named_query
     def get_relation_for_entity(self, entity):
         """Sparql query to get all relations of an entity
 
@@ -46,13 +179,14 @@ class QueryLibrary(object):
         }}
         '''.format(entity))
 
-    def get_numeric_attribute_for_entity(self, entity):
-        """Sparql query to get all attribute of an entity
+    @named_query
+    def get_relation_for_entities(self, entities):
+        """Sparql query to get all relations of several entities (see get_relation_for_entity)
 
         Parameters
         ----------
-        entity : string
-            The source entity
+        entities : list
+            The source entities
 
         Returns
         -------
@@ -60,23 +194,26 @@ class QueryLibrary(object):
             SPARQL query
         """
         return textwrap.dedent('''
-        SELECT DISTINCT ?attribute
+        SELECT DISTINCT ?entity ?relation ?target_entity
         WHERE {{
-            # Get entities
-            ?instance_of_entity a <{}> .
-            # Attributes
-            ?instance_of_entity ?attribute ?value .
-            FILTER (isNumeric(?value))
+            VALUES ?entity {{ {entities} }}
+            ?entity ?relation ?target_entity .
+            ?instance_of_target a ?target_entity .
+            {exclusion}
         }}
-        '''.format(entity))
+        '''.format(entities=self.values(entities), exclusion=self.exclusion_filter("relation")))
 
-    def get_text_attribute_for_entity(self, entity):
-        """Sparql query to get all text attribute of an entity
+    @named_query
+    def get_attribute_for_entities(self, entities):
+        """Sparql query to get all attributes of several entities, with their datatype
+
+        Numeric values have the xsd:decimal datatype, other literals keep
+        their own datatype.
 
         Parameters
         ----------
-        entity : string
-            The source entity
+        entities : list
+            The source entities
 
         Returns
         -------
@@ -84,18 +221,20 @@ class QueryLibrary(object):
             SPARQL query
         """
         return textwrap.dedent('''
-        SELECT DISTINCT ?attribute
+        SELECT DISTINCT ?entity ?attribute ?datatype
         WHERE {{
+            VALUES ?entity {{ {} }}
             # Get entities
-            ?instance_of_entity a <{}> .
+            ?instance_of_entity a ?entity .
             # Attributes
             ?instance_of_entity ?attribute ?value .
             FILTER (isLiteral(?value))
-            FILTER (!isNumeric(?value))
+            BIND (IF(isNumeric(?value), xsd:decimal, DATATYPE(?value)) AS ?datatype)
         }}
-        '''.format(entity))
+        '''.format(self.values(entities)))
 
     @property
+    @named_query
     def entities_and_relations(self):
         """Sparql query to get entities and relations
 
@@ -106,12 +245,13 @@ class QueryLibrary(object):
         """
         return textwrap.dedent('''
         SELECT DISTINCT ?source_entity ?relation ?target_entity ?mother_source ?mother_target
-        WHERE {
+        WHERE {{
             # Get entities
             ?instance_of_source a ?source_entity .
             ?instance_of_target a ?target_entity .
             # Relations
             ?instance_of_source ?relation ?instance_of_target .
+            {exclusion}
 
             OPTIONAL {{
                 ?source_entity rdfs:subClassOf ?mother_source .
@@ -119,10 +259,11 @@ class QueryLibrary(object):
             OPTIONAL {{
                 ?target_entity rdfs:subClassOf ?mother_target .
             }}
-        }
-        ''')
+        }}
+        ''').format(exclusion=self.exclusion_filter("source_entity", "relation", "target_entity"))
 
     @property
+    @named_query
     def entities_askomics(self):
         """Sparql query to get entities and relations
 
@@ -144,6 +285,7 @@ class QueryLibrary(object):
         ''')
 
     @property
+    @named_query
     def relations_askomics(self):
         """Sparql query to get entities and relations
 
@@ -167,6 +309,7 @@ class QueryLibrary(object):
         ''')
 
     @property
+    @named_query
     def attributes_askomics(self):
         """Sparql query to get entities and numeric attributes
 
@@ -189,6 +332,7 @@ class QueryLibrary(object):
         ''')
 
     @property
+    @named_query
     def categories_askomics(self):
         """Sparql query to get Askomics categories attributes
 
@@ -214,28 +358,13 @@ class QueryLibrary(object):
         ''')
 
     @property
-    def entities_and_numeric_attributes(self):
-        """Sparql query to get entities and numeric attributes
+    @named_query
+    def entities_and_attributes(self):
+        """Sparql query to get entities and attributes, with their datatype
 
-        Returns
-        -------
-        str
-            SPARQL query
-        """
-        return textwrap.dedent('''
-        SELECT DISTINCT ?entity ?attribute
-        WHERE {
-            # Get entities
-            ?instance_of_entity a ?entity .
-            # Attributes
-            ?instance_of_entity ?attribute ?value .
-            FILTER (isNumeric(?value))
-        }
-        ''')
-
-    @property
-    def entities_and_text_attributes(self):
-        """Sparql query to get entities and text attributes
+        Numeric values have the xsd:decimal datatype, other literals keep
+        their own datatype, so numeric and text attributes are found with a
+        single scan of the literals.
 
         Returns
         -------
@@ -243,18 +372,20 @@ class QueryLibrary(object):
             SPARQL query
         """
         return textwrap.dedent('''
-        SELECT DISTINCT ?entity ?attribute
-        WHERE {
+        SELECT DISTINCT ?entity ?attribute ?datatype
+        WHERE {{
             # Get entities
             ?instance_of_entity a ?entity .
+            {exclusion}
             # Attributes
             ?instance_of_entity ?attribute ?value .
             FILTER (isLiteral(?value))
-            FILTER (!isNumeric(?value))
-        }
-        ''')
+            BIND (IF(isNumeric(?value), xsd:decimal, DATATYPE(?value)) AS ?datatype)
+        }}
+        ''').format(exclusion=self.exclusion_filter("entity"))
 
     @property
+    @named_query
     def ontologies(self):
         """Sparql query to get ontologies
 
@@ -276,8 +407,8 @@ class QueryLibrary(object):
         }
         ''')
 
-    @staticmethod
-    def entities_and_relations_with_ontology(ontology):
+    @named_query
+    def entities_and_relations_with_ontology(self, ontology):
         """Sparql query to get entities and relations
 
         Returns
@@ -301,6 +432,7 @@ class QueryLibrary(object):
             }} UNION {{
                 ?relation rdfs:domain ?source_entity .
             }}
+            {exclusion}
             OPTIONAL {{
                 ?source_entity rdfs:subClassOf ?mother_source .
             }}
@@ -308,11 +440,13 @@ class QueryLibrary(object):
                 ?target_entity rdfs:subClassOf ?mother_target .
             }}
         }}
-        '''.format(ontology=ontology))
+        '''.format(ontology=ontology, exclusion=self.exclusion_filter("source_entity", "relation", "target_entity")))
 
-    @staticmethod
-    def entities_and_numeric_attributes_with_ontology(ontology):
-        """Sparql query to get entities and numeric attributes
+    @named_query
+    def entities_and_attributes_with_ontology(self, ontology):
+        """Sparql query to get entities and attributes, with their datatype
+
+        Numeric ranges (xsd:float, xsd:int) are given as xsd:decimal.
 
         Returns
         -------
@@ -320,7 +454,7 @@ class QueryLibrary(object):
             SPARQL query
         """
         return textwrap.dedent('''
-        SELECT DISTINCT ?entity ?attribute
+        SELECT DISTINCT ?entity ?attribute ?datatype
         WHERE {{
             # Entity
             ?entity a owl:Class .
@@ -328,18 +462,42 @@ class QueryLibrary(object):
             # Attribute
             ?attribute a owl:DatatypeProperty .
             ?attribute rdfs:range ?range .
-            VALUES ?range {{ xsd:float xsd:int }} .
+            VALUES ?range {{ xsd:float xsd:int xsd:string }} .
             {{
                 ?attribute rdfs:domain/(owl:unionOf/(rdf:rest*)/rdf:first) ?entity .
             }} UNION {{
                 ?attribute rdfs:domain ?entity .
             }}
+            BIND (IF(?range = xsd:string, xsd:string, xsd:decimal) AS ?datatype)
+            {exclusion}
         }}
-        '''.format(ontology=ontology))
+        '''.format(ontology=ontology, exclusion=self.exclusion_filter("entity")))
 
     @staticmethod
-    def entities_and_text_attributes_with_ontology(ontology):
-        """Sparql query to get entities and numeric attributes
+    def values(uris):
+        """Format URIs for a VALUES clause
+
+        Parameters
+        ----------
+        uris : iterable
+            URIs
+
+        Returns
+        -------
+        str
+            URIs, between <>
+        """
+        return " ".join("<{}>".format(uri) for uri in uris)
+
+    @staticmethod
+    @named_query
+    def count_instances_of_entity(entity):
+        """Sparql query to count instances of an entity
+
+        Parameters
+        ----------
+        entity : string
+            The entity
 
         Returns
         -------
@@ -347,19 +505,282 @@ class QueryLibrary(object):
             SPARQL query
         """
         return textwrap.dedent('''
-        SELECT DISTINCT ?entity ?attribute
+        SELECT (COUNT(?instance) AS ?instances)
+        WHERE {{
+            ?instance a <{}> .
+            FILTER (isIRI(?instance))
+        }}
+        '''.format(entity))
+
+    @staticmethod
+    @named_query
+    def first_instances_of_entity(entity, limit):
+        """Sparql query to get the first instances of an entity (endpoint order)
+
+        Parameters
+        ----------
+        entity : string
+            The entity
+        limit : int
+            Number of instances
+
+        Returns
+        -------
+        str
+            SPARQL query
+        """
+        return textwrap.dedent('''
+        SELECT ?instance
+        WHERE {{
+            ?instance a <{}> .
+            FILTER (isIRI(?instance))
+        }}
+        LIMIT {}
+        '''.format(entity, limit))
+
+    @staticmethod
+    @named_query
+    def random_instances_of_entity(entity, limit):
+        """Sparql query to get random instances of an entity
+
+        Parameters
+        ----------
+        entity : string
+            The entity
+        limit : int
+            Number of instances
+
+        Returns
+        -------
+        str
+            SPARQL query
+        """
+        return textwrap.dedent('''
+        SELECT ?instance
+        WHERE {{
+            ?instance a <{}> .
+            FILTER (isIRI(?instance))
+        }}
+        ORDER BY RAND()
+        LIMIT {}
+        '''.format(entity, limit))
+
+    @staticmethod
+    @named_query
+    def ordered_instances_of_entity(entity, limit, offset):
+        """Sparql query to get a slice of the instances of an entity, ordered by URI
+
+        Parameters
+        ----------
+        entity : string
+            The entity
+        limit : int
+            Number of instances
+        offset : int
+            Index of the first instance
+
+        Returns
+        -------
+        str
+            SPARQL query
+        """
+        return textwrap.dedent('''
+        SELECT ?instance
         WHERE {{
-            # Entity
-            ?entity a owl:Class .
-            ?entity rdfs:isDefinedBy <{ontology}> .
-            # Attribute
-            ?attribute a owl:DatatypeProperty .
-            ?attribute rdfs:range ?range .
-            VALUES ?range {{ xsd:string }} .
             {{
-                ?attribute rdfs:domain/(owl:unionOf/(rdf:rest*)/rdf:first) ?entity .
-            }} UNION {{
-                ?attribute rdfs:domain ?entity .
+                SELECT ?instance
+                WHERE {{
+                    ?instance a <{}> .
+                    FILTER (isIRI(?instance))
+                }}
+                ORDER BY ?instance
+            }}
+        }}
+        LIMIT {}
+        OFFSET {}
+        '''.format(entity, limit, offset))
+
+    @named_query
+    def relations_of_instances(self, entity, instances):
+        """Sparql query to get relations of some instances of an entity
+
+        Rows are the rows of entities_and_relations.
+
+        Parameters
+        ----------
+        entity : string
+            The source entity
+        instances : list
+            Instances of the entity
+
+        Returns
+        -------
+        str
+            SPARQL query
+        """
+        return textwrap.dedent('''
+        SELECT DISTINCT ?source_entity ?relation ?target_entity ?mother_source ?mother_target
+        WHERE {{
+            VALUES ?instance_of_source {{ {instances} }}
+            # Get entities
+            ?instance_of_source a ?source_entity .
+            FILTER (?source_entity = <{entity}>)
+            # Relations
+            ?instance_of_source ?relation ?instance_of_target .
+            ?instance_of_target a ?target_entity .
+            {exclusion}
+
+            OPTIONAL {{
+                ?source_entity rdfs:subClassOf ?mother_source .
+            }}
+            OPTIONAL {{
+                ?target_entity rdfs:subClassOf ?mother_target .
+            }}
+        }}
+        '''.format(entity=entity, instances=self.values(instances), exclusion=self.exclusion_filter("source_entity", "relation", "target_entity")))
+
+    @named_query
+    def attributes_of_instances(self, entity, instances):
+        """Sparql query to get attributes of some instances of an entity, with their datatype
+
+        Rows are the rows of entities_and_attributes.
+
+        Parameters
+        ----------
+        entity : string
+            The entity
+        instances : list
+            Instances of the entity
+
+        Returns
+        -------
+        str
+            SPARQL query
+        """
+        return textwrap.dedent('''
+        SELECT DISTINCT ?entity ?attribute ?datatype
+        WHERE {{
+            VALUES ?instance_of_entity {{ {instances} }}
+            # Get entities
+            ?instance_of_entity a ?entity .
+            FILTER (?entity = <{entity}>)
+            {exclusion}
+            # Attributes
+            ?instance_of_entity ?attribute ?value .
+            FILTER (isLiteral(?value))
+            BIND (IF(isNumeric(?value), xsd:decimal, DATATYPE(?value)) AS ?datatype)
+        }}
+        '''.format(entity=entity, instances=self.values(instances), exclusion=self.exclusion_filter("entity")))
+
+    @property
+    @named_query
+    def get_predicates(self):
+        """Sparql query to get all predicates
+
+        Returns
+        -------
+        str
+            SPARQL query
+        """
+        return textwrap.dedent('''
+        SELECT DISTINCT ?predicate
+        WHERE {
+            ?subject ?predicate ?object .
+        }
+        ''')
+
+    @named_query
+    def entities_and_relations_of(self, entity=None, predicate=None):
+        """Sparql query to get entities and relations, restricted to a source entity and/or a predicate
+
+        Rows are the rows of entities_and_relations.
+
+        Parameters
+        ----------
+        entity : string, optional
+            The source entity
+        predicate : string, optional
+            The predicate
+
+        Returns
+        -------
+        str
+            SPARQL query
+        """
+        source = "<{}>".format(entity) if entity else "?source_entity"
+        relation = "<{}>".format(predicate) if predicate else "?relation"
+        binds = "".join("\n            BIND ({} AS ?{})".format(value, variable) for value, variable in ((source, "source_entity"), (relation, "relation")) if not value.startswith("?"))
+        return textwrap.dedent('''
+        SELECT DISTINCT ?source_entity ?relation ?target_entity ?mother_source ?mother_target
+        WHERE {{
+            # Get entities
+            ?instance_of_source a {source} .
+            ?instance_of_target a ?target_entity .
+            # Relations
+            ?instance_of_source {relation} ?instance_of_target .{binds}
+            {exclusion}
+
+            OPTIONAL {{
+                {source} rdfs:subClassOf ?mother_source .
             }}
+            OPTIONAL {{
+                ?target_entity rdfs:subClassOf ?mother_target .
+            }}
+        }}
+        '''.format(source=source, relation=relation, binds=binds, exclusion=self.exclusion_filter("source_entity", "relation", "target_entity")))
+
+    @named_query
+    def entities_and_attributes_of(self, entity=None, predicate=None):
+        """Sparql query to get entities and attributes, restricted to an entity and/or a predicate
+
+        Rows are the rows of entities_and_attributes.
+
+        Parameters
+        ----------
+        entity : string, optional
+            The entity
+        predicate : string, optional
+            The predicate
+
+        Returns
+        -------
+        str
+            SPARQL query
+        """
+        source = "<{}>".format(entity) if entity else "?entity"
+        attribute = "<{}>".format(predicate) if predicate else "?attribute"
+        binds = "".join("\n            BIND ({} AS ?{})".format(value, variable) for value, variable in ((source, "entity"), (attribute, "attribute")) if not value.startswith("?"))
+        return textwrap.dedent('''
+        SELECT DISTINCT ?entity ?attribute ?datatype
+        WHERE {{
+            # Get entities
+            ?instance_of_entity a {source} .
+            # Attributes
+            ?instance_of_entity {attribute} ?value .
+            FILTER (isLiteral(?value))
+            BIND (IF(isNumeric(?value), xsd:decimal, DATATYPE(?value)) AS ?datatype){binds}
+            {exclusion}
+        }}
+        '''.format(source=source, attribute=attribute, binds=binds, exclusion=self.exclusion_filter("entity")))
+
+    @named_query
+    def get_predicates_of_entity(self, entity):
+        """Sparql query to get all predicates of the instances of an entity
+
+        Parameters
+        ----------
+        entity : string
+            The entity
+
+        Returns
+        -------
+        str
+            SPARQL query
+        """
+        return textwrap.dedent('''
+        SELECT DISTINCT ?predicate
+        WHERE {{
+            ?instance a <{}> .
+            ?instance ?predicate ?object .
         }}
-        '''.format(ontology=ontology))
+        '''.format(entity))
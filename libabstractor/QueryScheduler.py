@@ -0,0 +1,57 @@
+import collections
+import concurrent.futures
+
+
+class QueryScheduler(object):
+    """Run query tasks concurrently on a bounded pool of workers
+
+    Results are always yielded in submission order, so merging them into the
+    RdfGraph gives exactly the same abstraction as a serial run.
+
+    Attributes
+    ----------
+    jobs : int
+        Maximum number of tasks running at the same time
+    """
+
+    def __init__(self, jobs=1):
+        """Init
+
+        Parameters
+        ----------
+        jobs : int, optional
+            Maximum number of tasks running at the same time
+        """
+        self.jobs = max(1, jobs or 1)
+
+    def map(self, function, items):
+        """Apply function on each item and yield results in order
+
+        At most `jobs` tasks are running, and at most `2 * jobs` results are
+        waiting to be consumed, so memory stays bounded on long item lists.
+
+        Parameters
+        ----------
+        function : callable
+            Task to run on each item (typically, one or more queries)
+        items : iterable
+            Task arguments
+
+        Yields
+        ------
+        object
+            Result of function(item), in the order of items
+        """
+        if self.jobs == 1:
+            for item in items:
+                yield function(item)
+            return
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            pending = collections.deque()
+            for item in items:
+                pending.append(executor.submit(function, item))
+                if len(pending) >= 2 * self.jobs:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
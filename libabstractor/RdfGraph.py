@@ -1,34 +1,103 @@
-import re
-from datetime import datetime
+from libabstractor.LabelEngine import LabelEngine
+from libabstractor.SchemaModel import SchemaModel
 
 import rdflib
 
 
+XSD_DECIMAL = str(rdflib.XSD.decimal)
+
+
 class RdfGraph(object):
     """Summary
 
     Attributes
     ----------
-    gprefix : rdflib.namespace.Namespace
-        Rdf prefix for askomics
-    graph : rdflib.Graph
-        The RDF graph
+    namespace_internal : rdflib.namespace.Namespace
+        AskOmics internal namespace
+    model : SchemaModel
+        Schema of the abstraction
+    label_engine : LabelEngine
+        Label generator
+    excluded_namespaces : tuple
+        Namespaces (lower case) of entities discarded by check_entity
+    state : AbstractionState
+        Rows and fingerprints of the entities, for the next incremental run
+        (None if the run was not incremental)
     """
 
-    def __init__(self, namespace_internal):
+    default_excluded_namespaces = (
+        "http://www.w3.org",
+        "http://www.openlinksw.com",
+        "http://biohackathon.org/resource/faldo"
+    )
+
+    def __init__(self, namespace_internal, label_engine=None, excluded_namespaces=None):
         """init
 
         Parameters
         ----------
         namespace_internal : str
             AskOmics internal namespace
+        label_engine : LabelEngine, optional
+            Label generator (default: uncamel strategy)
+        excluded_namespaces : list, optional
+            Namespaces of entities discarded, in addition to the default ones
+            (rdf, rdfs, owl, virtuoso, faldo, and the AskOmics internal namespace)
         """
         self.namespace_internal = rdflib.namespace.Namespace(namespace_internal)
-        self.graph = rdflib.Graph()
+        self.model = SchemaModel()
+        self.label_engine = label_engine or LabelEngine()
+        self.excluded_namespaces = tuple(namespace.lower() for namespace in self.default_excluded_namespaces + (str(self.namespace_internal), ) + tuple(excluded_namespaces or ()))
+        self.state = None
+
+        self.entity_types = (str(self.namespace_internal["entity"]), str(self.namespace_internal["startPoint"]), str(rdflib.OWL.Class))
+        self.relation_types = (str(rdflib.OWL.ObjectProperty), str(self.namespace_internal["AskomicsRelation"]))
+        self.attribute_types = (str(rdflib.OWL.DatatypeProperty), )
+
+    @property
+    def graph(self):
+        """The abstraction, as a rdflib Graph
+
+        Returns
+        -------
+        rdflib.Graph
+            The RDF graph
+        """
+        graph = rdflib.Graph()
+        graph.bind('askomics', self.namespace_internal)
+        graph.bind('owl', "http://www.w3.org/2002/07/owl#")
+        for triple in self.triples():
+            graph.add(triple)
+        return graph
 
-        self.graph.bind('askomics', namespace_internal)
-        self.graph.bind('owl', "http://www.w3.org/2002/07/owl#")
-        self.prov = rdflib.Namespace('http://www.w3.org/ns/prov#')
+    @property
+    def prefixes(self):
+        """Prefixes used to write the abstraction
+
+        Returns
+        -------
+        dict
+            Prefix -> namespace
+        """
+        return {
+            "askomics": str(self.namespace_internal),
+            "owl": str(rdflib.OWL),
+            "prov": "http://www.w3.org/ns/prov#",
+            "rdf": str(rdflib.RDF),
+            "rdfs": str(rdflib.RDFS),
+            "xsd": str(rdflib.XSD)
+        }
+
+    def triples(self):
+        """Triples of the abstraction
+
+        Yields
+        ------
+        tuple
+            subject, predicate, object (rdflib terms)
+        """
+        labels = self.label_engine.labels(self.model.auto_labelled())
+        yield from self.model.triples(self.namespace_internal, labels.get)
 
     def check_entity(self, entity):
         """Check if entity is correct (not rdf rdfs owl or virtuoso thing)
@@ -43,14 +112,7 @@ class RdfGraph(object):
         bool
             True if entity is a true one
         """
-        excluded_namespaces = (
-            "http://www.w3.org",
-            "http://www.openlinksw.com",
-            self.namespace_internal[""],
-            "http://biohackathon.org/resource/faldo"
-        )
-
-        if entity.lower().startswith(excluded_namespaces):
+        if entity.lower().startswith(self.excluded_namespaces):
             return False
         return True
 
@@ -62,26 +124,68 @@ class RdfGraph(object):
         location : str
             URL of distant endpoint
         """
-        self.graph.add((rdflib.BNode("graph"), rdflib.RDF.type, self.prov["Entity"]))
-        self.graph.add((rdflib.BNode("graph"), self.prov.atLocation, rdflib.Literal(location)))
-        self.graph.add((rdflib.BNode("graph"), self.prov.generatedAtTime, rdflib.Literal(datetime.now())))
-        self.graph.add((rdflib.BNode("graph"), self.prov.wasGeneratedBy, rdflib.URIRef("https://github.com/askomics/abstractor")))
+        self.model.add_location(location)
+
+    def set_sample(self, size, method):
+        """Record that the abstraction is estimated from a sample of instances
+
+        Parameters
+        ----------
+        size : int
+            Maximum number of instances scanned per entity
+        method : str
+            Sampling method
+        """
+        self.model.set_sample(size, method)
+
+    def add_gap(self, gap):
+        """Record a query given up, the abstraction may be incomplete
+
+        Parameters
+        ----------
+        gap : dict
+            query, entity, predicate, error
+        """
+        self.model.add_gap(gap)
+
+    def update(self, model):
+        """Merge the abstraction of another source
+
+        Parameters
+        ----------
+        model : SchemaModel
+            Abstraction to merge
+        """
+        self.model.update(model)
+
+    def add_entity(self, entity, mother=None):
+        """Add an entity
+
+        Parameters
+        ----------
+        entity : str
+            Entity URI
+        mother : str, optional
+            Parent entity URI
+        """
+        resource = self.model.entity(entity)
+        resource.types.update(self.entity_types)
+        resource.no_labels = True
+        resource.auto_label = True
+        if mother:
+            resource.parents.add(mother)
 
     def add_entities(self, sparql_result):
         """Add entities
 
         Parameters
         ----------
-        sparql_result : list
-            Sparql result
+        sparql_result : iterable
+            Sparql result rows (see ResultRow)
         """
         for result in sparql_result:
-            if self.check_entity(result["entity"]):
-                self.graph.add((rdflib.URIRef(result["entity"]), rdflib.RDF.type, self.namespace_internal["entity"]))
-                self.graph.add((rdflib.URIRef(result["entity"]), rdflib.RDF.type, self.namespace_internal["startPoint"]))
-                self.graph.add((rdflib.URIRef(result["entity"]), rdflib.RDF.type, rdflib.OWL.Class))
-                self.graph.add((rdflib.URIRef(result["entity"]), self.namespace_internal["instancesHaveNoLabels"], rdflib.Literal(True)))
-                self.graph.add((rdflib.URIRef(result["entity"]), rdflib.RDFS.label, rdflib.Literal(self.get_label(result["entity"]))))
+            if self.check_entity(result.entity):
+                self.add_entity(result.entity)
 
     def add_relation(self, source_entity, relation, target_entity):
         """Add a relation
@@ -97,11 +201,11 @@ class RdfGraph(object):
         """
         # Relation
         if self.check_entity(relation):
-            self.graph.add((rdflib.URIRef(relation), rdflib.RDF.type, rdflib.OWL.ObjectProperty))
-            self.graph.add((rdflib.URIRef(relation), rdflib.RDF.type, self.namespace_internal["AskomicsRelation"]))
-            self.graph.add((rdflib.URIRef(relation), rdflib.RDFS.label, rdflib.Literal(self.get_label(relation))))
-            self.graph.add((rdflib.URIRef(relation), rdflib.RDFS.domain, rdflib.URIRef(source_entity)))
-            self.graph.add((rdflib.URIRef(relation), rdflib.RDFS.range, rdflib.URIRef(target_entity)))
+            resource = self.model.relation(relation)
+            resource.types.update(self.relation_types)
+            resource.auto_label = True
+            resource.domains.add(source_entity)
+            resource.ranges.add(target_entity)
 
     def add_attribute(self, entity, attribute, decimal=True):
         """Add attribute
@@ -114,201 +218,166 @@ class RdfGraph(object):
             Attribue URI
         """
         if self.check_entity(entity):
-            self.graph.add((rdflib.URIRef(attribute), rdflib.RDF.type, rdflib.OWL.DatatypeProperty))
-            self.graph.add((rdflib.URIRef(attribute), rdflib.RDFS.label, rdflib.Literal(self.get_label(attribute))))
-            self.graph.add((rdflib.URIRef(attribute), rdflib.RDFS.domain, rdflib.URIRef(entity)))
-            self.graph.add((rdflib.URIRef(attribute), rdflib.RDFS.range, rdflib.XSD.decimal if decimal else rdflib.XSD.string))
+            resource = self.model.attribute(attribute)
+            resource.types.update(self.attribute_types)
+            resource.auto_label = True
+            resource.domains.add(entity)
+            resource.ranges.add(str(rdflib.XSD.decimal if decimal else rdflib.XSD.string))
 
     def add_entities_and_relations(self, sparql_result):
         """Add entities and relation in the rdf graph
 
         Parameters
         ----------
-        sparql_result : list
-            Sparql result
+        sparql_result : iterable
+            Sparql result rows (see ResultRow)
         """
-        entities = []
-
         # Entities and relations
         for result in sparql_result:
-            source_entity = result["source_entity"]
-            target_entity = result["target_entity"]
-            relation = result["relation"]
-            mother_source = result["mother_source"] if "mother_source" in result else None
-            mother_target = result["mother_target"] if "mother_target" in result else None
+            source_entity = result.source_entity
+            target_entity = result.target_entity
 
             # Source entity
-            if self.check_entity(source_entity) and source_entity not in entities:
-                entities.append(source_entity)
-                self.graph.add((rdflib.URIRef(source_entity), rdflib.RDF.type, self.namespace_internal["entity"]))
-                self.graph.add((rdflib.URIRef(source_entity), rdflib.RDF.type, self.namespace_internal["startPoint"]))
-                self.graph.add((rdflib.URIRef(source_entity), rdflib.RDF.type, rdflib.OWL.Class))
-                self.graph.add((rdflib.URIRef(source_entity), self.namespace_internal["instancesHaveNoLabels"], rdflib.Literal(True)))
-                self.graph.add((rdflib.URIRef(source_entity), rdflib.RDFS.label, rdflib.Literal(self.get_label(source_entity))))
-                if mother_source:
-                    self.graph.add((rdflib.URIRef(source_entity), rdflib.RDFS.subClassOf, rdflib.URIRef(mother_source)))
+            if self.check_entity(source_entity):
+                self.add_entity(source_entity, result.mother_source)
 
             # Target entity
-            if self.check_entity(target_entity) and target_entity not in entities:
-                entities.append(target_entity)
-                self.graph.add((rdflib.URIRef(target_entity), rdflib.RDF.type, self.namespace_internal["entity"]))
-                self.graph.add((rdflib.URIRef(target_entity), rdflib.RDF.type, self.namespace_internal["startPoint"]))
-                self.graph.add((rdflib.URIRef(target_entity), rdflib.RDF.type, rdflib.OWL.Class))
-                self.graph.add((rdflib.URIRef(target_entity), self.namespace_internal["instancesHaveNoLabels"], rdflib.Literal(True)))
-                self.graph.add((rdflib.URIRef(target_entity), rdflib.RDFS.label, rdflib.Literal(self.get_label(target_entity))))
-                if mother_target:
-                    self.graph.add((rdflib.URIRef(source_entity), rdflib.RDFS.subClassOf, rdflib.URIRef(mother_target)))
+            if self.check_entity(target_entity):
+                self.add_entity(target_entity, result.mother_target)
 
             # Relation
-            if self.check_entity(relation):
-                self.graph.add((rdflib.URIRef(relation), rdflib.RDF.type, rdflib.OWL.ObjectProperty))
-                self.graph.add((rdflib.URIRef(relation), rdflib.RDF.type, self.namespace_internal["AskomicsRelation"]))
-                self.graph.add((rdflib.URIRef(relation), rdflib.RDFS.label, rdflib.Literal(self.get_label(relation))))
-                self.graph.add((rdflib.URIRef(relation), rdflib.RDFS.domain, rdflib.URIRef(source_entity)))
-                self.graph.add((rdflib.URIRef(relation), rdflib.RDFS.range, rdflib.URIRef(target_entity)))
+            self.add_relation(source_entity, result.relation, target_entity)
 
     def add_entities_askomics(self, sparql_result):
         """Add entities (Askomics definition) in the rdf graph
 
         Parameters
         ----------
-        sparql_result : list
-            Sparql result
+        sparql_result : iterable
+            Sparql result rows (see ResultRow)
         """
         # ?entity ?startPoint ?faldoObject
         for result in sparql_result:
-            entity = result["entity"]
-            label = result["label"]
-            start_point = bool(result["startPoint"].lower() in ['true', '1'])
-            faldo_object = bool(result["faldoObject"].lower() in ['true', '1'])
-
-            self.graph.add((rdflib.URIRef(entity), rdflib.RDF.type, self.namespace_internal["entity"]))
-            self.graph.add((rdflib.URIRef(entity), rdflib.RDF.type, rdflib.OWL.Class))
-            self.graph.add((rdflib.URIRef(entity), rdflib.RDFS.label, rdflib.Literal(label)))
+            start_point = bool(result.startPoint.lower() in ['true', '1'])
+            faldo_object = bool(result.faldoObject.lower() in ['true', '1'])
+
+            resource = self.model.entity(result.entity)
+            resource.types.update((str(self.namespace_internal["entity"]), str(rdflib.OWL.Class)))
+            resource.labels.add(result.label)
             if start_point:
-                self.graph.add((rdflib.URIRef(entity), rdflib.RDF.type, self.namespace_internal["startPoint"]))
+                resource.types.add(str(self.namespace_internal["startPoint"]))
             if faldo_object:
-                self.graph.add((rdflib.URIRef(entity), rdflib.RDF.type, self.namespace_internal["faldo"]))
+                resource.types.add(str(self.namespace_internal["faldo"]))
 
     def add_relations_askomics(self, sparql_result):
         """Add entities (Askomics definition) in the rdf graph
 
         Parameters
         ----------
-        sparql_result : list
-            Sparql result
+        sparql_result : iterable
+            Sparql result rows (see ResultRow)
         """
         # ?entitySource ?entityTarget ?relation
         for result in sparql_result:
-            entity_source = result["entitySource"]
-            entity_target = result["entityTarget"]
-            relation = result["relation"]
-            label = result["label"]
-
-            self.graph.add((rdflib.URIRef(relation), rdflib.RDF.type, self.namespace_internal["AskomicsRelation"]))
-            self.graph.add((rdflib.URIRef(relation), rdflib.RDF.type, rdflib.OWL.ObjectProperty))
-            self.graph.add((rdflib.URIRef(relation), rdflib.RDFS.domain, rdflib.URIRef(entity_source)))
-            self.graph.add((rdflib.URIRef(relation), rdflib.RDFS.range, rdflib.URIRef(entity_target)))
-            self.graph.add((rdflib.URIRef(relation), rdflib.RDFS.label, rdflib.Literal(label)))
+            resource = self.model.relation(result.relation)
+            resource.types.update(self.relation_types)
+            resource.domains.add(result.entitySource)
+            resource.ranges.add(result.entityTarget)
+            resource.labels.add(result.label)
 
     def add_attributes_askomics(self, sparql_result):
         """Add attributes (Askomics definition) in the rdf graph
 
         Parameters
         ----------
-        sparql_result : list
-            Sparql result
+        sparql_result : iterable
+            Sparql result rows (see ResultRow)
         """
         # ?entity ?att ?label ?range ?faldoStart ?faldoEnd
         for result in sparql_result:
-            entity = result["entity"]
-            att = result["att"]
-            label = result["label"]
-            range = result["range"]
-            faldo_start = bool(result["faldoStart"].lower() in ['true', '1'])
-            faldo_end = bool(result["faldoEnd"].lower() in ['true', '1'])
-
-            self.graph.add((rdflib.URIRef(att), rdflib.RDF.type, rdflib.OWL.DatatypeProperty))
-            self.graph.add((rdflib.URIRef(att), rdflib.RDFS.domain, rdflib.URIRef(entity)))
-            self.graph.add((rdflib.URIRef(att), rdflib.RDFS.range, rdflib.URIRef(range)))
-            self.graph.add((rdflib.URIRef(att), rdflib.RDFS.label, rdflib.Literal(label)))
+            faldo_start = bool(result.faldoStart.lower() in ['true', '1'])
+            faldo_end = bool(result.faldoEnd.lower() in ['true', '1'])
+
+            resource = self.model.attribute(result.att)
+            resource.types.update(self.attribute_types)
+            resource.domains.add(result.entity)
+            resource.ranges.add(result.range)
+            resource.labels.add(result.label)
             if faldo_start:
-                self.graph.add((rdflib.URIRef(att), rdflib.RDF.type, self.namespace_internal["faldoStart"]))
+                resource.types.add(str(self.namespace_internal["faldoStart"]))
             if faldo_end:
-                self.graph.add((rdflib.URIRef(att), rdflib.RDF.type, self.namespace_internal["faldoEnd"]))
+                resource.types.add(str(self.namespace_internal["faldoEnd"]))
 
     def add_categories_askomics(self, sparql_result):
         """Add categories (Askomics definition) in the rdf graph
 
         Parameters
         ----------
-        sparql_result : list
-            Sparql result
+        sparql_result : iterable
+            Sparql result rows (see ResultRow)
         """
-        categories = []
         # ?cat ?label ?entity ?catValueType ?valueCategory valueCategoryLabel ?faldoReference
         for result in sparql_result:
-            entity = result["entity"]
-            cat = result["cat"]
-            label = result["label"]
-            category_type = result["catValueType"]
-            category_value = result["valueCategory"]
-            category_value_label = result["valueCategoryLabel"]
-            category_value_type = result["valueCategoryType"]
-            faldo_ref = bool(result["faldoReference"].lower() in ['true', '1'])
-
-            if cat not in categories:
-                categories.append(cat)
-                self.graph.add((rdflib.URIRef(cat), rdflib.RDF.type, self.namespace_internal["AskomicsCategory"]))
-                self.graph.add((rdflib.URIRef(cat), rdflib.RDF.type, rdflib.OWL.ObjectProperty))
-                self.graph.add((rdflib.URIRef(cat), rdflib.RDFS.label, rdflib.Literal(label)))
-                self.graph.add((rdflib.URIRef(cat), rdflib.RDFS.domain, rdflib.URIRef(entity)))
-                self.graph.add((rdflib.URIRef(cat), rdflib.RDFS.range, rdflib.URIRef(category_type)))
-                if faldo_ref:
-                    self.graph.add((rdflib.URIRef(cat), rdflib.RDF.type, self.namespace_internal["faldoReference"]))
-
-            self.graph.add((rdflib.URIRef(category_type), self.namespace_internal["category"], rdflib.URIRef(category_value)))
-            self.graph.add((rdflib.URIRef(category_value), rdflib.RDFS.label, rdflib.Literal(category_value_label)))
-            self.graph.add((rdflib.URIRef(category_value), rdflib.RDF.type, rdflib.URIRef(category_value_type)))
-
-    def add_decimal_attributes(self, sparql_result):
-        """Add decimal  in the rdf graph
+            faldo_ref = bool(result.faldoReference.lower() in ['true', '1'])
+
+            resource = self.model.category(result.cat)
+            resource.types.update((str(self.namespace_internal["AskomicsCategory"]), str(rdflib.OWL.ObjectProperty)))
+            resource.labels.add(result.label)
+            resource.domains.add(result.entity)
+            resource.ranges.add(result.catValueType)
+            if faldo_ref:
+                resource.types.add(str(self.namespace_internal["faldoReference"]))
+
+            self.model.category_type(result.catValueType).values.add(result.valueCategory)
+            value = self.model.category_value(result.valueCategory)
+            value.labels.add(result.valueCategoryLabel)
+            value.types.add(result.valueCategoryType)
+
+    def add_text_attribute(self, entity, attribute):
+        """Add a text attribute (rdfs:label marks the entity as labelled)
 
         Parameters
         ----------
-        sparql_result : list
-            Sparql result
+        entity : str
+            Source URI
+        attribute : str
+            Attribute URI
         """
-        for result in sparql_result:
-            entity = result["entity"]
-            attribute = result["attribute"]
+        if self.check_entity(entity):
+            if attribute == "http://www.w3.org/2000/01/rdf-schema#label":
+                self.model.entity(entity).has_labels = True
+            else:
+                self.add_attribute(entity, attribute, decimal=False)
 
-            if self.check_entity(entity):
-                self.graph.add((rdflib.URIRef(attribute), rdflib.RDF.type, rdflib.OWL.DatatypeProperty))
-                self.graph.add((rdflib.URIRef(attribute), rdflib.RDFS.label, rdflib.Literal(self.get_label(attribute))))
-                self.graph.add((rdflib.URIRef(attribute), rdflib.RDFS.domain, rdflib.URIRef(entity)))
-                self.graph.add((rdflib.URIRef(attribute), rdflib.RDFS.range, rdflib.XSD.decimal))
+    @staticmethod
+    def is_decimal(datatype):
+        """Check if an attribute datatype (see QueryLibrary.entities_and_attributes) is decimal
+
+        Parameters
+        ----------
+        datatype : str
+            Datatype URI (None for literals without datatype)
+
+        Returns
+        -------
+        bool
+            True for numeric values
+        """
+        return datatype == XSD_DECIMAL
 
-    def add_text_attributes(self, sparql_result):
-        """Add text  in the rdf graph
+    def add_attributes(self, sparql_result):
+        """Add attributes in the rdf graph, decimal or text according to their datatype
 
         Parameters
         ----------
-        sparql_result : list
-            Sparql result
+        sparql_result : iterable
+            Sparql result rows (see ResultRow), with a datatype column
         """
         for result in sparql_result:
-            entity = result["entity"]
-            attribute = result["attribute"]
-
-            if self.check_entity(entity):
-                if attribute == "http://www.w3.org/2000/01/rdf-schema#label":
-                    self.graph.remove((rdflib.URIRef(entity), self.namespace_internal["instancesHaveNoLabels"], rdflib.Literal(True)))
-                else:
-                    self.graph.add((rdflib.URIRef(attribute), rdflib.RDF.type, rdflib.OWL.DatatypeProperty))
-                    self.graph.add((rdflib.URIRef(attribute), rdflib.RDFS.label, rdflib.Literal(self.get_label(attribute))))
-                    self.graph.add((rdflib.URIRef(attribute), rdflib.RDFS.domain, rdflib.URIRef(entity)))
-                    self.graph.add((rdflib.URIRef(attribute), rdflib.RDFS.range, rdflib.XSD.string))
+            if self.is_decimal(result.datatype):
+                self.add_attribute(result.entity, result.attribute)
+            else:
+                self.add_text_attribute(result.entity, result.attribute)
 
     def get_label(self, uri):
         """Get a label from an URI
@@ -323,7 +392,7 @@ class RdfGraph(object):
         string
             Label
         """
-        return self.uncamel(uri.split("/")[-1].split("#")[-1].replace("_", " "))
+        return self.label_engine.label(uri)
 
     @staticmethod
     def uncamel(string):
@@ -339,9 +408,4 @@ class RdfGraph(object):
         str
             Uncamel Cased string
         """
-        re_outer = re.compile(r'([^A-Z ])([A-Z])')
-        re_inner = re.compile(r'\b[A-Z]+(?=[A-Z][a-z])')
-        uncameled = re_inner.sub(r'\g<0> ', re_outer.sub(r'\1 \2', string))
-        if uncameled[0].islower():
-            return uncameled.lower()
-        return uncameled
+        return LabelEngine.uncamel(string)
@@ -0,0 +1,63 @@
+import collections
+import functools
+import sys
+
+
+class ResultRow(object):
+    """Compact rows of query results
+
+    A row is a named tuple (no per-row dict), with one field per variable of
+    the query. Unbound variables are None. Values are interned, so an URI
+    repeated on thousands of rows is stored only once.
+    """
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def get_class(variables):
+        """Get the row class of a list of variables
+
+        Parameters
+        ----------
+        variables : tuple
+            Variables of the query
+
+        Returns
+        -------
+        type
+            Named tuple class
+        """
+        return collections.namedtuple("ResultRow", variables, rename=True)
+
+    @staticmethod
+    def intern(value):
+        """Intern a value
+
+        Parameters
+        ----------
+        value : str
+            Value (or None)
+
+        Returns
+        -------
+        str
+            The shared copy of value
+        """
+        return None if value is None else sys.intern(value)
+
+    @classmethod
+    def from_values(cls, variables, values):
+        """Create a row
+
+        Parameters
+        ----------
+        variables : tuple
+            Variables of the query
+        values : iterable
+            Values of the row, in the order of variables
+
+        Returns
+        -------
+        tuple
+            The row
+        """
+        return cls.get_class(variables)._make(cls.intern(value) for value in values)
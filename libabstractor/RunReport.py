@@ -0,0 +1,240 @@
+import cProfile
+import contextlib
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+
+class RunReport(object):
+    """Timings of the phases and queries of a run
+
+    Each query is recorded with the phase running when it was sent, so a slow
+    run can be tracked down to a phase and a QueryLibrary method.
+
+    Attributes
+    ----------
+    phases : list
+        Phases (dicts: name, duration, memory). max_rss is the peak RSS of
+        the process at the end of the phase, since the start of the process
+        (ru_maxrss can't be reset). With profile, peak_traced_memory is the
+        peak of the phase (Python 3.9+), and traced_memory the memory
+        allocated at the end of the phase
+    queries : list
+        Queries (dicts: phase, method, origin, pages, rows, bytes, retries, latency, duration)
+    gaps : list
+        Parts of the abstraction that could not be queried (dicts: query, entity, predicate, error)
+    sources : list
+        Reports of sources abstracted in other processes (dicts: source, type, and
+        their report)
+    profile : bool
+        If True, profile the run with cProfile and trace memory allocations
+        with tracemalloc
+    """
+
+    def __init__(self, profile=False):
+        """Init
+
+        Parameters
+        ----------
+        profile : bool, optional
+            Profile the run with cProfile and tracemalloc
+        """
+        self.phases = []
+        self.queries = []
+        self.gaps = []
+        self.sources = []
+        self.profile = profile
+        self.current_phase = None
+        self.start_date = datetime.now()
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+
+        self.profiler = None
+        if self.profile:
+            tracemalloc.start()
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    @staticmethod
+    def peak_rss():
+        """Get the peak RSS of the process, so far
+
+        Returns
+        -------
+        int
+            Peak RSS, in bytes (None if unknown)
+        """
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux, in bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Measure a phase of the run
+
+        Parameters
+        ----------
+        name : str
+            Name of the phase
+        """
+        previous_phase = self.current_phase
+        self.current_phase = name
+        # tracemalloc.reset_peak needs Python 3.9
+        per_phase_peak = self.profile and hasattr(tracemalloc, "reset_peak")
+        if per_phase_peak:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            phase = {
+                "name": name,
+                "duration": time.perf_counter() - start,
+                "max_rss": self.peak_rss()
+            }
+            if self.profile:
+                phase["traced_memory"], peak_traced_memory = tracemalloc.get_traced_memory()
+                if per_phase_peak:
+                    phase["peak_traced_memory"] = peak_traced_memory
+            self.phases.append(phase)
+            self.current_phase = previous_phase
+
+    def start_query(self, query, origin):
+        """Start recording a query
+
+        Parameters
+        ----------
+        query : str
+            The query (a NamedQuery, if it comes from the QueryLibrary)
+        origin : str
+            file, endpoint or cache
+
+        Returns
+        -------
+        dict
+            Record of the query, filled by SparqlQuery
+        """
+        return {
+            "phase": self.current_phase,
+            "method": getattr(query, "name", None),
+            "origin": origin,
+            "pages": 0,
+            "rows": 0,
+            "bytes": 0,
+            "retries": 0,
+            "latency": None,
+            "duration": None,
+            "start": time.perf_counter()
+        }
+
+    def end_query(self, record):
+        """End recording a query
+
+        Parameters
+        ----------
+        record : dict
+            Record of the query
+        """
+        record["duration"] = time.perf_counter() - record.pop("start")
+        with self.lock:
+            self.queries.append(record)
+
+    def add_gap(self, gap):
+        """Record a part of the abstraction that could not be queried
+
+        Parameters
+        ----------
+        gap : dict
+            query, entity, predicate, error
+        """
+        with self.lock:
+            self.gaps.append(gap)
+
+    def add_source(self, source, source_type, report):
+        """Record the report of a source abstracted in another process
+
+        Parameters
+        ----------
+        source : str
+            The source
+        source_type : str
+            Source format
+        report : dict
+            Report of the source (see to_dict)
+        """
+        with self.lock:
+            self.sources.append(dict(source=source, type=source_type, **report))
+            self.gaps += report["gaps"]
+
+    def get_profile(self, limit=30):
+        """Get the functions with the highest cumulative time
+
+        Parameters
+        ----------
+        limit : int, optional
+            Number of functions
+
+        Returns
+        -------
+        list
+            Functions (dicts: function, calls, total time, cumulative time)
+        """
+        self.profiler.disable()
+        stats = pstats.Stats(self.profiler, stream=io.StringIO())
+        functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+        return [{
+            "function": "{}:{}({})".format(*function),
+            "calls": calls,
+            "total_time": total_time,
+            "cumulative_time": cumulative_time
+        } for function, (_, calls, total_time, cumulative_time, _) in functions]
+
+    def to_dict(self):
+        """Get the report
+
+        Returns
+        -------
+        dict
+            The report
+        """
+        report = {
+            "start": self.start_date.isoformat(),
+            "duration": time.perf_counter() - self.start,
+            "peak_rss": self.peak_rss(),
+            "phases": self.phases,
+            "queries": self.queries,
+            "gaps": self.gaps
+        }
+        if self.sources:
+            report["sources"] = self.sources
+        if self.profile:
+            report["profile"] = self.get_profile()
+        return report
+
+    def write(self, path, **information):
+        """Write the report into a JSON file
+
+        Parameters
+        ----------
+        path : str
+            Output file
+        **information
+            Additional information about the run (source, mode...)
+        """
+        report = dict(information)
+        report.update(self.to_dict())
+        with open(path, "w") as output:
+            json.dump(report, output, indent=2, default=str)
@@ -0,0 +1,318 @@
+import collections
+from datetime import datetime
+
+import rdflib
+
+
+class SchemaResource(object):
+    """An entity, property or category value of the schema
+
+    Attributes
+    ----------
+    types : set
+        rdf:type URIs
+    labels : set
+        rdfs:label values
+    auto_label : bool
+        If True, a label is generated from the URI
+    domains : set
+        rdfs:domain URIs
+    ranges : set
+        rdfs:range URIs
+    parents : set
+        rdfs:subClassOf URIs
+    values : set
+        Category values URIs (askomics:category)
+    no_labels : bool
+        True if instances of the entity have no rdfs:label
+    has_labels : bool
+        True if instances of the entity have a rdfs:label
+    """
+
+    __slots__ = ("types", "labels", "auto_label", "domains", "ranges", "parents", "values", "no_labels", "has_labels")
+
+    def __init__(self):
+        """init"""
+        self.types = set()
+        self.labels = set()
+        self.auto_label = False
+        self.domains = set()
+        self.ranges = set()
+        self.parents = set()
+        self.values = set()
+        self.no_labels = False
+        self.has_labels = False
+
+    def update(self, other):
+        """Merge another resource into this one
+
+        Parameters
+        ----------
+        other : SchemaResource
+            Resource to merge
+        """
+        self.types |= other.types
+        self.labels |= other.labels
+        self.auto_label = self.auto_label or other.auto_label
+        self.domains |= other.domains
+        self.ranges |= other.ranges
+        self.parents |= other.parents
+        self.values |= other.values
+        self.no_labels = self.no_labels or other.no_labels
+        self.has_labels = self.has_labels or other.has_labels
+
+
+class SchemaModel(object):
+    """In-memory schema of the abstraction
+
+    Rows of queries are merged into hashed dicts and sets of resources, and
+    converted to triples only once, at the end.
+
+    Attributes
+    ----------
+    entities : dict
+        Entity URI -> SchemaResource
+    relations : dict
+        Relation URI -> SchemaResource
+    attributes : dict
+        Attribute URI -> SchemaResource
+    categories : dict
+        Category URI -> SchemaResource
+    category_types : dict
+        Category type URI -> SchemaResource (with values)
+    category_values : dict
+        Category value URI -> SchemaResource
+    locations : list
+        Locations of the data
+    generated_at : datetime
+        Generation date of the abstraction (None if no location)
+    sample_size : int
+        Maximum number of instances scanned per entity (None if all instances were scanned)
+    sample_method : str
+        Sampling method of instances
+    gaps : list
+        Queries given up, the abstraction may be incomplete (dicts: query, entity, predicate, error)
+    """
+
+    def __init__(self):
+        """init"""
+        self.entities = {}
+        self.relations = {}
+        self.attributes = {}
+        self.categories = {}
+        self.category_types = {}
+        self.category_values = {}
+        self.locations = []
+        self.generated_at = None
+        self.sample_size = None
+        self.sample_method = None
+        self.gaps = []
+
+    @staticmethod
+    def get_resource(resources, uri):
+        """Get a resource, create it if needed
+
+        Parameters
+        ----------
+        resources : dict
+            URI -> SchemaResource
+        uri : str
+            URI of the resource
+
+        Returns
+        -------
+        SchemaResource
+            The resource
+        """
+        resource = resources.get(uri)
+        if resource is None:
+            resource = resources[uri] = SchemaResource()
+        return resource
+
+    def entity(self, uri):
+        """Get an entity, create it if needed"""
+        return self.get_resource(self.entities, uri)
+
+    def relation(self, uri):
+        """Get a relation, create it if needed"""
+        return self.get_resource(self.relations, uri)
+
+    def attribute(self, uri):
+        """Get an attribute, create it if needed"""
+        return self.get_resource(self.attributes, uri)
+
+    def category(self, uri):
+        """Get a category, create it if needed"""
+        return self.get_resource(self.categories, uri)
+
+    def category_type(self, uri):
+        """Get a category type, create it if needed"""
+        return self.get_resource(self.category_types, uri)
+
+    def category_value(self, uri):
+        """Get a category value, create it if needed"""
+        return self.get_resource(self.category_values, uri)
+
+    def add_location(self, location):
+        """Add location of the data
+
+        Parameters
+        ----------
+        location : str
+            URL of distant endpoint
+        """
+        if location not in self.locations:
+            self.locations.append(location)
+        if self.generated_at is None:
+            self.generated_at = datetime.now()
+
+    def set_sample(self, size, method):
+        """Record that the abstraction is estimated from a sample of instances
+
+        Parameters
+        ----------
+        size : int
+            Maximum number of instances scanned per entity
+        method : str
+            Sampling method
+        """
+        self.sample_size = size
+        self.sample_method = method
+        if self.generated_at is None:
+            self.generated_at = datetime.now()
+
+    def add_gap(self, gap):
+        """Record a query given up
+
+        Parameters
+        ----------
+        gap : dict
+            query, entity, predicate, error
+        """
+        self.gaps.append(gap)
+        if self.generated_at is None:
+            self.generated_at = datetime.now()
+
+    def update(self, other):
+        """Merge another model into this one
+
+        Parameters
+        ----------
+        other : SchemaModel
+            Model to merge
+        """
+        for name in ("entities", "relations", "attributes", "categories", "category_types", "category_values"):
+            resources = getattr(self, name)
+            for uri, resource in getattr(other, name).items():
+                self.get_resource(resources, uri).update(resource)
+        for location in other.locations:
+            self.add_location(location)
+        if other.sample_size is not None and self.sample_size is None:
+            self.set_sample(other.sample_size, other.sample_method)
+        for gap in other.gaps:
+            self.add_gap(gap)
+
+    def auto_labelled(self):
+        """Get URIs of resources with a generated label
+
+        Yields
+        ------
+        str
+            URI
+        """
+        for resources in (self.entities, self.relations, self.attributes, self.categories, self.category_types, self.category_values):
+            for uri, resource in resources.items():
+                if resource.auto_label:
+                    yield uri
+
+    def triples(self, namespace_internal, get_label):
+        """Convert the model to triples
+
+        Parameters
+        ----------
+        namespace_internal : rdflib.namespace.Namespace
+            AskOmics internal namespace
+        get_label : callable
+            Label generator, for resources with auto_label
+
+        Yields
+        ------
+        tuple
+            subject, predicate, object (rdflib terms)
+        """
+        if self.locations or self.sample_size is not None or self.gaps:
+            prov = rdflib.Namespace('http://www.w3.org/ns/prov#')
+            graph = rdflib.BNode("graph")
+            yield (graph, rdflib.RDF.type, prov["Entity"])
+            for location in self.locations:
+                yield (graph, prov.atLocation, rdflib.Literal(location))
+            yield (graph, prov.generatedAtTime, rdflib.Literal(self.generated_at))
+            yield (graph, prov.wasGeneratedBy, rdflib.URIRef("https://github.com/askomics/abstractor"))
+            if self.sample_size is not None:
+                yield (graph, namespace_internal["sampleSize"], rdflib.Literal(self.sample_size))
+                yield (graph, namespace_internal["sampleMethod"], rdflib.Literal(self.sample_method))
+            for index, gap in enumerate(self.gaps):
+                node = rdflib.BNode("gap{}".format(index))
+                yield (graph, namespace_internal["gap"], node)
+                yield (node, namespace_internal["gapQuery"], rdflib.Literal(gap["query"]))
+                if gap["entity"]:
+                    yield (node, namespace_internal["gapEntity"], rdflib.URIRef(gap["entity"]))
+                if gap["predicate"]:
+                    yield (node, namespace_internal["gapPredicate"], rdflib.URIRef(gap["predicate"]))
+                yield (node, rdflib.RDFS.comment, rdflib.Literal(gap["error"]))
+
+        resource_dicts = (self.entities, self.relations, self.attributes, self.categories, self.category_types, self.category_values)
+        # A uri can be a resource of several kinds (a predicate with literal
+        # and resource objects is a relation and an attribute): triples of
+        # these uris are checked, so all triples are unique
+        counts = collections.Counter(uri for resources in resource_dicts for uri in resources)
+        shared = {uri: set() for uri, count in counts.items() if count > 1}
+        for resources in resource_dicts:
+            for uri, resource in sorted(resources.items(), key=lambda item: item[0]):
+                written = shared.get(uri)
+                for triple in self.resource_triples(uri, resource, namespace_internal, get_label):
+                    if written is not None:
+                        if triple in written:
+                            continue
+                        written.add(triple)
+                    yield triple
+
+    @staticmethod
+    def resource_triples(uri, resource, namespace_internal, get_label):
+        """Convert a resource to triples
+
+        Parameters
+        ----------
+        uri : str
+            URI of the resource
+        resource : SchemaResource
+            The resource
+        namespace_internal : rdflib.namespace.Namespace
+            AskOmics internal namespace
+        get_label : callable
+            Label generator, for resources with auto_label
+
+        Yields
+        ------
+        tuple
+            subject, predicate, object (rdflib terms)
+        """
+        subject = rdflib.URIRef(uri)
+        for rdf_type in sorted(resource.types):
+            yield (subject, rdflib.RDF.type, rdflib.URIRef(rdf_type))
+        if resource.no_labels and not resource.has_labels:
+            yield (subject, namespace_internal["instancesHaveNoLabels"], rdflib.Literal(True))
+        if resource.auto_label:
+            label = get_label(uri)
+            if label not in resource.labels:
+                yield (subject, rdflib.RDFS.label, rdflib.Literal(label))
+        for label in sorted(resource.labels):
+            yield (subject, rdflib.RDFS.label, rdflib.Literal(label))
+        for parent in sorted(resource.parents):
+            yield (subject, rdflib.RDFS.subClassOf, rdflib.URIRef(parent))
+        for domain in sorted(resource.domains):
+            yield (subject, rdflib.RDFS.domain, rdflib.URIRef(domain))
+        for range_uri in sorted(resource.ranges):
+            yield (subject, rdflib.RDFS.range, rdflib.URIRef(range_uri))
+        for value in sorted(resource.values):
+            yield (subject, namespace_internal["category"], rdflib.URIRef(value))
@@ -0,0 +1,266 @@
+import itertools
+import pickle
+import tempfile
+
+from libabstractor.ResultRow import ResultRow
+
+import rdflib
+
+
+NUMERIC_DATATYPES = frozenset((
+    rdflib.XSD.float,
+    rdflib.XSD.double,
+    rdflib.XSD.decimal,
+    rdflib.XSD.integer,
+    rdflib.XSD.nonPositiveInteger,
+    rdflib.XSD.negativeInteger,
+    rdflib.XSD.nonNegativeInteger,
+    rdflib.XSD.positiveInteger,
+    rdflib.XSD.unsignedLong,
+    rdflib.XSD.unsignedInt,
+    rdflib.XSD.unsignedShort,
+    rdflib.XSD.unsignedByte,
+    rdflib.XSD.long,
+    rdflib.XSD.int,
+    rdflib.XSD.short,
+    rdflib.XSD.byte
+))
+
+
+class SchemaStatistics(object):
+    """Class, predicate and datatype statistics of a stream of triples
+
+    Triples are read in two passes. The first one (add_class_triple) collects
+    the classes of each subject, and the subClassOf tree. The second one
+    (add_usage_triple) classifies each predicate against the classes of its
+    subject and object. Memory depends on the number of distinct subjects and
+    classes, not on the number of triples.
+
+    Blank node ids of N-Triples files are stable between two parsings (see
+    StreamEngine.StableBlankNodes), so triples involving a blank node are
+    classified during the second pass too. Otherwise, they are collected
+    during the first pass, and spilled to a temporary file by batches of
+    spill_size triples, to be classified at the end of the second pass.
+
+    The rows produced are the rows of the SPARQL queries of the all mode
+    (QueryLibrary.entities_and_relations and entities_and_attributes).
+
+    Attributes
+    ----------
+    subject_classes : dict
+        Subject -> frozenset of classes
+    parents : dict
+        Class -> set of parent classes (rdfs:subClassOf)
+    relations : set
+        (source class, relation, target class)
+    attributes : set
+        (class, attribute, datatype) of literals, numeric literals have the
+        xsd:decimal datatype
+    stable_blank_nodes : bool
+        True if blank node ids are the same in both passes
+    spill_size : int
+        Number of blank node triples kept in memory before they are written
+        to the temporary file (None to keep them all in memory)
+    """
+
+    spill_size = 100000
+
+    def __init__(self, stable_blank_nodes=False):
+        """init
+
+        Parameters
+        ----------
+        stable_blank_nodes : bool, optional
+            True if blank node ids are the same in both passes
+        """
+        self.subject_classes = {}
+        self.parents = {}
+        self.relations = set()
+        self.attributes = set()
+        self.stable_blank_nodes = stable_blank_nodes
+
+        # Classes sets are shared between subjects having the same classes
+        self.class_sets = {}
+        self.blank_node_triples = []
+        self.blank_node_file = None
+
+    def update_classes(self, other):
+        """Merge the first pass of another part of the triples
+
+        Parameters
+        ----------
+        other : SchemaStatistics
+            Statistics of the other part
+        """
+        for subject, classes in other.subject_classes.items():
+            classes = self.subject_classes.get(subject, frozenset()) | classes
+            self.subject_classes[subject] = self.class_sets.setdefault(classes, classes)
+        for entity, parents in other.parents.items():
+            self.parents.setdefault(entity, set()).update(parents)
+        for triple in other.blank_node_triples:
+            self.add_blank_node_triple(triple)
+
+    def update_usage(self, other):
+        """Merge the second pass of another part of the triples
+
+        Parameters
+        ----------
+        other : SchemaStatistics
+            Statistics of the other part
+        """
+        self.relations |= other.relations
+        self.attributes |= other.attributes
+
+    def add_class(self, subject, entity):
+        """Add a class to a subject
+
+        Parameters
+        ----------
+        subject : rdflib.term.Node
+            Subject
+        entity : rdflib.term.Node
+            Class of the subject
+        """
+        classes = self.subject_classes.get(subject, frozenset()) | {entity}
+        self.subject_classes[subject] = self.class_sets.setdefault(classes, classes)
+
+    def add_class_triple(self, subject, predicate, obj):
+        """First pass: collect classes of subjects
+
+        Parameters
+        ----------
+        subject : rdflib.term.Node
+            Subject
+        predicate : rdflib.term.Node
+            Predicate
+        obj : rdflib.term.Node
+            Object
+        """
+        if predicate == rdflib.RDF.type:
+            self.add_class(subject, obj)
+        if predicate == rdflib.RDFS.subClassOf:
+            self.parents.setdefault(subject, set()).add(obj)
+        if not self.stable_blank_nodes and (isinstance(subject, rdflib.BNode) or isinstance(obj, rdflib.BNode)):
+            self.add_blank_node_triple((subject, predicate, obj))
+
+    def add_blank_node_triple(self, triple):
+        """Keep a triple involving a blank node for the end of the second pass
+
+        Parameters
+        ----------
+        triple : tuple
+            subject, predicate, object
+        """
+        self.blank_node_triples.append(triple)
+        if self.spill_size and len(self.blank_node_triples) >= self.spill_size:
+            if self.blank_node_file is None:
+                self.blank_node_file = tempfile.TemporaryFile()
+            pickle.dump(self.blank_node_triples, self.blank_node_file, pickle.HIGHEST_PROTOCOL)
+            self.blank_node_triples = []
+
+    def add_usage_triple(self, subject, predicate, obj):
+        """Second pass: classify predicates
+
+        Parameters
+        ----------
+        subject : rdflib.term.Node
+            Subject
+        predicate : rdflib.term.Node
+            Predicate
+        obj : rdflib.term.Node
+            Object
+        """
+        if not self.stable_blank_nodes and (isinstance(subject, rdflib.BNode) or isinstance(obj, rdflib.BNode)):
+            return
+        self.classify(subject, predicate, obj)
+
+    def end_usage(self):
+        """End of the second pass: classify triples involving blank nodes"""
+        if self.blank_node_file is not None:
+            self.blank_node_file.seek(0)
+            while True:
+                try:
+                    triples = pickle.load(self.blank_node_file)
+                except EOFError:
+                    break
+                for subject, predicate, obj in triples:
+                    self.classify(subject, predicate, obj)
+            self.blank_node_file.close()
+            self.blank_node_file = None
+        for subject, predicate, obj in self.blank_node_triples:
+            self.classify(subject, predicate, obj)
+        self.blank_node_triples = []
+
+    def classify(self, subject, predicate, obj):
+        """Classify a triple against the classes of its subject and object
+
+        Parameters
+        ----------
+        subject : rdflib.term.Node
+            Subject
+        predicate : rdflib.term.Node
+            Predicate
+        obj : rdflib.term.Node
+            Object
+        """
+        source_classes = self.subject_classes.get(subject)
+        if not source_classes:
+            return
+
+        if isinstance(obj, rdflib.Literal):
+            datatype = self.datatype(obj)
+            for source_class in source_classes:
+                self.attributes.add((source_class, predicate, datatype))
+            return
+
+        for target_class in self.subject_classes.get(obj, ()):
+            for source_class in source_classes:
+                self.relations.add((source_class, predicate, target_class))
+
+    @staticmethod
+    def datatype(literal):
+        """Get the datatype of a literal, as given by the entities and attributes query
+
+        Parameters
+        ----------
+        literal : rdflib.Literal
+            The literal
+
+        Returns
+        -------
+        rdflib.URIRef
+            xsd:decimal for numeric literals, the datatype of other literals
+        """
+        if literal.datatype in NUMERIC_DATATYPES:
+            return rdflib.XSD.decimal
+        if literal.datatype is not None:
+            return literal.datatype
+        return rdflib.RDF.langString if literal.language else rdflib.XSD.string
+
+    def entities_and_relations(self):
+        """Rows of the entities and relations query
+
+        Yields
+        ------
+        tuple
+            source_entity, relation, target_entity, mother_source, mother_target
+        """
+        variables = ("source_entity", "relation", "target_entity", "mother_source", "mother_target")
+        for source_class, relation, target_class in self.relations:
+            mother_sources = self.parents.get(source_class) or (None, )
+            mother_targets = self.parents.get(target_class) or (None, )
+            for mother_source, mother_target in itertools.product(mother_sources, mother_targets):
+                yield ResultRow.from_values(variables, (
+                    str(node) if node is not None else None for node in (source_class, relation, target_class, mother_source, mother_target)
+                ))
+
+    def entities_and_attributes(self):
+        """Rows of the entities and attributes query
+
+        Yields
+        ------
+        tuple
+            entity, attribute, datatype
+        """
+        for entity, attribute, datatype in self.attributes:
+            yield ResultRow.from_values(("entity", "attribute", "datatype"), (str(entity), str(attribute), str(datatype)))
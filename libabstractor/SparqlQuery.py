@@ -1,10 +1,23 @@
+import http.client
 import logging
+import re
+import textwrap
+import time
 
-from SPARQLWrapper import JSON, SPARQLWrapper
+from libabstractor.FileChunker import FileChunker
+from libabstractor.HttpTransport import EndpointError, HttpTransport
+from libabstractor.JsonResultsParser import JsonResultsParser, TruncatedResultsError
+from libabstractor.ResultRow import ResultRow
 
 import rdflib
 
 
+SELECT_PATTERN = re.compile(r'^\s*SELECT\s+(?:DISTINCT\s+|REDUCED\s+)?((?:\?\w+\s+)+)WHERE', re.IGNORECASE | re.MULTILINE)
+
+# Errors of a query that may succeed if sent again (timeouts, lost connections)
+TRANSIENT_ERRORS = (OSError, EOFError, http.client.HTTPException, TruncatedResultsError)
+
+
 class SparqlQuery(object):
     """SPARQL methods
 
@@ -20,9 +33,34 @@ class SparqlQuery(object):
         Description
     source_type : TYPE
         Description
+    page_size : int
+        Number of rows asked to the endpoint per query (0 to disable pagination)
+    cache : QueryCache
+        Cache of endpoint results (None to disable cache)
+    journal : QueryJournal
+        Checkpoint journal of completed queries (None to disable)
+    transport : HttpTransport
+        Keep-alive connections to the endpoint
+    report : RunReport
+        Report recording each query (None to disable)
+    retries : int
+        Number of retries of a query failing with a transient error
+    retry_delay : float
+        Delay before the first retry, in seconds (doubled at each retry)
+    store_limit : int
+        Maximum number of rows of a result stored into the cache and the
+        journal (bigger results are only streamed). At least page_size, so
+        pages are always stored
+    row_cap : int
+        Maximum number of rows per query of the endpoint, detected from a
+        truncated page (None while none was detected)
+    page_floor : int
+        Pages shorter than this number of rows can not be truncated by the
+        endpoint (the last page of their query)
     """
 
-    def __init__(self, source, source_type):
+    def __init__(self, source, source_type, page_size=10000, cache=None, http_method="GET", gzip=True, pool_size=1, report=None,
+                 timeout=None, retries=2, retry_delay=1, journal=None, store_limit=100000):
         """Init
 
         Parameters
@@ -31,9 +69,43 @@ class SparqlQuery(object):
             Description
         source_type : TYPE
             Description
+        page_size : int, optional
+            Number of rows asked to the endpoint per query (0 to disable pagination)
+        cache : QueryCache, optional
+            Cache of endpoint results (None to disable cache)
+        http_method : str, optional
+            HTTP method used to send queries to the endpoint (GET or POST)
+        gzip : bool, optional
+            Ask the endpoint for gzip compressed responses
+        pool_size : int, optional
+            Number of connections to the endpoint kept open
+        report : RunReport, optional
+            Report recording each query
+        timeout : float, optional
+            Maximum duration of an endpoint query, until its response is fully
+            received, in seconds (None for no timeout)
+        retries : int, optional
+            Number of retries of a query failing with a transient error
+        retry_delay : float, optional
+            Delay before the first retry, in seconds (doubled at each retry)
+        journal : QueryJournal, optional
+            Checkpoint journal of completed queries, replayed instead of
+            sending them again
+        store_limit : int, optional
+            Maximum number of rows of a result stored into the cache and the
+            journal
         """
         self.source = source
         self.source_type = source_type
+        self.page_size = page_size
+        self.cache = cache
+        self.journal = journal
+        self.report = report
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.store_limit = max(store_limit, page_size or 0)
+        self.row_cap = None
+        self.page_floor = 0
         self.prefixes = {
             "owl:": "http://www.w3.org/2002/07/owl#",
             "rdf:": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
@@ -46,11 +118,15 @@ class SparqlQuery(object):
             "drugbankdrugs:": "http://wifo5-04.informatik.uni-mannheim.de/drugbank/resource/drugs/"
         }
 
-        # if source is a file, load it in a rdflib graph
+        # if source is a file (or a directory, or a glob pattern), load it in a rdflib graph
         self.rdf_source = None
-        if self.source_type != "sparql":
+        self.transport = None
+        if self.source_type == "sparql":
+            self.transport = HttpTransport(self.source, method=http_method, gzip=gzip, timeout=timeout, pool_size=pool_size)
+        else:
             self.rdf_source = rdflib.Graph()
-            self.rdf_source.parse(self.source, format=self.source_type)
+            for path in FileChunker.files(self.source):
+                self.rdf_source.parse(path, format=self.source_type)
 
     def get_sparl_prefix(self):
         """Get a SPARQL prefix string
@@ -80,23 +156,30 @@ class SparqlQuery(object):
 
         return prefixes_string
 
-    def execute_sparql_query(self, query):
+    def execute_sparql_query(self, query, variables=None, record=None):
         """Execute query on a SPARQL endpoint
 
         Parameters
         ----------
         query : str
             The query
-
-        Returns
-        -------
-        list
-            results
+        variables : tuple, optional
+            Projected variables (default: variables of the results head)
+        record : dict, optional
+            Report record of the query, updated with the response size
+
+        Yields
+        ------
+        tuple
+            Parsed result row, as soon as it is received
         """
-        endpoint = SPARQLWrapper(self.source)
-        endpoint.setQuery(query)
-        endpoint.setReturnFormat(JSON)
-        return endpoint.query().convert()
+        with self.transport.open(query) as response:
+            parser = JsonResultsParser(response)
+            try:
+                yield from self.parse_sparql_results(parser, variables)
+            finally:
+                if record is not None:
+                    record["bytes"] += parser.size
 
     def execute_rdflib_query(self, query):
         """Execute query on a rdflib graph
@@ -113,72 +196,327 @@ class SparqlQuery(object):
         """
         return self.rdf_source.query(query)
 
-    def parse_sparql_results(self, json_results):
+    def parse_sparql_results(self, results, variables=None):
         """Parse result of sparql query
 
         Parameters
         ----------
-        json_results : dict
+        results : JsonResultsParser
+            Query result bindings
+        variables : tuple, optional
+            Projected variables (default: variables of the results head)
+
+        Yields
+        ------
+        tuple
+            Parsed result row (see ResultRow)
+        """
+        intern = ResultRow.intern
+        row_class = None
+        for binding in results:
+            if row_class is None:
+                variables = variables or tuple(results.variables) or tuple(binding)
+                row_class = ResultRow.get_class(variables)
+            yield row_class._make(intern(binding[v]["value"]) if v in binding else None for v in variables)
+
+    def parse_rdflib_results(self, results):
+        """Parse result of sparql query (rdflib)
+
+        Parameters
+        ----------
+        results : rdflib.query.Result
             Query result
 
+        Yields
+        ------
+        tuple
+            Parsed result row (see ResultRow)
+        """
+        intern = ResultRow.intern
+        row_class = ResultRow.get_class(tuple(str(v) for v in results.vars))
+        for row in results:
+            yield row_class._make(None if value is None else intern(str(value)) for value in row)
+
+    def fetch_sparql_results(self, query, variables=None, record=None):
+        """Get parsed results of a query from the checkpoint journal, the cache, or the endpoint
+
+        Parameters
+        ----------
+        query : str
+            The query
+        variables : tuple, optional
+            Projected variables (default: variables of the results head)
+        record : dict, optional
+            Report record of the query
+
+        Yields
+        ------
+        tuple
+            Parsed result row (see ResultRow)
+        """
+        logging.debug(query)
+        if record is not None:
+            record["pages"] += 1
+        if self.cache is None and self.journal is None:
+            yield from self.execute_sparql_query(query, variables, record)
+            return
+
+        for origin, store in (("checkpoint", self.journal), ("cache", self.cache)):
+            stored = store.get(self.source, query) if store is not None else None
+            if stored is not None:
+                if record is not None:
+                    record["origin"] = origin
+                variables, rows = stored
+                if origin == "cache" and self.journal is not None:
+                    self.journal.put(self.source, query, variables, rows)
+                row_class = ResultRow.get_class(tuple(variables))
+                for row in rows:
+                    yield row_class._make(ResultRow.intern(value) for value in row)
+                return
+
+        # Rows are kept until the result is stored, up to store_limit: bigger
+        # results (unpaginated queries) are streamed without being stored
+        rows = []
+        for row in self.execute_sparql_query(query, variables, record):
+            variables = row._fields
+            if rows is not None:
+                rows.append(row)
+                if len(rows) > self.store_limit:
+                    logging.debug("More than {} rows, results are not stored".format(self.store_limit))
+                    rows = None
+            yield row
+        if rows is None:
+            return
+        for store in (self.journal, self.cache):
+            if store is not None:
+                store.put(self.source, query, variables or (), rows)
+
+    @staticmethod
+    def is_transient(error):
+        """Check if a query failing with an error may succeed if sent again
+
+        Parameters
+        ----------
+        error : Exception
+            The error
+
         Returns
         -------
-        list
-            Parsed results
+        bool
+            True for timeouts, server errors and lost connections
         """
-        try:
-            data = []
-            for row in json_results["results"]["bindings"]:
-                row_dict = {}
-                for key, value in row.items():
-                    row_dict[key] = value['value']
-                data.append(row_dict)
+        if isinstance(error, EndpointError):
+            return error.transient
+        return isinstance(error, TRANSIENT_ERRORS)
 
-        except Exception as e:
-            print(str(e))
-            return []
+    def fetch_with_retries(self, query, variables=None, record=None, ordered=False):
+        """Get parsed results of a query, send it again on transient errors
 
-        return data
+        The query is sent up to retries + 1 times, with an exponential
+        backoff. If an attempt fails after some rows were yielded, these rows
+        are skipped by the next attempt if results are ordered, and yielded
+        again otherwise (the abstraction is made of sets, so duplicated rows
+        are harmless).
 
-    def parse_rdflib_results(self, results):
-        """Parse result of sparql query (rdflib)
+        Parameters
+        ----------
+        query : str
+            The query
+        variables : tuple, optional
+            Projected variables (default: variables of the results head)
+        record : dict, optional
+            Report record of the query
+        ordered : bool, optional
+            True if the query returns rows in a stable order
+
+        Yields
+        ------
+        tuple
+            Parsed result row (see ResultRow)
+        """
+        yielded = 0
+        delay = self.retry_delay
+        for attempt in range(self.retries + 1):
+            skip = yielded if ordered else 0
+            try:
+                for row in self.fetch_sparql_results(query, variables, record):
+                    if skip:
+                        skip -= 1
+                        continue
+                    yielded += 1
+                    yield row
+                return
+            except Exception as e:
+                if attempt == self.retries or not self.is_transient(e):
+                    raise
+                logging.warning("Query failed ({}), retry in {}s".format(e or type(e).__name__, delay))
+                if record is not None:
+                    record["retries"] += 1
+                time.sleep(delay)
+                delay *= 2
+
+    @staticmethod
+    def get_variables(query):
+        """Get projected variables of a SELECT query
 
         Parameters
         ----------
-        json_results : dict
-            Query result
+        query : str
+            The query
 
         Returns
         -------
-        list
-            Parsed results
+        tuple
+            Variable names (empty if query doesn't list its variables)
         """
-        variables = [str(v) for v in results.vars]
-        data = []
-        for row in results:
-            row_dict = {}
-            for v in variables:
-                row_dict[v] = str(row[v])
-            data.append(row_dict)
+        match = SELECT_PATTERN.search(query)
+        return tuple(variable[1:] for variable in match.group(1).split()) if match else ()
+
+    @staticmethod
+    def paginate_query(query, limit, offset):
+        """Get a page of a SELECT query
 
-        return data
+        The query is ordered on all its projected variables and wrapped in a
+        subquery, so pages are stable and endpoints (Virtuoso) accept offsets
+        bigger than their max result size.
 
-    def process_query(self, query):
+        Parameters
+        ----------
+        query : str
+            The SELECT query
+        limit : int
+            Page size
+        offset : int
+            Index of the first row of the page
+
+        Returns
+        -------
+        str
+            The paginated query, or None if query can't be paginated
+        """
+        match = SELECT_PATTERN.search(query)
+        if not match or re.search(r'\b(LIMIT|OFFSET|ORDER\s+BY|GROUP\s+BY)\b', query[match.start():], re.IGNORECASE):
+            return None
+
+        prologue = query[:match.start()]
+        select = textwrap.indent(query[match.start():].strip(), " " * 8)
+        return prologue + textwrap.dedent('''
+        SELECT *
+        WHERE {{
+            {{
+        {select}
+                ORDER BY {variables}
+            }}
+        }}
+        LIMIT {limit}
+        OFFSET {offset}
+        ''').format(select=select, variables=" ".join(match.group(1).split()), limit=limit, offset=offset)
+
+    def iter_query(self, query, page_size=None):
+        """Execute a query and yield parsed results
+
+        On a SPARQL endpoint, the query is sent page by page (see page_size)
+        so results are not truncated by the endpoint max result size, and
+        only one page is kept in memory. When the endpoint caps results below
+        page_size, the cap is detected and used as page size.
+
+        Parameters
+        ----------
+        query : string
+            The query to execute
+        page_size : int, optional
+            Number of rows per page (default: page_size attribute)
+
+        Yields
+        ------
+        tuple
+            Parsed result row (see ResultRow)
+        """
+        if self.report is None:
+            yield from self.iter_results(query, page_size=page_size)
+            return
+
+        record = self.report.start_query(query, "endpoint" if self.source_type == "sparql" else "file")
+        try:
+            for row in self.iter_results(query, record, page_size):
+                if not record["rows"]:
+                    record["latency"] = time.perf_counter() - record["start"]
+                record["rows"] += 1
+                yield row
+        finally:
+            if record["latency"] is None:
+                record["latency"] = time.perf_counter() - record["start"]
+            self.report.end_query(record)
+
+    def iter_results(self, query, record=None, page_size=None):
+        """Execute a query and yield parsed results (see iter_query)
+
+        Parameters
+        ----------
+        query : string
+            The query to execute
+        record : dict, optional
+            Report record of the query
+        page_size : int, optional
+            Number of rows per page (default: page_size attribute)
+
+        Yields
+        ------
+        tuple
+            Parsed result row (see ResultRow)
+        """
+        # query = self.get_sparl_prefix() + query
+        if self.source_type != "sparql":
+            logging.debug(query)
+            yield from self.parse_rdflib_results(self.execute_rdflib_query(query))
+            return
+
+        variables = self.get_variables(query)
+        page_size = self.page_size if page_size is None else page_size
+        if not page_size or self.paginate_query(query, page_size, 0) is None:
+            yield from self.fetch_with_retries(query, variables, record)
+            return
+
+        if self.row_cap:
+            page_size = min(page_size, self.row_cap)
+        offset = 0
+        probe = None
+        while True:
+            rows = 0
+            for row in self.fetch_with_retries(self.paginate_query(query, page_size, offset), variables, record, ordered=True):
+                rows += 1
+                yield row
+            if probe is not None:
+                if not rows:
+                    self.page_floor = max(self.page_floor, probe)
+                    break
+                # the short page was truncated by the endpoint max result size
+                logging.warning("The endpoint returns at most {} rows per query, pages are reduced to {} rows".format(probe, probe))
+                self.row_cap = self.page_floor = page_size = probe
+                probe = None
+            if rows >= page_size:
+                self.page_floor = max(self.page_floor, page_size)
+            elif not rows or rows < self.page_floor:
+                break
+            else:
+                # a page shorter than asked is the last one, unless the
+                # endpoint caps results below page_size: check the next page
+                probe = rows
+            offset += rows
+
+    def process_query(self, query, page_size=None):
         """Execute a query and return parsed results
 
         Parameters
         ----------
         query : string
             The query to execute
+        page_size : int, optional
+            Number of rows per page (default: page_size attribute)
 
         Returns
         -------
         list
             Parsed results
         """
-        # query = self.get_sparl_prefix() + query
-        logging.debug(query)
-        if self.source_type == "sparql":
-            return self.parse_sparql_results(self.execute_sparql_query(query))
-        else:
-            return self.parse_rdflib_results(self.execute_rdflib_query(query))
+        return list(self.iter_query(query, page_size))
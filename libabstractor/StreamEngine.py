@@ -0,0 +1,292 @@
+import concurrent.futures
+import hashlib
+import logging
+
+from libabstractor.FileChunker import DIRECTIVE_PATTERN, FileChunker
+from libabstractor.SchemaStatistics import SchemaStatistics
+
+import rdflib
+
+
+class TripleSink(rdflib.store.Store):
+    """rdflib store that keeps nothing, and forwards parsed triples to a callback"""
+
+    def __init__(self, callback):
+        """Init
+
+        Parameters
+        ----------
+        callback : callable
+            Function called with subject, predicate and object of each triple
+        """
+        super().__init__()
+        self.callback = callback
+
+    def add(self, triple, context, quoted=False):
+        """Forward a parsed triple
+
+        Parameters
+        ----------
+        triple : tuple
+            subject, predicate, object
+        context : rdflib.Graph
+            Graph of the triple
+        quoted : bool, optional
+            True for quoted (N3 formula) statements
+        """
+        self.callback(*triple)
+
+    def bind(self, prefix, namespace, override=True):
+        """Ignore namespace bindings of the parsed file"""
+        pass
+
+    def namespace(self, prefix):
+        """No namespace is kept"""
+        return None
+
+    def prefix(self, namespace):
+        """No namespace is kept"""
+        return None
+
+    def namespaces(self):
+        """No namespace is kept"""
+        return iter(())
+
+
+class StableBlankNodes(dict):
+    """Blank node ids of a N-Triples file, the same in all its chunks and parsings
+
+    Used as the bnode_context of the rdflib N-Triples parser: the id of a
+    blank node is made of its label, and of the file.
+    """
+
+    def __init__(self, path):
+        """Init
+
+        Parameters
+        ----------
+        path : str
+            The N-Triples file
+        """
+        super().__init__()
+        self.prefix = hashlib.md5(path.encode("utf-8")).hexdigest()[:8]
+
+    def get(self, label, default=None):
+        """Get the id of a blank node label"""
+        return "{}{}".format(self.prefix, label)
+
+
+class ChunkError(Exception):
+    """A chunk can't be parsed alone"""
+
+    pass
+
+
+class ChunkScanner(object):
+    """Statistics of file chunks, computed in worker processes
+
+    Attributes
+    ----------
+    subject_classes : dict
+        Classes of subjects (first pass of all chunks), for the second pass
+    """
+
+    subject_classes = None
+
+    @staticmethod
+    def parse(chunk, callback):
+        """Parse a chunk, and give each triple to callback
+
+        Parameters
+        ----------
+        chunk : Chunk
+            The chunk
+        callback : callable
+            Function called with subject, predicate and object of each triple
+
+        Raises
+        ------
+        ChunkError
+            The chunk can't be parsed alone
+        """
+        data = FileChunker.read(chunk)
+        options = {}
+        if chunk.source_type == "turtle":
+            # Blank node labels are not stable between parsings, and directives apply to the next chunks
+            if b"_:" in data or DIRECTIVE_PATTERN.search(data):
+                raise ChunkError("{}: blank node labels or directives after the first statement".format(chunk.path))
+            data = chunk.header + data
+        else:
+            options["bnode_context"] = StableBlankNodes(chunk.path)
+        try:
+            rdflib.Graph(store=TripleSink(callback)).parse(data=data, format=chunk.source_type, **options)
+        except Exception as e:
+            raise ChunkError("{} (bytes {} to {}): {}".format(chunk.path, chunk.start, chunk.end, e))
+
+    @staticmethod
+    def scan_classes(chunk):
+        """First pass of a chunk
+
+        Parameters
+        ----------
+        chunk : Chunk
+            The chunk
+
+        Returns
+        -------
+        SchemaStatistics
+            Classes of the subjects of the chunk
+        """
+        statistics = SchemaStatistics(chunk.source_type == "nt")
+        # blank node triples of a chunk are sent back to the main process
+        statistics.spill_size = None
+        ChunkScanner.parse(chunk, statistics.add_class_triple)
+        statistics.class_sets = {}
+        return statistics
+
+    @staticmethod
+    def init_usage(subject_classes):
+        """Init a worker process of the second pass
+
+        Parameters
+        ----------
+        subject_classes : dict
+            Classes of subjects of all chunks
+        """
+        ChunkScanner.subject_classes = subject_classes
+
+    @staticmethod
+    def scan_usage(chunk):
+        """Second pass of a chunk
+
+        Parameters
+        ----------
+        chunk : Chunk
+            The chunk
+
+        Returns
+        -------
+        SchemaStatistics
+            Relations and attributes of the chunk
+        """
+        statistics = SchemaStatistics(chunk.source_type == "nt")
+        statistics.subject_classes = ChunkScanner.subject_classes
+        ChunkScanner.parse(chunk, statistics.add_usage_triple)
+        statistics.subject_classes = {}
+        return statistics
+
+
+class StreamEngine(object):
+    """Abstraction of a N-Triples or Turtle file, without loading it into a rdflib Graph
+
+    The file is parsed twice, and triples are streamed into SchemaStatistics,
+    so memory depends on the number of subjects and classes, not on the
+    number of triples. Triples involving blank nodes of turtle files are
+    spilled to a temporary file between the two passes.
+
+    With more than one job, files are split into chunks (see FileChunker)
+    parsed by a pool of processes, and the statistics of the chunks are
+    merged after each pass. If a turtle chunk can't be parsed alone, the
+    files are parsed by a single process.
+
+    Attributes
+    ----------
+    source : str
+        Path of the RDF file, of a directory of files, or a glob pattern of files
+    source_type : str
+        Format of the files (nt or turtle)
+    jobs : int
+        Number of processes parsing the files
+    chunk_size : int
+        Approximate size of chunks, in bytes
+    statistics : SchemaStatistics
+        Statistics of the files
+    """
+
+    source_types = FileChunker.source_types
+
+    def __init__(self, source, source_type, jobs=1, chunk_size=64 * 1024 * 1024):
+        """Init
+
+        Parameters
+        ----------
+        source : str
+            Path of the RDF file, of a directory of files, or a glob pattern of files
+        source_type : str
+            Format of the files (nt or turtle)
+        jobs : int, optional
+            Number of processes parsing the files
+        chunk_size : int, optional
+            Approximate size of chunks, in bytes
+        """
+        self.source = source
+        self.source_type = source_type
+        self.jobs = max(1, jobs or 1)
+        self.chunk_size = chunk_size
+        self.statistics = None
+
+    def parse(self, callback):
+        """Parse the files, and give each triple to callback
+
+        Parameters
+        ----------
+        callback : callable
+            Function called with subject, predicate and object of each triple
+        """
+        for path in FileChunker.files(self.source):
+            options = {"bnode_context": StableBlankNodes(path)} if self.source_type == "nt" else {}
+            rdflib.Graph(store=TripleSink(callback)).parse(path, format=self.source_type, **options)
+
+    def scan_chunks(self):
+        """Scan chunks of the files with a pool of processes
+
+        Returns
+        -------
+        SchemaStatistics
+            Statistics of the files
+
+        Raises
+        ------
+        ChunkError
+            A chunk can't be parsed alone
+        """
+        chunks = list(FileChunker(self.source, self.source_type, self.chunk_size).chunks())
+        statistics = SchemaStatistics(self.source_type == "nt")
+
+        logging.debug("Collect classes of {} ({} chunks)".format(self.source, len(chunks)))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            for chunk_statistics in executor.map(ChunkScanner.scan_classes, chunks):
+                statistics.update_classes(chunk_statistics)
+
+        logging.debug("Classify predicates of {} ({} chunks)".format(self.source, len(chunks)))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.jobs, initializer=ChunkScanner.init_usage,
+                                                    initargs=(statistics.subject_classes, )) as executor:
+            for chunk_statistics in executor.map(ChunkScanner.scan_usage, chunks):
+                statistics.update_usage(chunk_statistics)
+
+        statistics.end_usage()
+        return statistics
+
+    def scan(self):
+        """Scan the files and get their statistics
+
+        Returns
+        -------
+        SchemaStatistics
+            Statistics of the files
+        """
+        if self.statistics is None and self.jobs > 1:
+            try:
+                self.statistics = self.scan_chunks()
+            except ChunkError as e:
+                logging.warning("Parse {} with a single process: {}".format(self.source, e))
+
+        if self.statistics is None:
+            statistics = SchemaStatistics(self.source_type == "nt")
+            logging.debug("Collect classes of {}".format(self.source))
+            self.parse(statistics.add_class_triple)
+            logging.debug("Classify predicates of {}".format(self.source))
+            self.parse(statistics.add_usage_triple)
+            statistics.end_usage()
+            self.statistics = statistics
+        return self.statistics
@@ -0,0 +1,282 @@
+import abc
+import re
+
+import rdflib
+
+
+PN_LOCAL = re.compile(r'^[A-Za-z_][A-Za-z0-9_-]*$')
+
+
+class TripleWriter(abc.ABC):
+    """Write triples into a stream as they are produced, without building a rdflib Graph
+
+    Duplicate triples are skipped with the set of written triples, which grows
+    with the output. Triples known to be unique (unique=True, e.g. the triples
+    of a SchemaModel) are not checked.
+
+    Attributes
+    ----------
+    stream : file-like
+        Text stream
+    count : int
+        Number of written triples
+    seen : set
+        Written triples (formatted), None if triples are unique
+    """
+
+    formats = ("nt", "turtle")
+
+    def __init__(self, stream, unique=False):
+        """Init
+
+        Parameters
+        ----------
+        stream : file-like
+            Text stream
+        unique : bool, optional
+            True if the triples are unique: duplicates are not checked
+        """
+        self.stream = stream
+        self.count = 0
+        self.seen = None if unique else set()
+
+    @staticmethod
+    def create(output_format, stream, prefixes=None, unique=False):
+        """Get a writer for an output format
+
+        Parameters
+        ----------
+        output_format : str
+            nt or turtle
+        stream : file-like
+            Text stream
+        prefixes : dict, optional
+            Prefix -> namespace, used by turtle
+        unique : bool, optional
+            True if the triples are unique: duplicates are not checked
+
+        Returns
+        -------
+        TripleWriter
+            The writer
+        """
+        if output_format == "turtle":
+            return TurtleWriter(stream, prefixes, unique)
+        return NTriplesWriter(stream, unique)
+
+    @staticmethod
+    def quote_literal(literal):
+        """Get the N-Triples / Turtle string of a literal value
+
+        Parameters
+        ----------
+        literal : rdflib.Literal
+            Literal
+
+        Returns
+        -------
+        str
+            Quoted value, with escaped characters
+        """
+        value = str(literal).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\r", "\\r")
+        return '"{}"'.format(value)
+
+    def format_term(self, term):
+        """Format a rdflib term
+
+        Parameters
+        ----------
+        term : rdflib.term.Node
+            Term to format
+
+        Returns
+        -------
+        str
+            Formatted term
+        """
+        if isinstance(term, rdflib.Literal):
+            if term.language:
+                return "{}@{}".format(self.quote_literal(term), term.language)
+            if term.datatype:
+                return "{}^^{}".format(self.quote_literal(term), self.format_term(term.datatype))
+            return self.quote_literal(term)
+        if isinstance(term, rdflib.BNode):
+            return "_:{}".format(term)
+        return "<{}>".format(term)
+
+    def format_predicate(self, predicate):
+        """Format the predicate of a triple
+
+        Parameters
+        ----------
+        predicate : rdflib.URIRef
+            Predicate to format
+
+        Returns
+        -------
+        str
+            Formatted predicate
+        """
+        return self.format_term(predicate)
+
+    def write(self, triple):
+        """Write a triple, if it was not already written
+
+        Parameters
+        ----------
+        triple : tuple
+            subject, predicate, object (rdflib terms)
+        """
+        subject, predicate, obj = triple
+        formatted = (self.format_term(subject), self.format_predicate(predicate), self.format_term(obj))
+        if self.seen is not None:
+            if formatted in self.seen:
+                return
+            self.seen.add(formatted)
+        self.count += 1
+        self.write_formatted(*formatted)
+
+    @abc.abstractmethod
+    def write_formatted(self, subject, predicate, obj):
+        """Write a formatted triple
+
+        Parameters
+        ----------
+        subject : str
+            Formatted subject
+        predicate : str
+            Formatted predicate
+        obj : str
+            Formatted object
+        """
+
+    def write_all(self, triples):
+        """Write triples, and end the document
+
+        Parameters
+        ----------
+        triples : iterable
+            Triples to write
+        """
+        for triple in triples:
+            self.write(triple)
+        self.close()
+
+    def close(self):
+        """End the document"""
+        pass
+
+
+class NTriplesWriter(TripleWriter):
+    """Write triples in N-Triples"""
+
+    def write_formatted(self, subject, predicate, obj):
+        """Write a formatted triple
+
+        Parameters
+        ----------
+        subject : str
+            Formatted subject
+        predicate : str
+            Formatted predicate
+        obj : str
+            Formatted object
+        """
+        self.stream.write("{} {} {} .\n".format(subject, predicate, obj))
+
+
+class TurtleWriter(TripleWriter):
+    """Write triples in Turtle
+
+    URIs are compacted with prefixes, and consecutive triples of a same
+    subject are grouped.
+
+    Attributes
+    ----------
+    prefixes : dict
+        Prefix -> namespace
+    """
+
+    def __init__(self, stream, prefixes=None, unique=False):
+        """Init
+
+        Parameters
+        ----------
+        stream : file-like
+            Text stream
+        prefixes : dict, optional
+            Prefix -> namespace
+        unique : bool, optional
+            True if the triples are unique: duplicates are not checked
+        """
+        super().__init__(stream, unique)
+        self.prefixes = prefixes or {}
+        # Longest namespaces first
+        self.namespaces = sorted(((namespace, prefix) for prefix, namespace in self.prefixes.items()), key=lambda item: len(item[0]), reverse=True)
+        self.subject = None
+
+        for prefix, namespace in sorted(self.prefixes.items()):
+            self.stream.write("@prefix {}: <{}> .\n".format(prefix, namespace))
+        self.stream.write("\n")
+
+    def format_term(self, term):
+        """Format a rdflib term, compact URIs with prefixes
+
+        Parameters
+        ----------
+        term : rdflib.term.Node
+            Term to format
+
+        Returns
+        -------
+        str
+            Formatted term
+        """
+        if isinstance(term, rdflib.URIRef):
+            for namespace, prefix in self.namespaces:
+                if term.startswith(namespace) and PN_LOCAL.match(term[len(namespace):]):
+                    return "{}:{}".format(prefix, term[len(namespace):])
+        return super().format_term(term)
+
+    def format_predicate(self, predicate):
+        """Format the predicate of a triple, rdf:type is abbreviated to a
+
+        Parameters
+        ----------
+        predicate : rdflib.URIRef
+            Predicate to format
+
+        Returns
+        -------
+        str
+            Formatted predicate
+        """
+        if predicate == rdflib.RDF.type:
+            return "a"
+        return self.format_term(predicate)
+
+    def write_formatted(self, subject, predicate, obj):
+        """Write a formatted triple
+
+        Parameters
+        ----------
+        subject : str
+            Formatted subject
+        predicate : str
+            Formatted predicate
+        obj : str
+            Formatted object
+        """
+        if subject == self.subject:
+            self.stream.write(" ;\n    {} {}".format(predicate, obj))
+            return
+        if self.subject is not None:
+            self.stream.write(" .\n\n")
+        self.subject = subject
+        self.stream.write("{} {} {}".format(subject, predicate, obj))
+
+    def close(self):
+        """End the document"""
+        if self.subject is not None:
+            self.stream.write(" .\n")
+            self.subject = None
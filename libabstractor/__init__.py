@@ -0,0 +1,26 @@
+def abstract(source, source_type="sparql", mode="all", **options):
+    """Abstract a RDF source (SPARQL endpoint or RDF files)
+
+    Modules using rdflib are imported on the first call, so importing
+    libabstractor is fast.
+
+    Parameters
+    ----------
+    source : str
+        SPARQL endpoint url, or path of a RDF file, a directory or a glob
+        pattern of RDF files
+    source_type : str, optional
+        Source format (sparql, xml, turtle or nt)
+    mode : str, optional
+        Scan mode (see Abstraction.modes)
+    **options
+        Other options of Abstraction (engine, jobs, page_size...)
+
+    Returns
+    -------
+    RdfGraph
+        The abstraction: RdfGraph.triples() yields its triples, RdfGraph.graph
+        is a rdflib Graph, and RdfGraph.model its SchemaModel
+    """
+    from libabstractor.Abstraction import Abstraction
+    return Abstraction(mode=mode, **options).abstract(source, source_type)
@@ -8,7 +8,7 @@ setup(
     author_email='xavier.garnier@irisa.fr',
     url='https://github.com/askomics/abstractor',
     download_url='https://github.com/askomics/abstractor/archive/4.1.1.tar.gz',
-    install_requires=['SPARQLWrapper'],
+    install_requires=['rdflib'],
     packages=find_packages(),
     license='AGPL',
     platforms='Posix; MacOS X; Windows',
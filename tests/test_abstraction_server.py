@@ -0,0 +1,137 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from libabstractor.AbstractionServer import AbstractionServer, AbstractionService
+
+import rdflib
+
+
+DATA = """
+@prefix ex: <http://example.org/> .
+
+ex:gene1 a ex:Gene ;
+    ex:length 12 ;
+    ex:name "BRCA1" ;
+    ex:encodes ex:protein1 .
+
+ex:protein1 a ex:Protein .
+"""
+
+EX = rdflib.Namespace("http://example.org/")
+
+
+class TestAbstractionServer(unittest.TestCase):
+    """Tests of the abstraction service and its HTTP API"""
+
+    def setUp(self):
+        """Write the data, start a server on a free port"""
+        self.directory = tempfile.mkdtemp()
+        self.root = os.path.join(self.directory, "root")
+        os.mkdir(self.root)
+        self.path = os.path.join(self.root, "data.ttl")
+        with open(self.path, "w") as data_file:
+            data_file.write(DATA)
+        self.service = AbstractionService(source_root=self.root)
+        self.server = AbstractionServer(("127.0.0.1", 0), self.service)
+        self.url = "http://127.0.0.1:{}".format(self.server.server_port)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        """Stop the server"""
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        shutil.rmtree(self.directory)
+
+    def post(self, job):
+        """Send a job, get the status and body of the response"""
+        request = urllib.request.Request(self.url + "/abstract", data=json.dumps(job).encode("utf-8"), method="POST")
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.read().decode("utf-8")
+        except urllib.error.HTTPError as e:
+            return e.code, e.read().decode("utf-8")
+
+    def test_parse_job(self):
+        """Options of a job are checked with their type"""
+        sources, output_format, abstraction = self.service.parse_job({"source": self.path, "source_type": "turtle", "timeout": None, "jobs": 2})
+        self.assertEqual(sources, [(self.path, "turtle")])
+        self.assertEqual(output_format, "turtle")
+        self.assertEqual(abstraction.jobs, 2)
+        for job, message in (
+            ({"source": self.path, "sample_size": "x"}, "option sample_size must be an integer"),
+            ({"source": self.path, "jobs": True}, "option jobs must be an integer"),
+            ({"source": self.path, "gzip": 1}, "option gzip must be a boolean"),
+            ({"source": self.path, "timeout": "1"}, "option timeout must be a number"),
+            ({"source": self.path, "excluded_namespaces": "http://example.org/"}, "option excluded_namespaces must be a list of strings"),
+            ({"source": self.path, "unknown": 1}, "unknown option unknown"),
+            ({"source": [self.path, 1]}, "source must be a string or a list of strings"),
+            ({"source": self.path, "source_type": ["turtle", "nt"]}, "give one source_type for all sources, or one per source"),
+            ({"source": self.path, "output_format": "json"}, "unknown output format json")
+        ):
+            with self.subTest(job=job):
+                with self.assertRaises(ValueError) as context:
+                    self.service.parse_job(job)
+                self.assertEqual(str(context.exception), message)
+
+    def test_abstract(self):
+        """Jobs are abstracted on a warm source"""
+        for _ in range(2):
+            status, body = self.post({"source": self.path, "source_type": "turtle", "output_format": "nt"})
+            self.assertEqual(status, 200)
+            graph = rdflib.Graph()
+            graph.parse(data=body, format="nt")
+            self.assertIn((EX.encodes, rdflib.RDFS.range, EX.Protein), graph)
+            self.assertIn((EX.length, rdflib.RDFS.range, rdflib.XSD.decimal), graph)
+            self.assertIn((EX.name, rdflib.RDFS.range, rdflib.XSD.string), graph)
+
+        with urllib.request.urlopen(self.url + "/status") as response:
+            status = json.loads(response.read().decode("utf-8"))
+        self.assertEqual(status["done"], 2)
+        self.assertEqual(status["sources"], [{"source": self.path, "type": "turtle", "loaded": True}])
+
+    def test_invalid_job(self):
+        """Invalid jobs are rejected with a message naming the option"""
+        status, body = self.post({"source": self.path, "source_type": "turtle", "sample_size": "x"})
+        self.assertEqual(status, 400)
+        self.assertEqual(json.loads(body), {"error": "option sample_size must be an integer"})
+
+    def test_sources(self):
+        """Jobs only read files of the source root, and allowed sources"""
+        outside = os.path.join(self.directory, "outside.ttl")
+        with open(outside, "w") as data_file:
+            data_file.write(DATA)
+        os.symlink(outside, os.path.join(self.root, "link.ttl"))
+
+        for source, source_type in (
+            (outside, "turtle"),
+            (os.path.join(self.root, "..", "outside.ttl"), "turtle"),
+            (os.path.join(self.root, "link.ttl"), "turtle"),
+            (os.path.join(self.root, "*.ttl"), "turtle"),
+            (self.root, "turtle"),
+            ("file:///etc/passwd", "sparql")
+        ):
+            with self.subTest(source=source):
+                with self.assertRaises(PermissionError):
+                    self.service.parse_job({"source": source, "source_type": source_type})
+        self.service.parse_job({"source": "https://sparql.example.org/sparql"})
+
+        status, body = self.post({"source": outside, "source_type": "turtle"})
+        self.assertEqual(status, 403)
+        self.assertIn("outside of", json.loads(body)["error"])
+
+        self.service.allowed_sources = ["https://sparql.example.org/", os.path.join(self.root, "*.nt")]
+        self.service.parse_job({"source": "https://sparql.example.org/sparql"})
+        for source, source_type in (("https://sparql.example.org.evil.com/sparql", "sparql"), (self.path, "turtle")):
+            with self.subTest(source=source):
+                with self.assertRaises(PermissionError):
+                    self.service.parse_job({"source": source, "source_type": source_type})
+        self.service.allowed_sources.append(self.path)
+        self.service.parse_job({"source": self.path, "source_type": "turtle"})
@@ -0,0 +1,152 @@
+import json
+import threading
+import time
+import unittest
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from libabstractor.HttpTransport import EndpointError, HttpTransport
+from libabstractor.SparqlQuery import SparqlQuery
+
+
+REDIRECTS = {
+    "/moved": (301, "/sparql?default-graph-uri=g&query=old&format=json"),
+    "/found": (302, "/sparql"),
+    "/other": (303, "/sparql"),
+    "/loop": (307, "/loop"),
+    "/choices": (300, None),
+}
+
+
+class EndpointHandler(BaseHTTPRequestHandler):
+    """Endpoint answering its requests on /sparql, redirects on REDIRECTS paths, and byte by byte on /slow"""
+
+    protocol_version = "HTTP/1.1"
+
+    def answer(self):
+        """Answer a request"""
+        url = urllib.parse.urlsplit(self.path)
+        self.server.requests.append((self.command, url.path))
+        if self.command == "POST":
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if url.path in REDIRECTS:
+            status, location = REDIRECTS[url.path]
+            if location == "/sparql" and self.server.target:
+                location = self.server.target + location
+            self.send_response(status)
+            if location:
+                self.send_header("Location", location)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps({"method": self.command, "parameters": urllib.parse.parse_qs(url.query)}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if url.path != "/slow":
+            self.wfile.write(body)
+            return
+        try:
+            for byte in body:
+                self.wfile.write(bytes((byte, )))
+                self.wfile.flush()
+                time.sleep(0.05)
+        except OSError:
+            pass
+
+    do_GET = answer
+    do_POST = answer
+
+    def log_message(self, *args):
+        """Quiet"""
+
+
+class TestHttpTransport(unittest.TestCase):
+    """Tests of the connections to the endpoint"""
+
+    def setUp(self):
+        """Start an endpoint, and the target of its redirects on another port"""
+        self.servers = []
+        self.threads = []
+        for _ in range(2):
+            server = ThreadingHTTPServer(("127.0.0.1", 0), EndpointHandler)
+            server.requests = []
+            server.target = None
+            thread = threading.Thread(target=server.serve_forever)
+            thread.start()
+            self.servers.append(server)
+            self.threads.append(thread)
+        self.server, self.target = self.servers
+        self.url = "http://127.0.0.1:{}".format(self.server.server_port)
+
+    def tearDown(self):
+        """Stop the servers"""
+        for server, thread in zip(self.servers, self.threads):
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+    def query(self, transport, query="SELECT * WHERE { ?s ?p ?o }"):
+        """Send a query, get the answer of the endpoint"""
+        with transport.open(query) as stream:
+            return json.load(stream)
+
+    def test_permanent_redirect(self):
+        """The target of a permanent redirect gets the query, and the next queries"""
+        transport = HttpTransport(self.url + "/moved")
+        answer = self.query(transport)
+        self.assertEqual(answer["parameters"]["query"], ["SELECT * WHERE { ?s ?p ?o }"])
+        self.assertEqual(answer["parameters"]["default-graph-uri"], ["g"])
+        self.assertEqual(self.query(transport, "ASK { ?s ?p ?o }")["parameters"]["query"], ["ASK { ?s ?p ?o }"])
+        self.assertEqual(self.server.requests, [("GET", "/moved"), ("GET", "/sparql"), ("GET", "/sparql")])
+        transport.close()
+
+    def test_temporary_redirect(self):
+        """A temporary redirect to another host is followed by each query"""
+        self.server.target = "http://127.0.0.1:{}".format(self.target.server_port)
+        transport = HttpTransport(self.url + "/found?default-graph-uri=g")
+        for _ in range(2):
+            answer = self.query(transport)
+            self.assertEqual(answer["parameters"]["default-graph-uri"], ["g"])
+        self.assertEqual(self.server.requests, [("GET", "/found")] * 2)
+        self.assertEqual(self.target.requests, [("GET", "/sparql")] * 2)
+        self.assertEqual(len(transport.redirects), 1)
+        transport.close()
+
+    def test_see_other(self):
+        """A 303 redirect of a POST query is followed with a GET query"""
+        transport = HttpTransport(self.url + "/other", method="POST")
+        self.assertEqual(self.query(transport)["method"], "GET")
+        self.assertEqual(self.server.requests, [("POST", "/other"), ("GET", "/sparql")])
+        transport.close()
+
+    def test_errors(self):
+        """Redirect loops and unfollowed redirects are errors, which are not transient"""
+        for path, status in (("/loop", 307), ("/choices", 300)):
+            transport = HttpTransport(self.url + path)
+            with self.assertRaises(EndpointError) as context:
+                self.query(transport)
+            self.assertEqual(context.exception.status, status)
+            self.assertFalse(context.exception.transient)
+            transport.close()
+        self.assertEqual(len(self.server.requests), HttpTransport.max_redirects + 2)
+
+    def test_timeout(self):
+        """A response not fully received in time is a transient error, even if the endpoint is still sending it"""
+        transport = HttpTransport(self.url + "/slow", timeout=0.5)
+        start = time.monotonic()
+        with self.assertRaises(EndpointError) as context:
+            self.query(transport)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertTrue(context.exception.transient)
+        self.assertTrue(SparqlQuery.is_transient(context.exception))
+        transport.close()
+
+        # the socket timeout of reused connections is the timeout of the query
+        transport = HttpTransport(self.url + "/sparql", timeout=5)
+        for _ in range(2):
+            self.assertEqual(self.query(transport)["method"], "GET")
+        self.assertEqual(transport.pool.qsize(), 1)
+        self.assertEqual(transport.pool.queue[0].sock.gettimeout(), 5)
+        transport.close()
@@ -0,0 +1,169 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from libabstractor.Abstraction import Abstraction
+from libabstractor.AbstractionState import AbstractionState, GENERATED_AT_TIME
+from libabstractor.RunReport import RunReport
+
+import rdflib
+
+
+PREFIXES = """
+@prefix ex: <http://example.org/> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+"""
+
+DATA = PREFIXES + """
+ex:a1 a ex:A ; ex:rel ex:b1 ; ex:name "a1" .
+ex:b1 a ex:C .
+ex:g1 a ex:Gene ; ex:length 12 .
+"""
+
+EX = rdflib.Namespace("http://example.org/")
+
+
+class GraphEndpointHandler(BaseHTTPRequestHandler):
+    """SPARQL endpoint answering queries on the graph of the server"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        """Answer a query"""
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)["query"][0]
+        with self.server.lock:
+            body = self.server.graph.query(query).serialize(format="json")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/sparql-results+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Quiet"""
+
+
+class TestIncremental(unittest.TestCase):
+    """Tests of incremental runs (all mode, with a previous abstraction)"""
+
+    def setUp(self):
+        """Working directory"""
+        self.directory = tempfile.mkdtemp()
+        self.output = os.path.join(self.directory, "abstraction.nt")
+
+    def tearDown(self):
+        """Remove the working directory"""
+        shutil.rmtree(self.directory)
+
+    def abstract(self, data, previous=None, report=None):
+        """Abstract data, write the abstraction and its state as the abstractor does
+
+        Returns
+        -------
+        tuple
+            Canonical abstraction (see AbstractionState.canonical), and diff
+            with the previous abstraction
+        """
+        path = os.path.join(self.directory, "data.ttl")
+        with open(path, "w") as data_file:
+            data_file.write(data)
+        rdf = Abstraction(mode="all", previous=previous).abstract(path, "turtle", report)
+        canonical = AbstractionState.canonical(rdf.triples())
+        diff = AbstractionState.diff(self.output, "nt", canonical) if os.path.exists(self.output) else None
+        if previous is not None:
+            rdf.state.digest = AbstractionState.get_digest(canonical)
+            rdf.state.write(self.output)
+        with open(self.output, "w") as output:
+            output.writelines(line + "\n" for line, _ in canonical)
+        return canonical, diff
+
+    @staticmethod
+    def lines(canonical):
+        """Lines of an abstraction, without its provenance"""
+        return set(line for line, triple in canonical if triple[1] != GENERATED_AT_TIME)
+
+    def check_incremental(self, before, after):
+        """The incremental run after a change gives the abstraction of a full scan"""
+        self.abstract(before, previous=self.output)
+        incremental, _ = self.abstract(after, previous=self.output)
+        os.remove(self.output)
+        full, _ = self.abstract(after)
+        self.assertEqual(self.lines(incremental), self.lines(full))
+        return incremental
+
+    def test_state(self):
+        """The state records fingerprints and rows of each entity"""
+        self.abstract(DATA, previous=self.output)
+        state = AbstractionState.load(self.output)
+        self.assertEqual(sorted(state.fingerprints), [str(EX.A), str(EX.C), str(EX.Gene)])
+        self.assertEqual(state.fingerprints[str(EX.A)], [1, 3, 3])
+        self.assertEqual(state.relation_sources({str(EX.C)}), {str(EX.A)})
+        self.assertEqual(state.digest, AbstractionState.get_digest(AbstractionState.canonical(rdflib.Graph().parse(self.output, format="nt"))))
+
+    def test_unchanged_entities(self):
+        """Only changed entities are queried again"""
+        self.abstract(DATA, previous=self.output)
+        report = RunReport()
+        canonical, _ = self.abstract(DATA + "ex:g2 a ex:Gene ; ex:symbol \"BRCA1\" .\n", previous=self.output, report=report)
+        methods = [query["method"] for query in report.queries]
+        self.assertEqual(methods.count("entities_and_relations_of"), 1)
+        self.assertEqual(methods.count("entities_and_attributes_of"), 1)
+        self.assertIn((EX.symbol, rdflib.RDFS.domain, EX.Gene), set(triple for _, triple in canonical))
+
+    def test_diff(self):
+        """The diff lists added and removed triples"""
+        self.abstract(DATA, previous=self.output)
+        _, (added, removed) = self.abstract(DATA.replace('ex:name "a1" ', ""), previous=self.output)
+        self.assertEqual(added, [])
+        self.assertIn("<http://example.org/name> <http://www.w3.org/2000/01/rdf-schema#domain> <http://example.org/A> .", removed)
+
+    def test_target_type_changed(self):
+        """Relations to an instance whose entity changed are queried again"""
+        canonical = self.check_incremental(DATA, DATA.replace("ex:b1 a ex:C", "ex:b1 a ex:D"))
+        triples = set(triple for _, triple in canonical)
+        self.assertIn((EX.rel, rdflib.RDFS.range, EX.D), triples)
+        self.assertNotIn((EX.rel, rdflib.RDFS.range, EX.C), triples)
+
+    def test_target_typed(self):
+        """Relations to an instance which was not typed are found"""
+        before = DATA + "ex:a2 a ex:A ; ex:rel2 ex:b2 .\nex:b2 ex:name \"b2\" .\n"
+        canonical = self.check_incremental(before, before.replace("ex:b2 ex:name", "ex:b2 a ex:E ; ex:name"))
+        self.assertIn((EX.rel2, rdflib.RDFS.range, EX.E), set(triple for _, triple in canonical))
+
+    def test_target_untyped(self):
+        """Relations to an instance which is no more typed are removed"""
+        canonical = self.check_incremental(DATA, DATA.replace("ex:b1 a ex:C .", "ex:b1 ex:name \"b1\" ."))
+        self.assertNotIn(EX.rel, set(triple[0] for _, triple in canonical))
+
+    def test_parent_changed(self):
+        """Entities whose parents changed, and relations to them, are queried again"""
+        canonical = self.check_incremental(DATA, DATA + "ex:C rdfs:subClassOf ex:Super .\n")
+        self.assertIn((EX.C, rdflib.RDFS.subClassOf, EX.Super), set(triple for _, triple in canonical))
+
+    def test_cached_endpoint(self):
+        """Changes of an endpoint are found by an incremental run, even if its results are cached"""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), GraphEndpointHandler)
+        server.lock = threading.Lock()
+        server.graph = rdflib.Graph()
+        server.graph.parse(data=DATA, format="turtle")
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        url = "http://127.0.0.1:{}/sparql".format(server.server_port)
+        cache_dir = os.path.join(self.directory, "cache")
+        try:
+            rdf = Abstraction(mode="all", previous=self.output, cache_dir=cache_dir).abstract(url)
+            rdf.state.write(self.output)
+            with server.lock:
+                server.graph.parse(data=PREFIXES + "ex:a2 a ex:A ; ex:rel ex:g1 .", format="turtle")
+            rdf = Abstraction(mode="all", previous=self.output, cache_dir=cache_dir).abstract(url)
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+        triples = set(rdf.triples())
+        self.assertIn((EX.rel, rdflib.RDFS.range, EX.Gene), triples)
+        self.assertIn((EX.rel, rdflib.RDFS.range, EX.C), triples)
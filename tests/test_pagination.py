@@ -0,0 +1,66 @@
+import re
+import unittest
+
+from libabstractor.SparqlQuery import SparqlQuery
+
+
+QUERY = "SELECT DISTINCT ?entity WHERE { ?instance a ?entity . }"
+
+
+class CappedSparqlQuery(SparqlQuery):
+    """Endpoint stand-in answering at most max_rows rows per query"""
+
+    def __init__(self, rows, max_rows, page_size):
+        """Init"""
+        super().__init__("http://example.org/sparql", "sparql", page_size=page_size)
+        self.rows = rows
+        self.max_rows = max_rows
+        self.pages = []
+
+    def fetch_with_retries(self, query, variables=None, record=None, ordered=False):
+        """Answer a page of rows, truncated to max_rows"""
+        limit, offset = map(int, re.search(r"LIMIT (\d+)\s+OFFSET (\d+)\s*$", query).groups())
+        self.pages.append((limit, offset))
+        return self.rows[offset:offset + min(limit, self.max_rows)]
+
+
+class TestPagination(unittest.TestCase):
+    """Tests of the pagination of endpoint queries"""
+
+    def setUp(self):
+        """Rows of the endpoint"""
+        self.rows = [("http://example.org/Entity{}".format(number), ) for number in range(25)]
+
+    def test_pages(self):
+        """Full pages are followed by the next one"""
+        sparql = CappedSparqlQuery(self.rows, 100, 10)
+        self.assertEqual(sparql.process_query(QUERY), self.rows)
+        self.assertEqual(sparql.pages, [(10, 0), (10, 10), (10, 20)])
+        self.assertIsNone(sparql.row_cap)
+
+        # a page longer than a full page may be truncated: the next one is checked
+        self.assertEqual(sparql.process_query(QUERY, 30), self.rows)
+        self.assertEqual(sparql.pages[3:], [(30, 0), (30, 25)])
+        self.assertIsNone(sparql.row_cap)
+
+    def test_capped(self):
+        """Results truncated by the endpoint are detected, and the cap used as page size"""
+        sparql = CappedSparqlQuery(self.rows, 7, 10)
+        self.assertEqual(sparql.process_query(QUERY), self.rows)
+        self.assertEqual(sparql.pages, [(10, 0), (10, 7), (7, 14), (7, 21)])
+        self.assertEqual(sparql.row_cap, 7)
+
+        # next queries use the cap as page size
+        self.assertEqual(sparql.process_query(QUERY), self.rows)
+        self.assertEqual(sparql.pages[4:], [(7, 0), (7, 7), (7, 14), (7, 21)])
+
+    def test_short_results(self):
+        """A short page is checked once, then shorter pages are known to be complete"""
+        sparql = CappedSparqlQuery(self.rows[:5], 100, 10)
+        self.assertEqual(sparql.process_query(QUERY), self.rows[:5])
+        self.assertEqual(sparql.pages, [(10, 0), (10, 5)])
+
+        sparql.rows = self.rows[:3]
+        self.assertEqual(sparql.process_query(QUERY), self.rows[:3])
+        self.assertEqual(sparql.pages[2:], [(10, 0)])
+        self.assertIsNone(sparql.row_cap)
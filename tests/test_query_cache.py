@@ -0,0 +1,68 @@
+import shutil
+import tempfile
+import time
+import unittest
+
+from libabstractor.QueryCache import QueryCache
+
+
+ENDPOINT = "http://example.org/sparql"
+QUERY = "SELECT ?entity WHERE { ?instance a ?entity . }"
+ROWS = [["http://example.org/Gene"], ["http://example.org/Protein"]]
+
+
+class TestQueryCache(unittest.TestCase):
+    """Tests of the cache of endpoint results"""
+
+    def setUp(self):
+        """Cache directory"""
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the cache directory"""
+        shutil.rmtree(self.directory)
+
+    def test_get_put(self):
+        """Results are cached per endpoint and query, whatever the query whitespaces"""
+        cache = QueryCache(self.directory)
+        self.assertIsNone(cache.get(ENDPOINT, QUERY))
+        cache.put(ENDPOINT, QUERY, ["entity"], ROWS)
+        self.assertEqual(cache.get(ENDPOINT, QUERY), (["entity"], ROWS))
+        self.assertEqual(cache.get(ENDPOINT, "\n  SELECT ?entity\nWHERE {\n    ?instance a ?entity .\n}\n"), (["entity"], ROWS))
+        self.assertIsNone(cache.get("http://example.com/sparql", QUERY))
+
+    def test_persistent(self):
+        """Results are kept across runs"""
+        QueryCache(self.directory).put(ENDPOINT, QUERY, ["entity"], ROWS)
+        self.assertEqual(QueryCache(self.directory).get(ENDPOINT, QUERY), (["entity"], ROWS))
+
+    def test_ttl(self):
+        """Expired results are not returned"""
+        cache = QueryCache(self.directory, ttl=0.2)
+        cache.put(ENDPOINT, QUERY, ["entity"], ROWS)
+        time.sleep(0.3)
+        self.assertIsNone(cache.get(ENDPOINT, QUERY))
+
+    def test_refresh(self):
+        """With refresh, results are stored but never read"""
+        QueryCache(self.directory).put(ENDPOINT, QUERY, ["entity"], ROWS)
+        cache = QueryCache(self.directory, refresh=True)
+        self.assertIsNone(cache.get(ENDPOINT, QUERY))
+        cache.put(ENDPOINT, QUERY, ["entity"], ROWS[:1])
+        self.assertEqual(QueryCache(self.directory).get(ENDPOINT, QUERY), (["entity"], ROWS[:1]))
+
+    def test_evict(self):
+        """Least recently used results are evicted when the cache is full"""
+        cache = QueryCache(self.directory, max_size=10 ** 6)
+        rows = [["http://example.org/{}".format(index)] for index in range(1000)]
+        for index in range(3):
+            cache.put(ENDPOINT, "{} # {}".format(QUERY, index), ["entity"], rows)
+        size = cache.connection.execute("SELECT size FROM results").fetchone()[0]
+        # Query 0 is used again: query 1 is the least recently used one
+        time.sleep(0.01)
+        cache.get(ENDPOINT, "{} # 0".format(QUERY))
+        cache.max_size = 3 * size
+        cache.put(ENDPOINT, "{} # 3".format(QUERY), ["entity"], rows)
+        self.assertIsNone(cache.get(ENDPOINT, "{} # 1".format(QUERY)))
+        for index in (0, 2, 3):
+            self.assertIsNotNone(cache.get(ENDPOINT, "{} # {}".format(QUERY, index)))
@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from libabstractor.HttpTransport import EndpointError
+from libabstractor.QueryFallback import QueryFallback
+from libabstractor.QueryLibrary import QueryLibrary
+from libabstractor.SparqlQuery import SparqlQuery
+
+
+DATA = """
+@prefix ex: <http://example.org/> .
+
+ex:g1 a ex:Gene ; ex:encodes ex:p1 ; ex:locatedIn ex:c1 ; ex:length 12 .
+ex:p1 a ex:Protein ; ex:locatedIn ex:c1 .
+ex:c1 a ex:Chromosome .
+"""
+
+
+class FailingSparqlQuery(SparqlQuery):
+    """Source whose queries fail (with a server error) when failing(query, page_size) is True"""
+
+    failing = staticmethod(lambda query, page_size: False)
+
+    def iter_query(self, query, page_size=None):
+        """Execute a query, or fail"""
+        if self.failing(query, page_size):
+            raise EndpointError("HTTP Error 500", 500)
+        return super().iter_query(query, page_size)
+
+
+class TestQueryFallback(unittest.TestCase):
+    """Tests of the split of failing queries"""
+
+    def setUp(self):
+        """Load the data"""
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, "data.ttl")
+        with open(path, "w") as data_file:
+            data_file.write(DATA)
+        self.sparql = FailingSparqlQuery(path, "turtle")
+        self.library = QueryLibrary()
+        self.expected = set(self.sparql.process_query(self.library.entities_and_relations))
+
+    def tearDown(self):
+        """Remove the data"""
+        shutil.rmtree(self.directory)
+
+    def rows(self, failing):
+        """Rows of the relations query, with failing queries"""
+        self.sparql.failing = failing
+        fallback = QueryFallback(self.sparql, self.library)
+        return set(fallback.rows("relations")), fallback.gaps
+
+    def test_no_failure(self):
+        """Rows of the full query"""
+        rows, gaps = self.rows(lambda query, page_size: False)
+        self.assertEqual(rows, self.expected)
+        self.assertEqual(gaps, [])
+
+    def test_split_per_entity(self):
+        """A failing query is split per entity"""
+        rows, gaps = self.rows(lambda query, page_size: query.name == "entities_and_relations")
+        self.assertEqual(rows, self.expected)
+        self.assertEqual(gaps, [])
+
+    def test_split_per_predicate(self):
+        """A failing query of an entity is split per predicate"""
+        rows, gaps = self.rows(lambda query, page_size: query.name == "entities_and_relations" or
+                               (query.name == "entities_and_relations_of" and "?instance_of_source ?relation" in query and "<http://example.org/Gene>" in query))
+        self.assertEqual(rows, self.expected)
+        self.assertEqual(gaps, [])
+
+    def test_gap(self):
+        """A query failing with the smallest pages is given up, and recorded as a gap"""
+        def failing(query, page_size):
+            gene = "<http://example.org/Gene>" in query
+            return query.name == "entities_and_relations" or (gene and ("?instance_of_source ?relation" in query or "<http://example.org/encodes>" in query))
+        self.sparql.page_size = 400
+        rows, gaps = self.rows(failing)
+        self.assertEqual(rows, set(row for row in self.expected if row.relation != "http://example.org/encodes"))
+        self.assertEqual([(gap["query"], gap["entity"], gap["predicate"]) for gap in gaps],
+                         [("relations", "http://example.org/Gene", "http://example.org/encodes")])
+
+    def test_permanent_error(self):
+        """Errors that would fail again are not split"""
+        def failing(query, page_size):
+            raise ValueError("invalid query")
+        with self.assertRaises(ValueError):
+            self.rows(failing)
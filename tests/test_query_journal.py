@@ -0,0 +1,147 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from libabstractor.QueryJournal import QueryJournal
+from libabstractor.SparqlQuery import SparqlQuery
+
+
+ENDPOINT = "http://example.org/sparql"
+QUERY = "SELECT ?entity WHERE { ?instance a ?entity . }"
+ROWS = [["http://example.org/Gene"], ["http://example.org/Protein"]]
+
+
+class EndpointHandler(BaseHTTPRequestHandler):
+    """SPARQL endpoint answering the same results to every query"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        """Answer a query"""
+        self.server.queries += 1
+        body = json.dumps({
+            "head": {"vars": ["entity"]},
+            "results": {"bindings": [{"entity": {"type": "uri", "value": row[0]}} for row in ROWS]}
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/sparql-results+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Quiet"""
+
+
+class TestQueryJournal(unittest.TestCase):
+    """Tests of the checkpoint journal"""
+
+    def setUp(self):
+        """Journal path"""
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "run.jsonl")
+
+    def tearDown(self):
+        """Remove the journal"""
+        shutil.rmtree(self.directory)
+
+    def test_replay(self):
+        """Results of completed queries are replayed by the next run"""
+        journal = QueryJournal(self.path)
+        self.assertIsNone(journal.get(ENDPOINT, QUERY))
+        journal.put(ENDPOINT, QUERY, ["entity"], ROWS)
+        journal.put(ENDPOINT, QUERY + " LIMIT 1", ["entity"], ROWS[:1])
+        self.assertEqual(journal.get(ENDPOINT, QUERY), (["entity"], ROWS))
+        journal.close()
+
+        journal = QueryJournal(self.path)
+        self.assertEqual(len(journal.offsets), 2)
+        self.assertEqual(journal.get(ENDPOINT, QUERY), (["entity"], ROWS))
+        self.assertEqual(journal.get(ENDPOINT, QUERY + " LIMIT 1"), (["entity"], ROWS[:1]))
+        self.assertIsNone(journal.get("http://example.com/sparql", QUERY))
+        journal.close()
+
+    def test_truncated(self):
+        """A last line truncated by a crash is ignored, and overwritten by the next result"""
+        journal = QueryJournal(self.path)
+        journal.put(ENDPOINT, QUERY, ["entity"], ROWS)
+        journal.close()
+        with open(self.path, "ab") as journal_file:
+            journal_file.write(b'{"key": "0123", "variables": ["ent')
+
+        journal = QueryJournal(self.path)
+        self.assertEqual(list(journal.offsets.values()), [0])
+        journal.put(ENDPOINT, QUERY + " LIMIT 1", ["entity"], ROWS[:1])
+        journal.close()
+
+        journal = QueryJournal(self.path)
+        self.assertEqual(journal.get(ENDPOINT, QUERY), (["entity"], ROWS))
+        self.assertEqual(journal.get(ENDPOINT, QUERY + " LIMIT 1"), (["entity"], ROWS[:1]))
+        journal.close()
+        with open(self.path, "rb") as journal_file:
+            self.assertEqual(len(journal_file.read().splitlines()), 2)
+
+    def test_invalid_lines(self):
+        """Invalid lines before the end are ignored, not removed with the next results"""
+        journal = QueryJournal(self.path)
+        journal.put(ENDPOINT, QUERY, ["entity"], ROWS)
+        journal.close()
+        with open(self.path, "ab") as journal_file:
+            journal_file.write(b'{"key": "0123", "variables": ["ent\n[1, 2]\n')
+
+        journal = QueryJournal(self.path)
+        journal.put(ENDPOINT, QUERY + " LIMIT 1", ["entity"], ROWS[:1])
+        journal.close()
+
+        journal = QueryJournal(self.path)
+        self.assertEqual(len(journal.offsets), 2)
+        self.assertEqual(journal.get(ENDPOINT, QUERY + " LIMIT 1"), (["entity"], ROWS[:1]))
+        journal.close()
+        with open(self.path, "rb") as journal_file:
+            self.assertEqual(len(journal_file.read().splitlines()), 4)
+
+    def test_truncated_by_other_process(self):
+        """A result appended after a line truncated by another process is on its own line"""
+        journal = QueryJournal(self.path)
+        journal.put(ENDPOINT, QUERY, ["entity"], ROWS)
+        with open(self.path, "ab") as journal_file:
+            journal_file.write(b'{"key": "0123", "variables": ["ent')
+        journal.put(ENDPOINT, QUERY + " LIMIT 1", ["entity"], ROWS[:1])
+        self.assertEqual(journal.get(ENDPOINT, QUERY + " LIMIT 1"), (["entity"], ROWS[:1]))
+        journal.close()
+
+        journal = QueryJournal(self.path)
+        self.assertEqual(journal.get(ENDPOINT, QUERY + " LIMIT 1"), (["entity"], ROWS[:1]))
+        self.assertEqual(len(journal.offsets), 2)
+        journal.close()
+
+    def test_sparql_query(self):
+        """Queries found in the journal are not sent again, big results are not journaled"""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), EndpointHandler)
+        server.queries = 0
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            url = "http://127.0.0.1:{}/sparql".format(server.server_port)
+            for _ in range(2):
+                journal = QueryJournal(self.path)
+                sparql = SparqlQuery(url, "sparql", page_size=0, journal=journal)
+                self.assertEqual([list(row) for row in sparql.process_query(QUERY)], ROWS)
+                journal.close()
+            self.assertEqual(server.queries, 1)
+
+            # Results bigger than store_limit are streamed, not stored
+            journal = QueryJournal(self.path)
+            sparql = SparqlQuery(url, "sparql", page_size=0, journal=journal, store_limit=1)
+            for _ in range(2):
+                self.assertEqual([list(row) for row in sparql.process_query(QUERY + " # big")], ROWS)
+            journal.close()
+            self.assertEqual(server.queries, 3)
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
@@ -0,0 +1,61 @@
+import unittest
+
+from libabstractor.QueryLibrary import QueryLibrary
+from libabstractor.RdfGraph import RdfGraph
+
+import rdflib
+
+
+DATA = """
+@prefix ex: <http://example.org/> .
+@prefix x: <http://EXCLUDED.org/> .
+
+ex:a1 a ex:A ; ex:rel ex:b1 ; ex:name "a1" .
+ex:b1 a ex:B .
+x:c1 a x:C ; x:rel x:c2 ; x:name "c1" .
+x:c2 a x:C .
+"""
+
+
+class TestQueryLibrary(unittest.TestCase):
+    """Tests of the filters of excluded namespaces"""
+
+    def setUp(self):
+        """Library excluding a namespace, and a graph of data"""
+        self.rdf = RdfGraph("http://askomics.org/internal/", excluded_namespaces=["http://excluded.org/"])
+        self.library = QueryLibrary(self.rdf.excluded_namespaces)
+        self.graph = rdflib.Graph()
+        self.graph.parse(data=DATA, format="turtle")
+
+    def rows(self, query):
+        """Rows of a query on the data, as sets of values"""
+        return set(tuple(str(value) for value in row) for row in self.graph.query(query))
+
+    def test_no_exclusion(self):
+        """Queries are not filtered without excluded namespaces"""
+        self.assertEqual(QueryLibrary().exclusion_filter("entity"), "")
+        self.assertNotIn("FILTER (!", QueryLibrary().entities_and_relations)
+
+    def test_relations_and_attributes_filtered(self):
+        """Relations and attributes queries of each mode filter out excluded rows"""
+        entity, instances = "http://EXCLUDED.org/C", ["http://EXCLUDED.org/c1"]
+        queries = {
+            "all": (self.library.entities_and_relations, self.library.entities_and_attributes),
+            "sample": (self.library.relations_of_instances(entity, instances), self.library.attributes_of_instances(entity, instances)),
+            "predicate": (self.library.entities_and_relations_of(entity=entity), self.library.entities_and_attributes_of(entity=entity))
+        }
+        for mode, (relations, attributes) in queries.items():
+            with self.subTest(mode=mode):
+                self.assertIn("FILTER (!", relations)
+                self.assertIn("FILTER (!", attributes)
+                for row in self.rows(relations) | self.rows(attributes):
+                    self.assertFalse(all(value.lower().startswith("http://excluded.org/") for value in row[:3] if value.startswith("http")), row)
+
+    def test_same_rows_as_check_entity(self):
+        """The filter removes the rows discarded by RdfGraph.check_entity only"""
+        unfiltered = QueryLibrary()
+        attributes = self.rows(unfiltered.entities_and_attributes)
+        self.assertEqual(self.rows(self.library.entities_and_attributes), set(row for row in attributes if self.rdf.check_entity(row[0])))
+        relations = self.rows(unfiltered.entities_and_relations)
+        self.assertEqual(self.rows(self.library.entities_and_relations), set(row for row in relations if any(self.rdf.check_entity(value) for value in row[:3])))
+        self.assertLess(len(self.rows(self.library.entities_and_relations)), len(relations))
@@ -0,0 +1,100 @@
+import unittest
+
+from libabstractor.SchemaModel import SchemaModel
+
+import rdflib
+
+
+EX = rdflib.Namespace("http://example.org/")
+ASKOMICS = rdflib.Namespace("http://askomics.org/internal/")
+
+
+class TestSchemaModel(unittest.TestCase):
+    """Tests of the schema model and its conversion to triples"""
+
+    @staticmethod
+    def triples(model):
+        """Triples of a model, with labels generated from the local names"""
+        return list(model.triples(ASKOMICS, lambda uri: uri.split("/")[-1]))
+
+    def test_resources_are_sets(self):
+        """Rows adding the same resource again don't duplicate triples"""
+        model = SchemaModel()
+        for _ in range(3):
+            relation = model.relation(str(EX.encodes))
+            relation.types.add(str(rdflib.OWL.ObjectProperty))
+            relation.domains.add(str(EX.Gene))
+            relation.ranges.add(str(EX.Protein))
+            relation.auto_label = True
+        self.assertEqual(self.triples(model), [
+            (EX.encodes, rdflib.RDF.type, rdflib.OWL.ObjectProperty),
+            (EX.encodes, rdflib.RDFS.label, rdflib.Literal("encodes")),
+            (EX.encodes, rdflib.RDFS.domain, EX.Gene),
+            (EX.encodes, rdflib.RDFS.range, EX.Protein)
+        ])
+
+    def test_triples_unique(self):
+        """A predicate both relation and attribute, with a label equal to the generated one, has unique triples"""
+        model = SchemaModel()
+        relation = model.relation(str(EX.name))
+        relation.types.add(str(rdflib.OWL.ObjectProperty))
+        attribute = model.attribute(str(EX.name))
+        attribute.types.add(str(rdflib.OWL.DatatypeProperty))
+        for resource in (relation, attribute):
+            resource.domains.add(str(EX.Gene))
+            resource.auto_label = True
+        attribute.labels.add("name")
+        triples = self.triples(model)
+        self.assertEqual(len(triples), len(set(triples)))
+        self.assertEqual(set(triples), {
+            (EX.name, rdflib.RDF.type, rdflib.OWL.ObjectProperty),
+            (EX.name, rdflib.RDF.type, rdflib.OWL.DatatypeProperty),
+            (EX.name, rdflib.RDFS.label, rdflib.Literal("name")),
+            (EX.name, rdflib.RDFS.domain, EX.Gene)
+        })
+
+    def test_triples_sorted(self):
+        """Triples are sorted by resource, whatever the order of the rows"""
+        model = SchemaModel()
+        for uri in (EX.Protein, EX.Gene, EX.Transcript):
+            model.entity(str(uri)).types.add(str(rdflib.OWL.Class))
+        model.entity(str(EX.Gene)).parents.update((str(EX.Thing), str(EX.BioThing)))
+        self.assertEqual(self.triples(model), [
+            (EX.Gene, rdflib.RDF.type, rdflib.OWL.Class),
+            (EX.Gene, rdflib.RDFS.subClassOf, EX.BioThing),
+            (EX.Gene, rdflib.RDFS.subClassOf, EX.Thing),
+            (EX.Protein, rdflib.RDF.type, rdflib.OWL.Class),
+            (EX.Transcript, rdflib.RDF.type, rdflib.OWL.Class)
+        ])
+
+    def test_instances_labels(self):
+        """Entities are marked when none of their instances has a label"""
+        model = SchemaModel()
+        model.entity(str(EX.Gene)).no_labels = True
+        model.entity(str(EX.Protein)).no_labels = True
+        model.entity(str(EX.Protein)).has_labels = True
+        triples = self.triples(model)
+        self.assertIn((EX.Gene, ASKOMICS.instancesHaveNoLabels, rdflib.Literal(True)), triples)
+        self.assertNotIn((EX.Protein, ASKOMICS.instancesHaveNoLabels, rdflib.Literal(True)), triples)
+
+    def test_update(self):
+        """Models of several sources are merged"""
+        first, second = SchemaModel(), SchemaModel()
+        first.add_location("http://first.org/sparql")
+        first.entity(str(EX.Gene)).no_labels = True
+        first.attribute(str(EX.length)).ranges.add(str(rdflib.XSD.decimal))
+        second.add_location("http://second.org/sparql")
+        second.entity(str(EX.Gene)).has_labels = True
+        second.attribute(str(EX.length)).ranges.add(str(rdflib.XSD.string))
+        second.set_sample(10, "random")
+        second.add_gap({"query": "all", "entity": None, "predicate": None, "error": "timeout"})
+
+        first.update(second)
+        self.assertEqual(first.locations, ["http://first.org/sparql", "http://second.org/sparql"])
+        self.assertEqual(first.attributes[str(EX.length)].ranges, {str(rdflib.XSD.decimal), str(rdflib.XSD.string)})
+        self.assertEqual((first.sample_size, first.sample_method), (10, "random"))
+        self.assertEqual(len(first.gaps), 1)
+        triples = self.triples(first)
+        self.assertNotIn((EX.Gene, ASKOMICS.instancesHaveNoLabels, rdflib.Literal(True)), triples)
+        self.assertEqual(len([triple for triple in triples if triple[1] == rdflib.URIRef("http://www.w3.org/ns/prov#atLocation")]), 2)
+        self.assertIn(rdflib.Literal(10), [triple[2] for triple in triples if triple[1] == ASKOMICS.sampleSize])
@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from libabstractor.NativeEngine import NativeEngine
+from libabstractor.SchemaStatistics import SchemaStatistics
+from libabstractor.StreamEngine import StreamEngine
+
+import rdflib
+
+
+DATA = """
+@prefix ex: <http://example.org/> .
+
+ex:g1 a ex:Gene ; ex:encodes ex:p1 ; ex:length 12 ; ex:location [ a ex:Location ; ex:start 3 ; ex:on ex:c1 ] .
+ex:g2 a ex:Gene ; ex:location _:l2 .
+_:l2 a ex:Location ; ex:on ex:c1 ; ex:strand "+" .
+ex:p1 a ex:Protein .
+ex:c1 a ex:Chromosome .
+"""
+
+
+class TestStreamEngine(unittest.TestCase):
+    """Tests of the stream engine"""
+
+    def setUp(self):
+        """Write the data in turtle and nt"""
+        self.directory = tempfile.mkdtemp()
+        graph = rdflib.Graph()
+        graph.parse(data=DATA, format="turtle")
+        self.expected = NativeEngine(graph).scan()
+        self.paths = {}
+        for source_type in ("turtle", "nt"):
+            self.paths[source_type] = os.path.join(self.directory, "data." + source_type)
+            graph.serialize(self.paths[source_type], format=source_type, encoding="utf-8")
+
+    def tearDown(self):
+        """Remove the data"""
+        shutil.rmtree(self.directory)
+
+    def assertStatistics(self, statistics):
+        """Statistics are the ones of the loaded graph"""
+        self.assertEqual(statistics.relations, self.expected.relations)
+        self.assertEqual(statistics.attributes, self.expected.attributes)
+        self.assertIn((rdflib.URIRef("http://example.org/Location"), rdflib.URIRef("http://example.org/on"),
+                       rdflib.URIRef("http://example.org/Chromosome")), statistics.relations)
+
+    def test_blank_nodes(self):
+        """Triples of blank nodes are classified, without being buffered for nt files"""
+        for source_type in ("turtle", "nt"):
+            with self.subTest(source_type=source_type):
+                self.assertStatistics(StreamEngine(self.paths[source_type], source_type).scan())
+
+        statistics = SchemaStatistics(stable_blank_nodes=True)
+        statistics.add_class_triple(rdflib.BNode(), rdflib.RDF.type, rdflib.URIRef("http://example.org/Location"))
+        self.assertEqual(statistics.blank_node_triples, [])
+
+    def test_spill(self):
+        """Blank node triples of turtle files are spilled to a temporary file"""
+        spill_size = SchemaStatistics.spill_size
+        SchemaStatistics.spill_size = 2
+        try:
+            statistics = SchemaStatistics()
+            engine = StreamEngine(self.paths["turtle"], "turtle")
+            engine.parse(statistics.add_class_triple)
+            self.assertIsNotNone(statistics.blank_node_file)
+            self.assertLess(len(statistics.blank_node_triples), 2)
+            engine.parse(statistics.add_usage_triple)
+            statistics.end_usage()
+        finally:
+            SchemaStatistics.spill_size = spill_size
+        self.assertStatistics(statistics)
+        self.assertIsNone(statistics.blank_node_file)
+
+    def test_chunks(self):
+        """Chunks of a nt file are parsed by a pool of processes"""
+        self.assertStatistics(StreamEngine(self.paths["nt"], "nt", jobs=2, chunk_size=100).scan())
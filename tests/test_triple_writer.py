@@ -0,0 +1,84 @@
+import io
+import unittest
+
+from libabstractor.TripleWriter import NTriplesWriter, TripleWriter, TurtleWriter
+
+import rdflib
+
+
+EX = rdflib.Namespace("http://example.org/")
+
+
+class TestTripleWriter(unittest.TestCase):
+    """Tests of the nt and turtle writers"""
+
+    triples = [
+        (EX.Gene, rdflib.RDF.type, rdflib.OWL.Class),
+        (EX.Gene, rdflib.RDFS.label, rdflib.Literal('Gene "quoted"\nline')),
+        (EX.Gene, rdflib.RDFS.comment, rdflib.Literal("gène", lang="fr")),
+        (EX.length, rdflib.RDFS.range, rdflib.XSD.decimal),
+        (EX.length, rdflib.RDFS.label, rdflib.Literal(3, datatype=rdflib.XSD.integer)),
+        (EX["gene/length"], rdflib.RDFS.domain, EX.Gene),
+        (rdflib.BNode("graph"), rdflib.RDF.type, EX.Entity),
+        # rdf:type as subject and object
+        (rdflib.RDF.type, rdflib.RDFS.label, rdflib.Literal("type")),
+        (EX.isA, rdflib.RDFS.subPropertyOf, rdflib.RDF.type)
+    ]
+
+    prefixes = {"ex": str(EX), "rdf": str(rdflib.RDF), "rdfs": str(rdflib.RDFS)}
+
+    def write(self, output_format, triples, **kwargs):
+        """Write triples, and parse them back"""
+        stream = io.StringIO()
+        writer = TripleWriter.create(output_format, stream, self.prefixes, **kwargs)
+        writer.write_all(triples)
+        graph = rdflib.Graph()
+        graph.parse(data=stream.getvalue(), format=output_format)
+        return writer, stream.getvalue(), graph
+
+    def test_create(self):
+        """Writers of each format"""
+        self.assertIsInstance(TripleWriter.create("nt", io.StringIO()), NTriplesWriter)
+        self.assertIsInstance(TripleWriter.create("turtle", io.StringIO()), TurtleWriter)
+        with self.assertRaises(TypeError):
+            TripleWriter(io.StringIO())
+
+    def test_round_trip(self):
+        """Written triples are parsed back unchanged"""
+        for output_format in TripleWriter.formats:
+            with self.subTest(output_format=output_format):
+                writer, _, graph = self.write(output_format, self.triples)
+                self.assertEqual(writer.count, len(self.triples))
+                # Blank node labels are not kept by the parser
+                self.assertEqual(len(graph), len(self.triples))
+                self.assertEqual(set(t for t in graph if not isinstance(t[0], rdflib.BNode)),
+                                 set(t for t in self.triples if not isinstance(t[0], rdflib.BNode)))
+
+    def test_duplicates(self):
+        """Duplicate triples are written once"""
+        for output_format in TripleWriter.formats:
+            with self.subTest(output_format=output_format):
+                writer, _, graph = self.write(output_format, self.triples + self.triples[:3])
+                self.assertEqual(writer.count, len(self.triples))
+                self.assertEqual(len(graph), len(self.triples))
+
+    def test_unique(self):
+        """Duplicates are not checked for unique triples"""
+        writer, text, _ = self.write("nt", self.triples[:1] * 2, unique=True)
+        self.assertIsNone(writer.seen)
+        self.assertEqual(writer.count, 2)
+        self.assertEqual(len(text.splitlines()), 2)
+
+    def test_turtle_rdf_type(self):
+        """rdf:type is abbreviated to a in predicate position only"""
+        _, text, _ = self.write("turtle", self.triples)
+        self.assertIn("ex:Gene a <http://www.w3.org/2002/07/owl#Class>", text)
+        self.assertIn("rdf:type rdfs:label", text)
+        self.assertIn("ex:isA rdfs:subPropertyOf rdf:type", text)
+
+    def test_turtle_groups_subjects(self):
+        """Consecutive triples of a subject are grouped, URIs not matching a local name are not compacted"""
+        _, text, _ = self.write("turtle", self.triples)
+        self.assertEqual(text.count("ex:Gene a"), 1)
+        self.assertIn(" ;\n    rdfs:label", text)
+        self.assertIn("<http://example.org/gene/length>", text)